@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Concept Art Cache - Content-addressed store for generated images
+Results are keyed by provider + model + prompt + seed + size, indexed in
+SQLite and evicted least-recently-used once the cache outgrows its budget
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Optional, Union
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".art-cache"
+DEFAULT_MAX_BYTES = 2 << 30  # 2 GiB
+
+# Everything that determines what image a provider returns
+CacheKey = namedtuple('CacheKey', ['provider', 'model', 'prompt', 'seed', 'size'])
+CacheKey.__new__.__defaults__ = (None, None)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    digest TEXT PRIMARY KEY,
+    provider TEXT NOT NULL,
+    model TEXT,
+    prompt TEXT NOT NULL,
+    seed TEXT,
+    size TEXT,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+def key_digest(key: CacheKey) -> str:
+    """Stable SHA-256 of a cache key."""
+    fields = [None if value is None else str(value) for value in key]
+    return hashlib.sha256(json.dumps(fields).encode('utf-8')).hexdigest()
+
+
+def _atomic_copy(src: Path, dst: Path):
+    """Copy src to dst via a temp file in dst's directory and os.replace."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=dst.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(src, 'rb') as f:
+            shutil.copyfileobj(f, out)
+        os.replace(temp_path, dst)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _atomic_write(data: bytes, dst: Path):
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=dst.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            out.write(data)
+        os.replace(temp_path, dst)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class ArtCache:
+    """Generated images stored once under the hash of what produced them."""
+
+    def __init__(self, root: Union[str, Path] = DEFAULT_CACHE_DIR,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / 'index.sqlite'), check_same_thread=False)
+        self._db.executescript(SCHEMA)
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / 'blobs' / digest[:2] / digest
+
+    def get(self, key: CacheKey) -> Optional[Path]:
+        """Path of the cached image for key, or None on a miss."""
+        digest = key_digest(key)
+        path = self._blob_path(digest)
+        with self._lock:
+            row = self._db.execute('SELECT 1 FROM entries WHERE digest = ?', (digest,)).fetchone()
+            if row is None:
+                return None
+            if not path.exists():
+                # Blob removed behind our back - forget it
+                self._db.execute('DELETE FROM entries WHERE digest = ?', (digest,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE entries SET last_used = ? WHERE digest = ?',
+                             (time.time(), digest))
+            self._db.commit()
+        return path
+
+    def put(self, key: CacheKey, source: Union[bytes, str, Path]) -> Path:
+        """Store image bytes (or a copy of a file) under key."""
+        digest = key_digest(key)
+        path = self._blob_path(digest)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            _atomic_write(bytes(source), path)
+        else:
+            _atomic_copy(Path(source), path)
+
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (digest, key.provider, key.model, key.prompt,
+                 None if key.seed is None else str(key.seed),
+                 None if key.size is None else str(key.size),
+                 path.stat().st_size, now, now)
+            )
+            self._db.commit()
+            self._evict()
+        return path
+
+    def restore(self, key: CacheKey, output_path: Union[str, Path]) -> bool:
+        """Copy a cached image to output_path. Returns False on a miss."""
+        path = self.get(key)
+        if path is None:
+            return False
+        _atomic_copy(path, Path(output_path))
+        return True
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits max_bytes."""
+        total = self._db.execute('SELECT COALESCE(SUM(bytes), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute('SELECT digest, bytes FROM entries ORDER BY last_used').fetchall()
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            try:
+                self._blob_path(digest).unlink()
+            except FileNotFoundError:
+                pass
+            self._db.execute('DELETE FROM entries WHERE digest = ?', (digest,))
+            total -= size
+        self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entries').fetchone()
+        return {'entries': count, 'bytes': total, 'max_bytes': self.max_bytes}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> ArtCache:
+    """The shared cache in DEFAULT_CACHE_DIR used by the generator scripts."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ArtCache()
+    return _default_cache
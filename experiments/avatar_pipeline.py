@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Avatar Pipeline - Cut generated concept art out into web avatars
+Keys the plain background of each generated image to alpha, crops to the
+parrot, and exports a responsive size ladder (32-1024 px) as PNG plus
+WebP/AVIF alternates for fast first paint
+
+Only background connected to the image border is removed, so Wilhelm's own
+white and cream feathers stay opaque. Keying and encoding run in a process
+pool and are cached under .avatar-cache by source hash and settings.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from texture_pipeline import available_formats, file_hash
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CACHE_DIR = SCRIPT_DIR / ".avatar-cache"
+DEFAULT_INPUT_DIR = SCRIPT_DIR / "concept-art"
+DEFAULT_OUTPUT_DIR = DEFAULT_INPUT_DIR / "avatars"
+
+SIZES = (32, 48, 64, 96, 128, 192, 256, 384, 512, 768, 1024)
+
+# RGB distance (0-441) under which a pixel counts as background, and the
+# width of the ramp above it that becomes partially transparent
+TOLERANCE = 24.0
+SOFTNESS = 24.0
+
+# Transparent margin kept around the parrot, as a fraction of the crop side
+PADDING = 0.04
+
+# Width in pixels of the border ring sampled for the background colour
+BORDER = 4
+
+QUALITY = {"webp": 82, "avif": 60}
+EXTENSIONS = {"png": ".png", "webp": ".webp", "avif": ".avif"}
+
+
+def avatar_formats():
+    """PNG plus whichever alpha-capable alternates this Pillow can encode."""
+    return ["png"] + [fmt for fmt in available_formats() if fmt in ("webp", "avif")]
+
+
+def estimate_background(pixels, border=BORDER):
+    """Median colour of the outer ring of the image."""
+    ring = np.concatenate([
+        pixels[:border].reshape(-1, 3), pixels[-border:].reshape(-1, 3),
+        pixels[:, :border].reshape(-1, 3), pixels[:, -border:].reshape(-1, 3),
+    ])
+    return np.median(ring, axis=0)
+
+
+def _fill_runs(mask, reached):
+    """Extend reached to every horizontal run of mask it touches."""
+    starts = mask & ~np.pad(mask, ((0, 0), (1, 0)))[:, :-1]
+    runs = np.cumsum(starts.ravel()).reshape(mask.shape) * mask
+    hit = np.zeros(runs.max() + 1, dtype=bool)
+    hit[runs[reached & mask]] = True
+    hit[0] = False
+    return hit[runs]
+
+
+def border_connected(mask):
+    """The parts of mask reachable from the image border (4-connected).
+
+    Alternates whole-run sweeps along rows and columns until nothing
+    changes, which converges in a few passes for real images.
+    """
+    reached = np.zeros_like(mask)
+    reached[0], reached[-1], reached[:, 0], reached[:, -1] = mask[0], mask[-1], mask[:, 0], mask[:, -1]
+    while True:
+        grown = _fill_runs(mask, reached)
+        grown = _fill_runs(mask.T, grown.T).T
+        if np.array_equal(grown, reached):
+            return reached
+        reached = grown
+
+
+def _dilate(mask, radius):
+    grown = mask.copy()
+    for _ in range(radius):
+        step = grown.copy()
+        step[1:] |= grown[:-1]
+        step[:-1] |= grown[1:]
+        step[:, 1:] |= grown[:, :-1]
+        step[:, :-1] |= grown[:, 1:]
+        grown = step
+    return grown
+
+
+def key_background(pixels, background=None, tolerance=TOLERANCE, softness=SOFTNESS):
+    """RGBA uint8 array with the border-connected background made transparent.
+
+    Edge pixels get partial alpha from their distance to the background
+    colour, and their colour is un-mixed from it so no white halo remains.
+    """
+    rgb = pixels[..., :3].astype(np.float32)
+    if background is None:
+        background = estimate_background(rgb)
+    background = np.asarray(background, dtype=np.float32)
+
+    distance = np.linalg.norm(rgb - background, axis=2)
+    outside = border_connected(distance < tolerance)
+    fringe = _dilate(outside, 2)
+
+    alpha = np.ones(distance.shape, dtype=np.float32)
+    alpha[fringe] = np.clip((distance[fringe] - tolerance) / softness, 0.0, 1.0)
+    alpha[outside] = 0.0
+
+    partial = (alpha > 0) & (alpha < 1)
+    rgb[partial] = background + (rgb[partial] - background) / alpha[partial, None]
+
+    rgba = np.empty(distance.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = np.round(rgb).clip(0, 255)
+    rgba[..., 3] = np.round(alpha * 255)
+    return rgba
+
+
+def crop_square(rgba, padding=PADDING, threshold=8):
+    """Square crop around the opaque pixels, padded, centred on the subject.
+
+    Returns (cropped array, (x0, y0, x1, y1) in source pixels). The square
+    may extend past the image; that area is transparent.
+    """
+    opaque = rgba[..., 3] > threshold
+    rows = np.flatnonzero(opaque.any(axis=1))
+    cols = np.flatnonzero(opaque.any(axis=0))
+    if rows.size == 0:
+        height, width = opaque.shape
+        return rgba, (0, 0, width, height)
+
+    top, bottom = rows[0], rows[-1] + 1
+    left, right = cols[0], cols[-1] + 1
+    side = max(bottom - top, right - left)
+    side += 2 * int(round(side * padding))
+    y0 = (top + bottom - side) // 2
+    x0 = (left + right - side) // 2
+
+    canvas = np.zeros((side, side, 4), dtype=np.uint8)
+    sy0, sx0 = max(y0, 0), max(x0, 0)
+    sy1, sx1 = min(y0 + side, rgba.shape[0]), min(x0 + side, rgba.shape[1])
+    canvas[sy0 - y0:sy1 - y0, sx0 - x0:sx1 - x0] = rgba[sy0:sy1, sx0:sx1]
+    return canvas, (int(x0), int(y0), int(x0 + side), int(y0 + side))
+
+
+def _write_atomic(cache_path, save):
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        save(f)
+    os.replace(temp_path, cache_path)
+
+
+def _extract(source_path, cache_path, tolerance, softness, padding):
+    """Key and crop one source into a master RGBA PNG (runs in a worker)."""
+    with Image.open(source_path) as image:
+        pixels = np.asarray(image.convert("RGB"))
+    background = estimate_background(pixels.astype(np.float32))
+    rgba = key_background(pixels, background, tolerance, softness)
+    cropped, box = crop_square(rgba, padding)
+    _write_atomic(cache_path, lambda f: Image.fromarray(cropped, "RGBA").save(f, "PNG"))
+    return {"background": [int(round(c)) for c in background], "crop": list(box)}
+
+
+def _encode(master_path, cache_path, size, fmt):
+    """Resize a master to size x size and encode it (runs in a worker)."""
+    with Image.open(master_path) as image:
+        image = image.convert("RGBA")
+        if image.size != (size, size):
+            # Pillow resizes RGBA premultiplied, so edges don't pick up dark fringes
+            image = image.resize((size, size), Image.LANCZOS)
+
+    def save(f):
+        if fmt == "png":
+            image.save(f, "PNG", optimize=True)
+        elif fmt == "webp":
+            # method 6 is ~40x slower on alpha images for <1% smaller files
+            image.save(f, "WEBP", quality=QUALITY["webp"], method=4)
+        else:
+            image.save(f, "AVIF", quality=QUALITY["avif"])
+
+    _write_atomic(cache_path, save)
+    return str(cache_path)
+
+
+def build_avatars(sources, output_dir=DEFAULT_OUTPUT_DIR, sizes=SIZES, formats=None,
+                  tolerance=TOLERANCE, softness=SOFTNESS, padding=PADDING,
+                  workers=None, cache_dir=CACHE_DIR):
+    """Cut out each source image and export its size ladder.
+
+    Writes <name>-<size><ext> files into output_dir plus avatars-manifest.json
+    and returns the manifest. Sizes larger than the cropped subject are
+    skipped rather than upscaled.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = Path(cache_dir)
+    formats = formats or avatar_formats()
+    settings = f"t{tolerance:g}-s{softness:g}-p{padding:g}"
+
+    masters = {}
+    for source in sources:
+        source_hash = file_hash(source)
+        masters[Path(source).stem] = (source, source_hash,
+                                      cache_dir / source_hash[:2] / f"{source_hash}-{settings}.png")
+
+    manifest = {"avatars": {}}
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        # Stage 1: key + crop every source that isn't cached yet
+        extract = {name: pool.submit(_extract, source, master, tolerance, softness, padding)
+                   for name, (source, _, master) in masters.items()
+                   if not master.with_suffix(".json").exists()}
+        for name, future in extract.items():
+            master = masters[name][2]
+            info = future.result()
+            _write_atomic(master.with_suffix(".json"), lambda f: f.write(json.dumps(info).encode()))
+
+        # Stage 2: every size x format, skipping cached encodes
+        jobs = []
+        for name, (source, source_hash, master) in masters.items():
+            info = json.loads(master.with_suffix(".json").read_text())
+            crop_side = info["crop"][2] - info["crop"][0]
+            entry = {"source": str(source), "sha256": source_hash, **info, "sizes": []}
+            for size in [s for s in sizes if s <= crop_side] or [min(sizes)]:
+                level = {"size": size, "files": {}}
+                for fmt in formats:
+                    quality = f"-q{QUALITY[fmt]}" if fmt in QUALITY else ""
+                    cache_path = master.with_name(f"{master.stem}-{size}-{fmt}{quality}{EXTENSIONS[fmt]}")
+                    output_path = output_dir / f"{name}-{size}{EXTENSIONS[fmt]}"
+                    level["files"][fmt] = output_path.name
+                    jobs.append((master, cache_path, size, fmt, output_path))
+                entry["sizes"].append(level)
+            manifest["avatars"][name] = entry
+
+        pending = [job for job in jobs if not job[1].exists()]
+        if pending:
+            list(pool.map(_encode, *zip(*[job[:4] for job in pending])))
+
+    for job in jobs:
+        shutil.copyfile(job[1], job[4])
+
+    manifest["keyed"] = len(extract)
+    manifest["encoded"] = len(pending)
+    manifest["cached"] = len(jobs) - len(pending)
+    for entry in manifest["avatars"].values():
+        for level in entry["sizes"]:
+            level["bytes"] = {fmt: (output_dir / file).stat().st_size for fmt, file in level["files"].items()}
+
+    with open(output_dir / "avatars-manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cut Wilhelm concept art out into web avatars")
+    parser.add_argument("sources", nargs="*",
+                        help=f"Images to process (default: {DEFAULT_INPUT_DIR}/*.png)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR), help="Output directory")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)), help="Comma-separated sizes")
+    parser.add_argument("--formats", default=None, help="Comma-separated formats (default: all available)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Colour distance from the background that is keyed out")
+    parser.add_argument("--softness", type=float, default=SOFTNESS,
+                        help="Width of the soft edge above the tolerance")
+    parser.add_argument("--padding", type=float, default=PADDING,
+                        help="Margin around the subject as a fraction of its size")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    sources = args.sources or sorted(str(p) for p in DEFAULT_INPUT_DIR.glob("*.png"))
+    if not sources:
+        print(f"❌ No PNGs found in {DEFAULT_INPUT_DIR}")
+        return
+
+    start = time.time()
+    manifest = build_avatars(
+        sources, args.output,
+        sizes=[int(s) for s in args.sizes.split(",")],
+        formats=args.formats.split(",") if args.formats else None,
+        tolerance=args.tolerance, softness=args.softness, padding=args.padding,
+        workers=args.workers
+    )
+
+    print(f"✅ Avatars built in {time.time() - start:.2f}s "
+          f"({manifest['keyed']} keyed, {manifest['encoded']} encoded, {manifest['cached']} from cache)")
+    for name, entry in manifest["avatars"].items():
+        x0, y0, x1, y1 = entry["crop"]
+        print(f"   {name} ({os.path.getsize(entry['source']):,} bytes source, "
+              f"background {tuple(entry['background'])}, crop {x1 - x0}px at {x0},{y0})")
+        for level in entry["sizes"]:
+            sizes = ", ".join(f"{fmt} {size:,}" for fmt, size in level["bytes"].items())
+            print(f"      {level['size']}px: {sizes}")
+    print(f"\nAll avatars saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Parrot Baker - Bake the procedural parrot of parrot-3d.html into one GLB
+Rebuilds the page's three.js (r128) primitives - cylinder body with
+hemisphere caps, sphere head and eyes, cone beak and tail, box wings,
+eyebrows and perch - with the same tessellation, transforms and colours,
+then merges the static parts per material (merge_wilhelm) and quantizes
+them (optimize_wilhelm). The page loads the result instead of tessellating
+fifteen meshes in JS and drawing each one separately
+"""
+
+import math
+from pathlib import Path
+
+import numpy as np
+
+from customize_wilhelm import hex_to_rgba
+from glb import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, GlbBuilder, write_glb
+
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / 'models' / 'wilhelm' / 'parrot-3d.glb'
+
+# Phong shininess three.js uses when a material doesn't set one
+DEFAULT_SHININESS = 30
+
+# Material name -> (colour, Phong shininess), as in parrot-3d.html
+MATERIALS = {
+    'body': ('#e94560', 100),
+    'head': ('#ff6b6b', DEFAULT_SHININESS),
+    'beak': ('#ffa500', DEFAULT_SHININESS),
+    'eye': ('#000000', DEFAULT_SHININESS),
+    'eyeWhite': ('#ffffff', DEFAULT_SHININESS),
+    'wing': ('#1e3a5f', DEFAULT_SHININESS),
+    'tail': ('#0f172a', DEFAULT_SHININESS),
+    'perch': ('#8b4513', DEFAULT_SHININESS),
+    'eyebrow': ('#1e3a5f', DEFAULT_SHININESS),
+}
+
+# Node name, geometry, material, position, Euler rotation (XYZ order), scale
+PARTS = [
+    ('bodyCyl', ('cylinder', 0.8, 0.8, 1.5, 16), 'body', (0, 0, 0), (0, 0, math.pi / 4), (1, 1, 1)),
+    ('topCap', ('sphere', 0.8, 16, 8, 0, math.pi * 2, 0, math.pi / 2), 'body',
+     (-0.53, 0.53, 0), (0, 0, math.pi / 4), (1, 1, 1)),
+    ('bottomCap', ('sphere', 0.8, 16, 8, 0, math.pi * 2, 0, math.pi / 2), 'body',
+     (0.53, -0.53, 0), (0, 0, -math.pi * 3 / 4), (1, 1, 1)),
+    ('head', ('sphere', 0.6, 16, 16), 'head', (0.8, 1.2, 0), (0, 0, 0), (1, 1, 1)),
+    ('beak', ('cone', 0.15, 0.4, 8), 'beak', (1.3, 1.2, 0), (0, 0, -math.pi / 2), (1, 1, 1)),
+    ('leftEyeWhite', ('sphere', 0.12, 8, 8), 'eyeWhite', (1.1, 1.3, 0.25), (0, 0, 0), (1, 1, 1)),
+    ('leftEye', ('sphere', 0.08, 8, 8), 'eye', (1.18, 1.3, 0.28), (0, 0, 0), (1, 1, 1)),
+    ('rightEyeWhite', ('sphere', 0.12, 8, 8), 'eyeWhite', (1.1, 1.3, -0.25), (0, 0, 0), (1, 1, 1)),
+    ('rightEye', ('sphere', 0.08, 8, 8), 'eye', (1.18, 1.3, -0.28), (0, 0, 0), (1, 1, 1)),
+    ('leftWing', ('box', 1.2, 0.1, 0.6), 'wing', (0, 0.3, 0.7), (math.pi / 8, 0, math.pi / 6), (1, 1, 1)),
+    ('rightWing', ('box', 1.2, 0.1, 0.6), 'wing', (0, 0.3, -0.7), (-math.pi / 8, 0, math.pi / 6), (1, 1, 1)),
+    ('tail', ('cone', 0.3, 1.5, 4), 'tail', (-1.2, -0.5, 0), (0, 0, -math.pi / 3), (1, 1, 1)),
+    ('perch', ('cylinder', 0.1, 0.1, 4, 8), 'perch', (0, -1.2, 0), (0, 0, math.pi / 2), (1, 1, 1)),
+    ('leftEyebrow', ('sphere', 0.15, 8, 8), 'eyebrow', (1.1, 1.55, 0.25), (0, 0, 0), (1, 0.3, 0.5)),
+    ('rightEyebrow', ('sphere', 0.15, 8, 8), 'eyebrow', (1.1, 1.55, -0.25), (0, 0, 0), (1, 0.3, 0.5)),
+]
+
+# Parts the page moves at runtime (blinks, wing flutter, eyebrow moods);
+# they stay separate nodes so it can keep animating them by name
+ANIMATED_PARTS = ('leftEyeWhite', 'leftEye', 'rightEyeWhite', 'rightEye',
+                  'leftWing', 'rightWing', 'leftEyebrow', 'rightEyebrow')
+
+
+def _grid_triangles(grid):
+    """Two triangles per grid cell, (a, b, d) and (b, c, d), as three.js builds them.
+
+    a is grid[y][x], b grid[y + 1][x], c grid[y + 1][x + 1], d grid[y][x + 1].
+    """
+    a = grid[:-1, :-1]
+    b = grid[1:, :-1]
+    c = grid[1:, 1:]
+    d = grid[:-1, 1:]
+    return np.stack([np.stack([a, b, d], -1), np.stack([b, c, d], -1)], axis=-2)
+
+
+def sphere_geometry(radius, width_segments=8, height_segments=6, phi_start=0.0,
+                    phi_length=math.pi * 2, theta_start=0.0, theta_length=math.pi):
+    """THREE.SphereGeometry as (positions, normals, indices)."""
+    width_segments = max(3, int(width_segments))
+    height_segments = max(2, int(height_segments))
+    theta_end = min(theta_start + theta_length, math.pi)
+
+    u = np.arange(width_segments + 1) / width_segments
+    v = np.arange(height_segments + 1)[:, None] / height_segments
+    phi = phi_start + u * phi_length
+    theta = theta_start + v * theta_length
+    positions = np.stack([
+        -radius * np.cos(phi) * np.sin(theta),
+        np.broadcast_to(radius * np.cos(theta), (height_segments + 1, width_segments + 1)),
+        radius * np.sin(phi) * np.sin(theta),
+    ], -1).reshape(-1, 3)
+    normals = positions / radius
+
+    # Cells are (a, b, c, d) = (ix + 1, ix) on row iy and (ix, ix + 1) on row iy + 1
+    grid = np.arange(len(positions)).reshape(height_segments + 1, width_segments + 1)
+    a = grid[:-1, 1:]
+    b = grid[:-1, :-1]
+    c = grid[1:, :-1]
+    d = grid[1:, 1:]
+    cells = np.stack([np.stack([a, b, d], -1), np.stack([b, c, d], -1)], axis=-2)
+
+    # The pole rows collapse to a point, so one of their two triangles is skipped
+    rows = np.arange(height_segments)[:, None]
+    keep = np.zeros((height_segments, width_segments, 2), bool)
+    keep[:, :, 0] = (rows != 0) | (theta_start > 0)
+    keep[:, :, 1] = (rows != height_segments - 1) | (theta_end < math.pi)
+    return positions, normals, cells[keep].ravel()
+
+
+def cylinder_geometry(radius_top=1.0, radius_bottom=1.0, height=1.0, radial_segments=8,
+                      height_segments=1, open_ended=False):
+    """THREE.CylinderGeometry as (positions, normals, indices)."""
+    half_height = height / 2
+    slope = (radius_bottom - radius_top) / height
+
+    # Torso
+    u = np.arange(radial_segments + 1) / radial_segments
+    v = np.arange(height_segments + 1)[:, None] / height_segments
+    theta = u * math.pi * 2
+    radius = v * (radius_bottom - radius_top) + radius_top
+    shape = (height_segments + 1, radial_segments + 1)
+    positions = [np.stack([
+        radius * np.sin(theta),
+        np.broadcast_to(-v * height + half_height, shape),
+        radius * np.cos(theta),
+    ], -1).reshape(-1, 3)]
+    side = np.stack(np.broadcast_arrays(np.sin(theta), slope, np.cos(theta)), -1)
+    side /= np.linalg.norm(side, axis=-1, keepdims=True)
+    normals = [np.broadcast_to(side, shape + (3,)).reshape(-1, 3)]
+    grid = np.arange(shape[0] * shape[1]).reshape(shape)
+    indices = [_grid_triangles(grid).transpose(1, 0, 2, 3).ravel()]
+    count = len(positions[0])
+
+    # Caps: a ring of centre vertices (one per segment) and a ring of rim vertices
+    caps = [(True, radius_top), (False, radius_bottom)] if not open_ended else []
+    for top, cap_radius in caps:
+        if cap_radius <= 0:
+            continue
+        sign = 1 if top else -1
+        rim = np.stack([cap_radius * np.sin(theta), np.full_like(theta, half_height * sign),
+                        cap_radius * np.cos(theta)], -1)
+        centres = np.tile([0.0, half_height * sign, 0.0], (radial_segments, 1))
+        positions.append(np.vstack([centres, rim]))
+        normals.append(np.tile([0.0, sign, 0.0], (len(centres) + len(rim), 1)))
+        centre = count + np.arange(radial_segments)
+        i = count + radial_segments + np.arange(radial_segments)
+        triangle = (i, i + 1, centre) if top else (i + 1, i, centre)
+        indices.append(np.stack(triangle, -1).ravel())
+        count += len(centres) + len(rim)
+
+    return np.vstack(positions), np.vstack(normals), np.concatenate(indices)
+
+
+def cone_geometry(radius=1.0, height=1.0, radial_segments=8, height_segments=1, open_ended=False):
+    """THREE.ConeGeometry: a cylinder with a zero top radius."""
+    return cylinder_geometry(0, radius, height, radial_segments, height_segments, open_ended)
+
+
+def box_geometry(width=1.0, height=1.0, depth=1.0):
+    """THREE.BoxGeometry (one segment per side) as (positions, normals, indices)."""
+    size = {'x': width, 'y': height, 'z': depth}
+    # (u axis, v axis, w axis, u direction, v direction, sign of w) for +x, -x, +y, -y, +z, -z
+    planes = [('z', 'y', 'x', -1, -1, 1), ('z', 'y', 'x', 1, -1, -1),
+              ('x', 'z', 'y', 1, 1, 1), ('x', 'z', 'y', 1, -1, -1),
+              ('x', 'y', 'z', 1, -1, 1), ('x', 'y', 'z', -1, -1, -1)]
+    axis = {'x': 0, 'y': 1, 'z': 2}
+
+    positions, normals, indices = [], [], []
+    for plane, (u, v, w, u_dir, v_dir, w_sign) in enumerate(planes):
+        corners = np.zeros((4, 3))
+        for n, (iy, ix) in enumerate(((0, 0), (0, 1), (1, 0), (1, 1))):
+            corners[n, axis[u]] = (ix - 0.5) * size[u] * u_dir
+            corners[n, axis[v]] = (iy - 0.5) * size[v] * v_dir
+            corners[n, axis[w]] = size[w] / 2 * w_sign
+        normal = np.zeros(3)
+        normal[axis[w]] = w_sign
+        positions.append(corners)
+        normals.append(np.tile(normal, (4, 1)))
+        a, b, c, d = plane * 4 + np.array([0, 2, 3, 1])
+        indices.append([a, b, d, b, c, d])
+
+    return np.vstack(positions), np.vstack(normals), np.concatenate(indices)
+
+
+GEOMETRIES = {
+    'sphere': sphere_geometry,
+    'cylinder': cylinder_geometry,
+    'cone': cone_geometry,
+    'box': box_geometry,
+}
+
+
+def euler_to_quaternion(x, y, z):
+    """A three.js Euler rotation (default 'XYZ' order) as a glTF [x, y, z, w] quaternion."""
+    c1, c2, c3 = math.cos(x / 2), math.cos(y / 2), math.cos(z / 2)
+    s1, s2, s3 = math.sin(x / 2), math.sin(y / 2), math.sin(z / 2)
+    return [
+        s1 * c2 * c3 + c1 * s2 * s3,
+        c1 * s2 * c3 - s1 * c2 * s3,
+        c1 * c2 * s3 + s1 * s2 * c3,
+        c1 * c2 * c3 - s1 * s2 * s3,
+    ]
+
+
+def _material(name, color, shininess):
+    """glTF has no Phong model: approximate it, and keep shininess for the page."""
+    return {
+        'name': name,
+        'pbrMetallicRoughness': {
+            'baseColorFactor': hex_to_rgba(color),
+            'metallicFactor': 0.0,
+            'roughnessFactor': round(math.sqrt(2 / (shininess + 2)), 3),
+        },
+        'extras': {'shininess': shininess},
+    }
+
+
+def parrot_gltf():
+    """The unmerged parrot: one node per page mesh. Returns (gltf, BIN pieces)."""
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'bake_parrot.py'},
+        'scene': 0,
+        'scenes': [{'name': 'parrot', 'nodes': []}],
+        'nodes': [],
+        'meshes': [],
+        'materials': [_material(name, color, shininess) for name, (color, shininess) in MATERIALS.items()],
+    }
+    material_index = {name: index for index, name in enumerate(MATERIALS)}
+    builder = GlbBuilder(gltf)
+
+    # The page shares geometries between parts (both caps, both wings, ...)
+    meshes = {}
+    for name, geometry, material, position, rotation, scale in PARTS:
+        key = (geometry, material)
+        if key not in meshes:
+            positions, normals, indices = GEOMETRIES[geometry[0]](*geometry[1:])
+            index_type = (np.uint16, 5123) if len(positions) <= 0xFFFF else (np.uint32, 5125)
+            # No textures on the page, so UVs are left out
+            gltf['meshes'].append({'name': geometry[0], 'primitives': [{
+                'attributes': {
+                    'POSITION': builder.add_accessor(positions.astype(np.float32), ARRAY_BUFFER,
+                                                     'VEC3', 5126, bounds=True),
+                    'NORMAL': builder.add_accessor(normals.astype(np.float32), ARRAY_BUFFER, 'VEC3', 5126),
+                },
+                'indices': builder.add_accessor(indices.astype(index_type[0]), ELEMENT_ARRAY_BUFFER,
+                                                'SCALAR', index_type[1]),
+                'material': material_index[material],
+            }]})
+            meshes[key] = len(gltf['meshes']) - 1
+
+        node = {'name': name, 'mesh': meshes[key]}
+        if any(position):
+            node['translation'] = list(position)
+        if any(rotation):
+            node['rotation'] = euler_to_quaternion(*rotation)
+        if tuple(scale) != (1, 1, 1):
+            node['scale'] = list(scale)
+        gltf['scenes'][0]['nodes'].append(len(gltf['nodes']))
+        gltf['nodes'].append(node)
+
+    return gltf, builder.finish()
+
+
+def bake_parrot(output_path=DEFAULT_OUTPUT, merge=True, optimize=True):
+    """Write the baked parrot GLB. Returns stats about the result."""
+    gltf, pieces = parrot_gltf()
+    stats = {'draw_calls_before': len(PARTS), 'draw_calls_after': len(PARTS)}
+
+    if merge or optimize:
+        bin_data = np.frombuffer(b''.join(pieces), np.uint8)
+        if merge:
+            from merge_wilhelm import merge_gltf
+            merged, merge_stats = merge_gltf(gltf, bin_data, keep=ANIMATED_PARTS)
+            stats['draw_calls_after'] = merge_stats['draw_calls_after']
+            if merged is not None:
+                bin_data = np.frombuffer(b''.join(merged), np.uint8)
+        if optimize:
+            from optimize_wilhelm import optimize_gltf
+            optimized, _ = optimize_gltf(gltf, bin_data)
+            bin_data = b''.join(optimized)
+        pieces = bin_data
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    stats['bytes'] = write_glb(output_path, gltf, pieces)
+    return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bake the procedural parrot of parrot-3d.html into a GLB")
+    parser.add_argument("output", nargs="?", default=str(DEFAULT_OUTPUT), help="Output GLB")
+    parser.add_argument("--no-merge", action="store_true", help="Keep one mesh per page part")
+    parser.add_argument("--no-optimize", action="store_true", help="Keep float32 vertex data")
+    args = parser.parse_args()
+
+    stats = bake_parrot(args.output, merge=not args.no_merge, optimize=not args.no_optimize)
+
+    print(f"✅ Parrot baked!")
+    print(f"   Output: {args.output} ({stats['bytes']:,} bytes)")
+    print(f"   Draw calls: {stats['draw_calls_before']} -> {stats['draw_calls_after']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Batch Generator - Prompt matrix to hundreds of avatar candidates
+Expands styles x poses x palettes x seeds into jobs in a SQLite queue that a
+worker pool drains; a crashed or interrupted run picks up where it stopped
+
+Spec format (JSON):
+
+    {
+      "base": "A charismatic parrot character named Wilhelm ...",
+      "styles": {"mascot": "friendly mascot style, ...", "wise": "..."},
+      "poses": {"waving": "waving with one wing", "perched": "perched on books"},
+      "palettes": {"coral": "coral #e94560 accents", "navy": "navy #1a1a2e accents"},
+      "seeds": [1, 2, 3],
+      "providers": ["pollinations", "huggingface"],
+      "hedge_after": 30,
+      "output": "{style}-{pose}-{palette}-{seed}.png"
+    }
+
+Styles, poses and palettes may also be plain lists of prompt fragments (they
+are then named by position). Every axis is optional except styles.
+"""
+
+import itertools
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from image_providers import (
+    BASE_DESCRIPTION, DEFAULT_OUTPUT_DIR, DEFAULT_SIZE, Orchestrator, make_provider
+)
+
+DEFAULT_OUTPUT_PATTERN = "{style}-{pose}-{palette}-{seed}.png"
+DEFAULT_QUEUE_NAME = "batch-queue.sqlite"
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    seed INTEGER,
+    output TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    provider TEXT,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+"""
+
+
+def _named(axis, prefix):
+    """{name: fragment} from either a dict or a list of fragments."""
+    if axis is None:
+        return {"default": ""}
+    if isinstance(axis, dict):
+        return axis
+    return {f"{prefix}{i + 1}": fragment for i, fragment in enumerate(axis)}
+
+
+def load_spec(spec_path):
+    with open(spec_path) as f:
+        spec = json.load(f)
+    if not spec.get("styles"):
+        raise ValueError(f"{spec_path} needs at least one style")
+    return spec
+
+
+def expand_matrix(spec):
+    """Every style x pose x palette x seed combination as a job dict."""
+    base = spec.get("base", BASE_DESCRIPTION)
+    pattern = spec.get("output", DEFAULT_OUTPUT_PATTERN)
+    styles = _named(spec["styles"], "style")
+    poses = _named(spec.get("poses"), "pose")
+    palettes = _named(spec.get("palettes"), "palette")
+    seeds = spec.get("seeds") or [None]
+
+    jobs = []
+    ids = set()
+    for (style, style_text), (pose, pose_text), (palette, palette_text), seed in \
+            itertools.product(styles.items(), poses.items(), palettes.items(), seeds):
+        fragments = [base, style_text, pose_text, palette_text]
+        names = {"style": style, "pose": pose, "palette": palette,
+                 "seed": "any" if seed is None else seed}
+        output = pattern.format(**names)
+        # Jobs are keyed by file name, so a pattern missing an axis would
+        # quietly drop all but one of the jobs it merges
+        if Path(output).stem in ids:
+            raise ValueError(f"Output pattern {pattern!r} gives {output!r} to more than one job; "
+                             f"it must use every axis with several entries")
+        ids.add(Path(output).stem)
+        jobs.append({
+            "id": Path(output).stem,
+            "prompt": ", ".join(f for f in fragments if f),
+            "seed": seed,
+            "output": output,
+        })
+    return jobs
+
+
+class JobQueue:
+    """Durable job list in SQLite (WAL mode), safe to share between threads.
+
+    Jobs move pending -> running -> done, or back to pending after a failure
+    until max_attempts is reached (then failed). Opening the queue puts any
+    jobs a crashed run left "running" back to pending.
+    """
+
+    def __init__(self, path, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = Path(path)
+        self.max_attempts = max_attempts
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        with self._lock, self._db:
+            recovered = self._db.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'running'").rowcount
+        if recovered:
+            print(f"↻ Recovered {recovered} job(s) interrupted by the last run")
+
+    def enqueue(self, jobs):
+        """Add jobs; ones already queued (by id) are left as they are."""
+        with self._lock, self._db:
+            before = self._db.total_changes
+            now = time.time()
+            self._db.executemany(
+                "INSERT OR IGNORE INTO jobs (id, prompt, seed, output, updated) "
+                "VALUES (:id, :prompt, :seed, :output, :updated)",
+                [dict(job, updated=now) for job in jobs]
+            )
+            return self._db.total_changes - before
+
+    def claim(self):
+        """Mark the next pending job running and return it, or None.
+
+        Fresh jobs go before retries, so one bad prompt can't stall the batch.
+        """
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT id, prompt, seed, output, attempts FROM jobs "
+                "WHERE status = 'pending' ORDER BY attempts, rowid LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated = ? "
+                "WHERE id = ?", (time.time(), row[0]))
+        return dict(zip(("id", "prompt", "seed", "output", "attempts"), row), attempts=row[4] + 1)
+
+    def complete(self, job_id, provider):
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', provider = ?, error = NULL, updated = ? "
+                "WHERE id = ?", (provider, time.time(), job_id))
+
+    def fail(self, job_id, error):
+        """Requeue a failed job, or mark it failed once out of attempts."""
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, updated = ? WHERE id = ?",
+                (self.max_attempts, str(error), time.time(), job_id))
+
+    def retry_failed(self):
+        """Give every failed job a fresh set of attempts."""
+        with self._lock, self._db:
+            return self._db.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0 WHERE status = 'failed'").rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def failures(self):
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, error FROM jobs WHERE status = 'failed' ORDER BY rowid").fetchall()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def run_queue(queue, orchestrator, output_dir, size=DEFAULT_SIZE, workers=DEFAULT_WORKERS):
+    """Drain the queue with `workers` threads. Returns (done, failed) for this run."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tally = {"done": 0, "failed": 0}
+    tally_lock = threading.Lock()
+
+    def worker():
+        while True:
+            job = queue.claim()
+            if job is None:
+                return
+            output_path = output_dir / job["output"]
+            try:
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                result = orchestrator.generate(job["prompt"], output_path, job["seed"], size)
+            except Exception as e:
+                # Not just ProviderError: an escaping OSError would leave the
+                # job "running" and abort the whole run through future.result()
+                print(f"✗ {job['id']} (attempt {job['attempts']}): {e}")
+                queue.fail(job["id"], e)
+                outcome = "failed"
+            else:
+                source = "cached" if result.cached else f"{result.elapsed:.1f}s"
+                print(f"✓ {job['id']} ({result.provider!r}, {source})")
+                queue.complete(job["id"], repr(result.provider))
+                outcome = "done"
+            with tally_lock:
+                tally[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for future in [pool.submit(worker) for _ in range(max(1, workers))]:
+            future.result()
+    return tally["done"], tally["failed"]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a prompt matrix of Wilhelm candidates")
+    parser.add_argument("spec", help="JSON prompt-matrix spec")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR / "batch"),
+                        help="Output directory")
+    parser.add_argument("--queue", default=None,
+                        help=f"Job queue database (default: <output>/{DEFAULT_QUEUE_NAME})")
+    parser.add_argument("--providers", nargs="+", default=None,
+                        help="Providers to race (overrides the spec)")
+    parser.add_argument("--hedge-after", type=float, default=None,
+                        help="Seconds before hedging with the next provider (overrides the spec)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Jobs to run at once")
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="Tries per job before it is marked failed")
+    parser.add_argument("--size", default=DEFAULT_SIZE)
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Requeue jobs that failed in earlier runs")
+    parser.add_argument("--status", action="store_true",
+                        help="Show queue progress and exit")
+    args = parser.parse_args()
+
+    try:
+        spec = load_spec(args.spec)
+        jobs = expand_matrix(spec)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    output_dir = Path(args.output)
+    queue = JobQueue(args.queue or output_dir / DEFAULT_QUEUE_NAME, args.max_attempts)
+
+    added = queue.enqueue(jobs)
+    if args.retry_failed:
+        print(f"↻ Requeued {queue.retry_failed()} failed job(s)")
+    counts = queue.counts()
+    print(f"📋 {sum(counts.values())} job(s): " +
+          ", ".join(f"{n} {status}" for status, n in sorted(counts.items())) +
+          (f" ({added} new)" if added else ""))
+    if args.status:
+        for job_id, error in queue.failures():
+            print(f"   ✗ {job_id}: {error}")
+        return
+
+    providers = args.providers or spec.get("providers") or ["pollinations"]
+    hedge_after = args.hedge_after if args.hedge_after is not None else spec.get("hedge_after")
+    try:
+        orchestrator = Orchestrator([make_provider(p) for p in providers], hedge_after=hedge_after)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    start = time.time()
+    done, failed = run_queue(queue, orchestrator, output_dir, args.size, args.workers)
+    counts = queue.counts()
+    print(f"\n✅ {done} generated, {failed} failed attempt(s) in {time.time() - start:.0f}s")
+    print(f"   Queue: " + ", ".join(f"{n} {status}" for status, n in sorted(counts.items())))
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Generator Benchmark - Load-test the image clients against the mock server
+Runs N generations at a given concurrency through the Orchestrator for each
+provider and reports throughput, latency percentiles, errors, retries and
+peak memory, so client-side changes can be compared run to run
+
+    python benchmark_generators.py --requests 50 --concurrency 8
+    python benchmark_generators.py --failure-rate 0.1 --rate-limit-rate 0.05 --json out.json
+"""
+
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BENCH_PROVIDERS = ["pollinations", "huggingface", "midapi"]
+
+# Rate limits lifted for the local mock unless --rate is given
+UNLIMITED = {"rate": 1e6, "burst": 1000}
+
+
+def start_mock(args) -> tuple:
+    """Launch mock_image_server.py on a free port. Returns (process, base URL)."""
+    command = [
+        sys.executable, str(Path(__file__).resolve().parent / "mock_image_server.py"),
+        "--port", "0",
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--failure-rate", str(args.failure_rate),
+        "--rate-limit-rate", str(args.rate_limit_rate),
+        "--task-seconds", str(args.task_seconds),
+        "--image-kb", str(args.image_kb),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip()
+    if not url.startswith("http"):
+        process.kill()
+        raise RuntimeError("Mock server failed to start")
+    return process, url
+
+
+def configure(url: str, rate=None):
+    """Point every provider at the mock and set the client-side rate limits."""
+    os.environ["MIDAPI_BASE_URL"] = f"{url}/api/v1/mj"
+    os.environ["POLLINATIONS_BASE_URL"] = url
+    os.environ["HUGGINGFACE_BASE_URL"] = url
+    os.environ.setdefault("MIDAPI_KEY", "mock-key")
+
+    import retry
+    limit = UNLIMITED if rate is None else {"rate": rate, "burst": max(1, int(rate))}
+    for name in BENCH_PROVIDERS:
+        retry.PROVIDER_LIMITS[name] = dict(limit)
+
+
+def make_orchestrator(name: str, cache_dir: Path, task_seconds: float):
+    from art_cache import ArtCache
+    from image_providers import Orchestrator, make_provider
+    from midapi_polling import CompletionHistory
+
+    provider = make_provider(name)
+    if name == "midapi":
+        # Private history seeded with the mock's timing; never touches the real one
+        generator = provider._get_generator()
+        generator.history = CompletionHistory(path=None)
+        generator.history.record(provider.speed, task_seconds)
+        generator.poll_requests_per_minute = 6000
+    return Orchestrator([provider], cache=ArtCache(cache_dir / name))
+
+
+def percentile(values, q):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def run_benchmark(name: str, requests: int, concurrency: int, work_dir: Path,
+                  task_seconds: float, verbose: bool = False) -> dict:
+    """Generate `requests` unique prompts with one provider; return the stats."""
+    from image_providers import ProviderError
+    from retry import get_guard
+
+    orchestrator = make_orchestrator(name, work_dir / "cache", task_seconds)
+    output_dir = work_dir / name
+    output_dir.mkdir(parents=True, exist_ok=True)
+    guard = get_guard(name)
+    retries_before = guard.retries
+    run_id = uuid.uuid4().hex[:8]
+
+    def one(i):
+        # Unique prompts so nothing is served from the art cache
+        prompt = f"benchmark {run_id} {i}: Wilhelm the parrot"
+        start = time.perf_counter()
+        try:
+            orchestrator.generate(prompt, output_dir / f"{i}.png")
+            return time.perf_counter() - start, None
+        except ProviderError as e:
+            return time.perf_counter() - start, str(e)
+
+    tracemalloc.start()
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = sorted(elapsed for elapsed, error in outcomes if error is None)
+    errors = [error for _, error in outcomes if error is not None]
+    return {
+        "provider": name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "succeeded": len(latencies),
+        "errors": len(errors),
+        "retries": guard.retries - retries_before,
+        "wall_seconds": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 3) if wall else 0.0,
+        "p50_seconds": round(percentile(latencies, 50), 3),
+        "p99_seconds": round(percentile(latencies, 99), 3),
+        "max_seconds": round(latencies[-1], 3) if latencies else 0.0,
+        "traced_peak_mb": round(peak / 1e6, 2),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def print_report(results: list):
+    print("\n" + "="*86)
+    print(f"{'Provider':<14}{'OK':>6}{'Err':>6}{'Retry':>7}{'Wall s':>9}{'Img/s':>8}"
+          f"{'p50 s':>8}{'p99 s':>8}{'Max s':>8}{'Peak MB':>10}")
+    print("-"*86)
+    for r in results:
+        print(f"{r['provider']:<14}{r['succeeded']:>6}{r['errors']:>6}{r['retries']:>7}"
+              f"{r['wall_seconds']:>9.2f}{r['throughput_per_s']:>8.2f}{r['p50_seconds']:>8.2f}"
+              f"{r['p99_seconds']:>8.2f}{r['max_seconds']:>8.2f}{r['traced_peak_mb']:>10.2f}")
+        if r["first_error"]:
+            print(f"   first error: {r['first_error'][:70]}")
+    print("="*86)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"Process max RSS: {maxrss / (1e6 if sys.platform == 'darwin' else 1e3):.1f} MB")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the image generators against a local mock")
+    parser.add_argument("--providers", nargs="+", default=BENCH_PROVIDERS, choices=BENCH_PROVIDERS)
+    parser.add_argument("--requests", type=int, default=20, help="Generations per provider")
+    parser.add_argument("--concurrency", type=int, default=4, help="Generations in flight at once")
+    parser.add_argument("--url", default=None,
+                        help="Use an already running mock server instead of starting one")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Client-side requests/second per provider (default: unlimited)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock median latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Mock latency lognormal sigma")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Mock HTTP 500 fraction")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Mock HTTP 429 fraction")
+    parser.add_argument("--task-seconds", type=float, default=1.0, help="Mock MidAPI task time (s)")
+    parser.add_argument("--image-kb", type=int, default=256, help="Mock image size")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the generators' own output")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        url = args.url.rstrip("/")
+    else:
+        process, url = start_mock(args)
+    configure(url, args.rate)
+
+    print(f"🦜 Benchmarking {', '.join(args.providers)} against {url} "
+          f"({args.requests} requests, concurrency {args.concurrency})")
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="wilhelm-bench-") as work_dir:
+            for name in args.providers:
+                print(f"   {name}...")
+                results.append(run_benchmark(name, args.requests, args.concurrency,
+                                             Path(work_dir), args.task_seconds, args.verbose))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Build Graph - Make-like incremental build of the whole pipeline
+Each node declares the files it reads, the files it writes and any values
+it depends on (prompts, palette colours, settings). A node reruns only when
+one of those changed since its last successful run or an output is
+missing, and independent nodes run in parallel
+
+    concept-art ─> avatars ─┐
+    svgs ───────────────────┤
+    wilhelm-glb ────────────┼─> site
+    parrot-3d-glb ──────────┤
+    textures ───────────────┤
+    renders ────────────────┘
+
+Node state (input hashes per node) is kept in .build-graph.json. Changing
+a palette colour in customize_wilhelm.py reruns wilhelm-glb and then the
+site build, and nothing else.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SITE_ROOT = SCRIPT_DIR.parent
+DEFAULT_STATE_PATH = SCRIPT_DIR / ".build-graph.json"
+DEFAULT_JOBS = 4
+
+MODELS_DIR = SCRIPT_DIR / "models"
+CONCEPT_ART_DIR = SCRIPT_DIR / "concept-art"
+
+
+class BuildError(Exception):
+    """A node could not run (missing input, failed action, bad graph)."""
+
+
+class Node:
+    """One build step: action() turns inputs (and values) into outputs."""
+
+    def __init__(self, name: str, action: Callable[[], None], inputs: Iterable = (),
+                 outputs: Iterable = (), values=None):
+        self.name = name
+        self.action = action
+        self.inputs = [Path(p) for p in inputs]
+        self.outputs = [Path(p) for p in outputs]
+        self.values = values
+
+    def __repr__(self):
+        return f"Node({self.name!r})"
+
+
+class BuildGraph:
+    """Nodes wired together by matching one node's outputs to another's inputs."""
+
+    def __init__(self, state_path=DEFAULT_STATE_PATH):
+        self.nodes = {}
+        self.state_path = Path(state_path)
+        self.state = {"files": {}, "nodes": {}}
+        if self.state_path.exists():
+            try:
+                with open(self.state_path) as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def add(self, node: Node) -> Node:
+        if node.name in self.nodes:
+            raise BuildError(f"Duplicate node {node.name!r}")
+        self.nodes[node.name] = node
+        return node
+
+    def dependencies(self) -> dict:
+        """{node name: set of node names whose outputs it reads}."""
+        producers = {}
+        for node in self.nodes.values():
+            for output in node.outputs:
+                if output.resolve() in producers:
+                    raise BuildError(f"{output} is written by both {producers[output.resolve()]} "
+                                     f"and {node.name}")
+                producers[output.resolve()] = node.name
+        return {node.name: {producers[p.resolve()] for p in node.inputs if p.resolve() in producers}
+                for node in self.nodes.values()}
+
+    def _file_hash(self, path: Path) -> str:
+        """SHA-256 of a file, skipping the read when its mtime and size are unchanged."""
+        stat = path.stat()
+        key = str(path.resolve())
+        cached = self.state["files"].get(key)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.state["files"][key] = [stat.st_mtime_ns, stat.st_size, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def stamp(self, node: Node) -> str:
+        """Hash of everything the node depends on; raises BuildError for missing inputs."""
+        missing = [str(p) for p in node.inputs if not p.is_file()]
+        if missing:
+            raise BuildError(f"missing input(s): {', '.join(missing)}")
+        inputs = sorted((str(p.resolve()), self._file_hash(p)) for p in node.inputs)
+        payload = json.dumps([inputs, node.values], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def is_fresh(self, node: Node, stamp: str) -> bool:
+        previous = self.state["nodes"].get(node.name, {})
+        return previous.get("stamp") == stamp and all(p.exists() for p in node.outputs)
+
+    def save(self):
+        """Write the state atomically, so an interrupted build keeps finished nodes."""
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.state_path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(temp_path, self.state_path)
+
+    def _selected(self, targets, dependencies) -> set:
+        """targets and everything upstream of them (all nodes if targets is empty)."""
+        if not targets:
+            return set(self.nodes)
+        selected, stack = set(), list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in self.nodes:
+                raise BuildError(f"Unknown target {name!r} (choose from {', '.join(self.nodes)})")
+            if name not in selected:
+                selected.add(name)
+                stack.extend(dependencies[name])
+        return selected
+
+    def run(self, targets: Optional[Iterable[str]] = None, jobs: int = DEFAULT_JOBS,
+            force: bool = False, dry_run: bool = False) -> dict:
+        """Bring targets up to date. Returns {node name: status}.
+
+        Status is "fresh", "built", "stale" (dry run), "failed" or
+        "skipped" (an upstream node failed). A node's stamp is taken only
+        once its upstream nodes have finished, so an upstream rebuild that
+        produces identical files doesn't cascade.
+
+        Actions run on threads, so any process pool they start must use the
+        "spawn" start method: forking while other nodes' threads hold locks
+        can leave the child deadlocked.
+        """
+        dependencies = self.dependencies()
+        selected = self._selected(targets, dependencies)
+        waiting = {name: dependencies[name] & selected for name in selected}
+        status = {}
+        running = {}
+        started = {}
+
+        def finish(name, result):
+            status[name] = result
+            for upstream in waiting.values():
+                upstream.discard(name)
+
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            while waiting or running:
+                for name in sorted(n for n, upstream in waiting.items() if not upstream):
+                    del waiting[name]
+                    node = self.nodes[name]
+                    upstream = {status[d] for d in dependencies[name] & selected}
+                    if upstream & {"failed", "skipped"}:
+                        print(f"⏭️  {name}: skipped (upstream failed)")
+                        finish(name, "skipped")
+                        continue
+                    try:
+                        stamp = self.stamp(node)
+                    except BuildError as e:
+                        if dry_run and upstream & {"stale"}:
+                            print(f"   {name}: would rebuild")
+                            finish(name, "stale")
+                            continue
+                        print(f"❌ {name}: {e}")
+                        finish(name, "failed")
+                        continue
+                    fresh = not force and self.is_fresh(node, stamp) and "stale" not in upstream
+                    if fresh:
+                        finish(name, "fresh")
+                    elif dry_run:
+                        print(f"   {name}: would rebuild")
+                        finish(name, "stale")
+                    else:
+                        print(f"▶ {name}")
+                        started[name] = time.time()
+                        future = pool.submit(node.action)
+                        running[future] = (name, stamp)
+
+                if not running:
+                    if waiting and not any(not upstream for upstream in waiting.values()):
+                        raise BuildError("Dependency cycle between: " + ", ".join(sorted(waiting)))
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, stamp = running.pop(future)
+                    elapsed = time.time() - started[name]
+                    try:
+                        future.result()
+                        missing = [str(p) for p in self.nodes[name].outputs if not p.exists()]
+                        if missing:
+                            raise BuildError(f"did not write {', '.join(missing)}")
+                    except Exception as e:
+                        print(f"❌ {name} failed after {elapsed:.1f}s: {e}")
+                        finish(name, "failed")
+                        continue
+                    self.state["nodes"][name] = {"stamp": stamp, "built": time.time()}
+                    self.save()
+                    print(f"✓ {name} ({elapsed:.1f}s)")
+                    finish(name, "built")
+
+        if not dry_run:
+            self.save()
+        return status
+
+
+def _generate_concept_art(providers, seed, size):
+    from image_providers import DEFAULT_OUTPUT_DIR, Orchestrator, generate_variations, make_provider
+
+    orchestrator = Orchestrator([make_provider(p) for p in providers])
+    results = generate_variations(orchestrator, DEFAULT_OUTPUT_DIR, seed=seed, size=size)
+    failed = [name for name, result in results if result is None]
+    if failed:
+        raise BuildError(f"generation failed for {', '.join(failed)}")
+
+
+def wilhelm_graph(providers=("pollinations",), seed=42, state_path=DEFAULT_STATE_PATH) -> BuildGraph:
+    """The Wilhelm pipeline from prompts and Parrot.glb to the deployable site."""
+    import avatar_pipeline
+    import bake_parrot
+    import build_site
+    import customize_wilhelm
+    import render_wilhelm
+    import svg_pipeline
+    import texture_pipeline
+    from image_providers import DEFAULT_OUTPUT_DIR, DEFAULT_SIZE, VARIATIONS
+
+    graph = BuildGraph(state_path)
+
+    # Generation depends on the prompts and provider settings, not on the
+    # client code, so refactoring the HTTP layer doesn't re-run the models
+    concept_art = [DEFAULT_OUTPUT_DIR / f"wilhelm-{v['name']}.png" for v in VARIATIONS]
+    graph.add(Node(
+        "concept-art",
+        lambda: _generate_concept_art(providers, seed, DEFAULT_SIZE),
+        outputs=concept_art,
+        values={"variations": VARIATIONS, "providers": list(providers), "seed": seed,
+                "size": DEFAULT_SIZE},
+    ))
+
+    avatar_manifest = avatar_pipeline.DEFAULT_OUTPUT_DIR / "avatars-manifest.json"
+    graph.add(Node(
+        "avatars",
+        lambda: avatar_pipeline.build_avatars([str(p) for p in concept_art]),
+        inputs=concept_art + [SCRIPT_DIR / "avatar_pipeline.py"],
+        outputs=[avatar_manifest],
+    ))
+
+    svgs = sorted(CONCEPT_ART_DIR.glob("*.svg"))
+    svg_manifest = svg_pipeline.DEFAULT_OUTPUT_DIR / "svg-manifest.json"
+    graph.add(Node(
+        "svgs",
+        lambda: svg_pipeline.build_svgs([str(p) for p in svgs]),
+        inputs=svgs + [SCRIPT_DIR / "svg_pipeline.py"],
+        outputs=[svg_manifest],
+    ))
+
+    parrot = MODELS_DIR / "wilhelm" / "Parrot.glb"
+    wilhelm_glb = MODELS_DIR / "wilhelm" / "Wilhelm-v1.glb"
+    graph.add(Node(
+        "wilhelm-glb",
+        lambda: customize_wilhelm.customize_wilhelm(parrot, wilhelm_glb),
+        inputs=[parrot, SCRIPT_DIR / "customize_wilhelm.py"],
+        outputs=[wilhelm_glb],
+        values={"coral": customize_wilhelm.CORAL, "cream": customize_wilhelm.CREAM,
+                "navy": customize_wilhelm.DARK_NAVY},
+    ))
+
+    parrot_3d_glb = MODELS_DIR / "wilhelm" / "parrot-3d.glb"
+    graph.add(Node(
+        "parrot-3d-glb",
+        lambda: bake_parrot.bake_parrot(parrot_3d_glb),
+        inputs=[SCRIPT_DIR / name for name in ("bake_parrot.py", "merge_wilhelm.py", "optimize_wilhelm.py")],
+        outputs=[parrot_3d_glb],
+    ))
+
+    color = MODELS_DIR / "wilhelm-model" / "texture.jpg"
+    normal = MODELS_DIR / "wilhelm-model" / "texture_N.jpg"
+    texture_dir = MODELS_DIR / "wilhelm" / "textures"
+    graph.add(Node(
+        "textures",
+        lambda: texture_pipeline.build_textures(
+            {color.stem: (str(color), "color"), normal.stem: (str(normal), "normal")}, texture_dir),
+        inputs=[color, normal, SCRIPT_DIR / "texture_pipeline.py"],
+        outputs=[texture_dir / "textures-manifest.json"],
+    ))
+
+    renders_manifest = render_wilhelm.DEFAULT_OUTPUT_DIR / "wilhelm-renders.json"
+    graph.add(Node(
+        "renders",
+        lambda: render_wilhelm.render_turntable(render_wilhelm.DEFAULT_MODEL),
+        inputs=[render_wilhelm.DEFAULT_MODEL, color, normal,
+                SCRIPT_DIR / "render_wilhelm.py", SCRIPT_DIR / "obj_to_glb.py"],
+        outputs=[renders_manifest],
+    ))
+
+    # The site build rewrites the pages' references to the new hashed files,
+    # so nothing has to be edited by hand after the steps above
+    pages = [SITE_ROOT / "index.html"] + sorted(SCRIPT_DIR.glob("*.html"))
+    graph.add(Node(
+        "site",
+        lambda: build_site.build_site(SITE_ROOT, build_site.DEFAULT_OUTPUT_DIR),
+        inputs=pages + [avatar_manifest, svg_manifest, wilhelm_glb, parrot_3d_glb,
+                        texture_dir / "textures-manifest.json", renders_manifest,
+                        SCRIPT_DIR / "build_site.py"],
+        outputs=[build_site.DEFAULT_OUTPUT_DIR / build_site.MANIFEST_NAME],
+    ))
+    return graph
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementally build the Wilhelm pipeline")
+    parser.add_argument("targets", nargs="*", help="Nodes to build (default: all)")
+    parser.add_argument("--jobs", "-j", type=int, default=DEFAULT_JOBS, help="Nodes to run at once")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if up to date")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Only show what would rebuild")
+    parser.add_argument("--providers", nargs="+", default=["pollinations"],
+                        help="Providers for concept art generation")
+    parser.add_argument("--list", action="store_true", help="Show the nodes and their dependencies")
+    args = parser.parse_args()
+
+    graph = wilhelm_graph(providers=args.providers)
+    if args.list:
+        for name, upstream in graph.dependencies().items():
+            print(f"   {name}" + (f" <- {', '.join(sorted(upstream))}" if upstream else ""))
+        return
+
+    start = time.time()
+    try:
+        status = graph.run(args.targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    except BuildError as e:
+        print(f"❌ {e}")
+        return
+
+    counts = {}
+    for result in status.values():
+        counts[result] = counts.get(result, 0) + 1
+    print(f"\n{'✅' if not counts.get('failed') else '⚠️ '} Build finished in {time.time() - start:.1f}s: "
+          + ", ".join(f"{n} {result}" for result, n in sorted(counts.items())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Site Build - Fingerprint and precompress the site for deployment
+Copies the site into dist/, renames every referenced asset to a
+content-hashed filename (texture.3f2a9c1b0d.jpg), rewrites the references in
+HTML, CSS, JS, SVG and glTF/GLB files to match, and writes .gz and .br
+siblings of everything compressible, so hashed assets can be served with
+long-lived immutable caching
+
+Pages keep their names. Files nothing references keep theirs too, since
+someone may link to them directly. A .build-index.json in the output keeps
+each file's mtime, size and hash, so only changed files are re-read,
+rewritten and recompressed.
+"""
+
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from glb import read_glb_layout, write_glb
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+SITE_ROOT = SCRIPT_DIR.parent
+DEFAULT_OUTPUT_DIR = SITE_ROOT / "dist"
+
+INDEX_NAME = ".build-index.json"
+MANIFEST_NAME = "asset-manifest.json"
+HEADERS_NAME = "_headers"
+
+# Files that are part of the site
+ASSET_EXTENSIONS = {
+    ".html", ".css", ".js", ".mjs", ".json", ".svg", ".png", ".jpg", ".jpeg",
+    ".webp", ".avif", ".gif", ".ico", ".glb", ".gltf", ".bin", ".ktx2",
+    ".woff", ".woff2", ".obj", ".mtl",
+}
+
+# Entry points: never renamed, since their URLs are what people visit
+PAGE_EXTENSIONS = {".html"}
+
+# Text formats whose quoted strings and url()s are scanned for references
+SCANNED_EXTENSIONS = {".html", ".css", ".js", ".mjs", ".svg", ".gltf"}
+
+# Formats worth precompressing (images and fonts are compressed already)
+COMPRESSED_EXTENSIONS = {
+    ".html", ".css", ".js", ".mjs", ".json", ".svg", ".gltf", ".glb", ".bin",
+    ".obj", ".mtl",
+}
+
+SKIP_DIRS = {"dist", "node_modules", "__pycache__", "venv"}
+
+HASH_LENGTH = 10
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Cloudflare Pages reads at most this many rules from _headers
+MAX_HEADER_RULES = 100
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+REFERENCE = re.compile(
+    r"""(?P<quote>["'(])(?P<path>[^"'()\s<>]+?\.(?:%s))(?P<suffix>[?#][^"'()\s<>]*)?(?=["')])"""
+    % "|".join(sorted(ext[1:] for ext in ASSET_EXTENSIONS)),
+    re.IGNORECASE
+)
+
+
+def brotli_available():
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_site_files(root, output_dir):
+    """Site-relative POSIX paths of every asset under root."""
+    files = []
+    output_dir = Path(output_dir).resolve()
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not d.startswith(".") and d not in SKIP_DIRS
+            and (Path(directory) / d).resolve() != output_dir
+        )
+        for filename in sorted(filenames):
+            if Path(filename).suffix.lower() in ASSET_EXTENSIONS:
+                files.append((Path(directory) / filename).relative_to(root).as_posix())
+    return files
+
+
+def _resolve(referrer, path, files):
+    """The site file a reference points at, or None for external/missing ones."""
+    if "://" in path or path.startswith(("//", "data:", "mailto:")):
+        return None
+    if path.startswith("/"):
+        target = path.lstrip("/")
+    else:
+        target = os.path.normpath(os.path.join(os.path.dirname(referrer), path))
+    target = Path(target).as_posix()
+    return target if target in files else None
+
+
+def scan_references(root, rel, files):
+    """[(reference text, site file)] for every local asset rel refers to."""
+    path = Path(root) / rel
+    suffix = path.suffix.lower()
+    if suffix == ".glb":
+        gltf, _ = read_glb_layout(path)
+        uris = [item["uri"] for key in ("images", "buffers") for item in gltf.get(key, [])
+                if "uri" in item]
+    elif suffix in SCANNED_EXTENSIONS:
+        text = path.read_text(encoding="utf-8", errors="surrogateescape")
+        uris = [match.group("path") for match in REFERENCE.finditer(text)]
+    else:
+        return []
+
+    references = []
+    for uri in dict.fromkeys(uris):
+        target = _resolve(rel, uri, files)
+        if target is not None and target != rel:
+            references.append((uri, target))
+    return references
+
+
+def _renamed(reference, target, outputs):
+    """reference with its file name swapped for the target's output name."""
+    prefix = reference[:len(reference) - len(Path(target).name)]
+    return prefix + Path(outputs[target]).name
+
+
+def _hashed_name(rel, digest):
+    path = Path(rel)
+    return path.with_name(f"{path.stem}.{digest[:HASH_LENGTH]}{path.suffix}").as_posix()
+
+
+def _write_atomic(path, data, mode_source):
+    """Write path via a temp file, with mode_source's permissions rather than
+    mkstemp's 0600, which a web server running as another user can't read."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    shutil.copymode(mode_source, temp_path)
+    os.replace(temp_path, path)
+
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _build_file(root, rel, references, outputs, output_dir, fingerprint):
+    """Write rel's output (references rewritten) and return its output path."""
+    source = Path(root) / rel
+    replacements = {ref: _renamed(ref, target, outputs)
+                    for ref, target in references if outputs[target] != target}
+
+    temp_dir = Path(output_dir) / ".tmp"
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+    os.close(fd)
+    temp_path = Path(temp_path)
+    try:
+        if replacements and source.suffix.lower() == ".glb":
+            gltf, bin_range = read_glb_layout(source)
+            for key in ("images", "buffers"):
+                for item in gltf.get(key, []):
+                    item["uri"] = replacements.get(item.get("uri"), item.get("uri"))
+            write_glb(temp_path, gltf, bin_range)
+        elif replacements:
+            text = source.read_text(encoding="utf-8", errors="surrogateescape")
+
+            def swap(match):
+                new = replacements.get(match.group("path"))
+                if new is None:
+                    return match.group(0)
+                return match.group("quote") + new + (match.group("suffix") or "")
+
+            _write_bytes(temp_path, REFERENCE.sub(swap, text).encode("utf-8", "surrogateescape"))
+        else:
+            shutil.copyfile(source, temp_path)
+
+        output = _hashed_name(rel, file_hash(temp_path)) if fingerprint else rel
+        destination = Path(output_dir) / output
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copymode(source, temp_path)
+        os.replace(temp_path, destination)
+        return output
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+
+def _compress(path, use_brotli):
+    """Write path.gz (and path.br) next to path (runs in a worker)."""
+    data = Path(path).read_bytes()
+    _write_atomic(Path(f"{path}.gz"), gzip.compress(data, GZIP_LEVEL, mtime=0), path)
+    if use_brotli:
+        import brotli
+        _write_atomic(Path(f"{path}.br"), brotli.compress(data, quality=BROTLI_QUALITY), path)
+    return str(path)
+
+
+def _build_order(files, references):
+    """Files ordered so every file comes after the files it references."""
+    order, state = [], {}
+
+    def visit(rel, chain):
+        if state.get(rel) == "done":
+            return
+        if state.get(rel) == "visiting":
+            raise ValueError("Circular asset references: " + " -> ".join(chain + [rel]))
+        state[rel] = "visiting"
+        for _, target in references.get(rel, []):
+            visit(target, chain + [rel])
+        state[rel] = "done"
+        order.append(rel)
+
+    for rel in files:
+        visit(rel, [])
+    return order
+
+
+def build_site(root=SITE_ROOT, output_dir=DEFAULT_OUTPUT_DIR, workers=None, force=False):
+    """Build root into output_dir and return the manifest.
+
+    Returns {"assets": {source: output}, "built": [...], "unchanged": n,
+    "compressed": n, "removed": n}.
+    """
+    root = Path(root)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index_path = output_dir / INDEX_NAME
+    index = {}
+    if index_path.exists() and not force:
+        with open(index_path) as f:
+            index = json.load(f)
+
+    files = find_site_files(root, output_dir)
+    file_set = set(files)
+
+    # Hash and scan only files whose mtime or size changed since the last build
+    entries = {}
+    for rel in files:
+        stat = (root / rel).stat()
+        previous = index.get(rel)
+        if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+            entry = dict(previous)
+            entry["references"] = [(ref, target) for ref, target in previous["references"]
+                                   if target in file_set]
+        else:
+            entry = {"sha256": file_hash(root / rel),
+                     "references": scan_references(root, rel, file_set)}
+        entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        entries[rel] = entry
+
+    references = {rel: entry["references"] for rel, entry in entries.items()}
+    referenced = {target for refs in references.values() for _, target in refs}
+
+    outputs = {}
+    built = []
+    for rel in _build_order(files, references):
+        entry = entries[rel]
+        fingerprint = rel in referenced and Path(rel).suffix.lower() not in PAGE_EXTENSIONS
+        # What the output depends on: the source plus the names it will refer to
+        key = hashlib.sha256(json.dumps(
+            [entry["sha256"], fingerprint, sorted((ref, outputs[t]) for ref, t in references[rel])]
+        ).encode()).hexdigest()
+        previous = index.get(rel)
+        if previous and previous.get("key") == key and (output_dir / previous["output"]).exists():
+            entry.update(key=key, output=previous["output"])
+        else:
+            entry.update(key=key, output=_build_file(root, rel, references[rel], outputs,
+                                                     output_dir, fingerprint))
+            built.append(rel)
+        outputs[rel] = entry["output"]
+
+    # Outputs of earlier builds that nothing produces any more
+    current = set(outputs.values())
+    removed = 0
+    for old in {entry["output"] for entry in index.values()} - current:
+        for stale in (old, f"{old}.gz", f"{old}.br"):
+            path = output_dir / stale
+            if path.exists():
+                path.unlink()
+                removed += 1
+    shutil.rmtree(output_dir / ".tmp", ignore_errors=True)
+
+    # Precompress new outputs, plus any whose .gz/.br went missing
+    use_brotli = brotli_available()
+    to_compress = [
+        output_dir / output for rel, output in outputs.items()
+        if Path(output).suffix.lower() in COMPRESSED_EXTENSIONS and (
+            rel in built or not Path(f"{output_dir / output}.gz").exists() or
+            (use_brotli and not Path(f"{output_dir / output}.br").exists()))
+    ]
+    if to_compress:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_compress, to_compress, [use_brotli] * len(to_compress)))
+
+    manifest = {"assets": dict(sorted(outputs.items())), "brotli": use_brotli}
+    with open(output_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+    _write_headers(output_dir, [output for rel, output in outputs.items() if output != rel])
+    with open(index_path, "w") as f:
+        json.dump(entries, f, indent=1)
+
+    manifest.update(built=built, unchanged=len(files) - len(built),
+                    compressed=len(to_compress), removed=removed)
+    return manifest
+
+
+def _write_headers(output_dir, hashed):
+    """Cloudflare Pages _headers marking fingerprinted files immutable."""
+    hashed = sorted(hashed)
+    if len(hashed) > MAX_HEADER_RULES:
+        print(f"⚠️  {len(hashed)} hashed assets but _headers allows {MAX_HEADER_RULES} rules; "
+              f"the rest get default caching")
+    rules = [f"/{output}\n  Cache-Control: {IMMUTABLE}\n" for output in hashed[:MAX_HEADER_RULES]]
+    with open(Path(output_dir) / HEADERS_NAME, "w") as f:
+        f.write("\n".join(rules))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the site with hashed, precompressed assets")
+    parser.add_argument("--root", default=str(SITE_ROOT), help="Site source directory")
+    parser.add_argument("--output", default=None, help="Build directory (default: <root>/dist)")
+    parser.add_argument("--workers", type=int, default=None, help="Compression processes")
+    parser.add_argument("--force", action="store_true", help="Ignore the build index and rebuild everything")
+    args = parser.parse_args()
+
+    root = Path(args.root)
+    output_dir = Path(args.output) if args.output else root / "dist"
+
+    start = time.time()
+    try:
+        manifest = build_site(root, output_dir, workers=args.workers, force=args.force)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    hashed = {rel: out for rel, out in manifest["assets"].items() if rel != out}
+    print(f"✅ Site built in {time.time() - start:.2f}s: {len(manifest['built'])} built, "
+          f"{manifest['unchanged']} unchanged, {manifest['compressed']} compressed, "
+          f"{manifest['removed']} stale file(s) removed")
+    if not manifest["brotli"]:
+        print("   (brotli not installed - only .gz siblings written; pip install brotli)")
+    for rel in manifest["built"]:
+        print(f"   {rel} -> {hashed[rel]}" if rel in hashed else f"   {rel}")
+    print(f"\nOutput: {output_dir} ({len(hashed)} fingerprinted asset(s))")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,108 +4,96 @@ Wilhelm Customizer - Transform the parrot into Wilhelm
 Applies brand colors and prepares for customization
 """
 
-import json
-import struct
 import os
+import string
 from pathlib import Path
 
+from glb import read_glb_layout, write_glb
+
 # Wilhelm brand colors
 CORAL = [0.914, 0.271, 0.376, 1.0]  # #e94560
 CREAM = [0.98, 0.96, 0.92, 1.0]     # Off-white
 DARK_NAVY = [0.102, 0.102, 0.18, 1.0]  # #1a1a2e
 
-def customize_wilhelm(input_path, output_path):
-    """Customize the parrot GLB with Wilhelm's brand colors."""
-    
-    with open(input_path, 'rb') as f:
-        data = f.read()
-    
-    # Parse GLB
-    header = data[:12]
-    magic, version, total_length = struct.unpack('<4sII', header)
-    
-    # Find JSON chunk
-    offset = 12
-    json_chunk_data = None
-    json_chunk_start = None
-    json_chunk_length = None
-    bin_chunk_data = None
-    
-    while offset < total_length:
-        chunk_header = data[offset:offset+8]
-        chunk_length, chunk_type = struct.unpack('<I4s', chunk_header)
-        chunk_data = data[offset+8:offset+8+chunk_length]
-        
-        if chunk_type == b'JSON':
-            json_chunk_data = chunk_data
-            json_chunk_start = offset
-            json_chunk_length = chunk_length
-        elif chunk_type == b'BIN\x00':
-            bin_chunk_data = chunk_data
-        
-        offset += 8 + chunk_length
-    
-    # Parse and modify JSON
-    gltf = json.loads(json_chunk_data.decode('utf-8'))
-    
+def hex_to_rgba(color):
+    """Convert '#e94560' or '#e45' (or an [r, g, b(, a)] list) to a glTF color factor."""
+    if isinstance(color, str):
+        digits = color.lstrip('#')
+        if len(digits) == 3:
+            digits = ''.join(c * 2 for c in digits)
+        if len(digits) != 6 or any(c not in string.hexdigits for c in digits):
+            raise ValueError(f"Invalid color {color!r}: expected #rrggbb or #rgb")
+        return [round(int(digits[i:i + 2], 16) / 255, 3) for i in (0, 2, 4)] + [1.0]
+    return list(color) + [1.0] * (4 - len(color))
+
+
+def apply_wilhelm_palette(gltf, base_color=CORAL, metallic=0.1, roughness=0.6,
+                          emissive=(0.05, 0.02, 0.02), brand_color='#e94560'):
+    """Recolor every material in gltf with Wilhelm's brand colors (in place)."""
+
     # Modify materials to Wilhelm colors
     for mat in gltf.get('materials', []):
         mat['name'] = 'Wilhelm'
         if 'pbrMetallicRoughness' in mat:
             # Create a gradient effect - main body coral, accents cream
-            mat['pbrMetallicRoughness']['baseColorFactor'] = CORAL
-            mat['pbrMetallicRoughness']['metallicFactor'] = 0.1
-            mat['pbrMetallicRoughness']['roughnessFactor'] = 0.6
-        
+            mat['pbrMetallicRoughness']['baseColorFactor'] = list(base_color)
+            mat['pbrMetallicRoughness']['metallicFactor'] = metallic
+            mat['pbrMetallicRoughness']['roughnessFactor'] = roughness
+
         # Add emissive for subtle glow
-        mat['emissiveFactor'] = [0.05, 0.02, 0.02]
-    
+        mat['emissiveFactor'] = list(emissive)
+
     # Add custom extras for Wilhelm branding
     gltf['extras'] = {
         'wilhelm': {
             'version': '1.0',
-            'brandColor': '#e94560',
+            'brandColor': brand_color,
             'customized': True
         }
     }
-    
-    # Serialize modified JSON
-    new_json = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
-    new_json_length = len(new_json)
-    
-    # Pad to 4-byte alignment
-    padding_needed = (4 - (new_json_length % 4)) % 4
-    new_json_padded = new_json + b' ' * padding_needed
-    new_json_length_padded = len(new_json_padded)
-    
-    # Rebuild GLB
-    new_total_length = 12 + 8 + new_json_length_padded + 8 + len(bin_chunk_data)
-    
-    new_glb = bytearray()
-    new_glb.extend(header[:8])  # magic + version
-    new_glb.extend(struct.pack('<I', new_total_length))  # new total length
-    
-    # JSON chunk
-    new_glb.extend(struct.pack('<I', new_json_length_padded))
-    new_glb.extend(b'JSON')
-    new_glb.extend(new_json_padded)
-    
-    # BIN chunk
-    new_glb.extend(struct.pack('<I', len(bin_chunk_data)))
-    new_glb.extend(b'BIN\x00')
-    new_glb.extend(bin_chunk_data)
-    
-    # Write output
-    with open(output_path, 'wb') as f:
-        f.write(new_glb)
-    
+
+    return gltf
+
+
+def customize_wilhelm(input_path, output_path, merge=False, optimize=False, compress=False):
+    """Customize the parrot GLB with Wilhelm's brand colors.
+
+    The input is memory-mapped and only its JSON chunk is rewritten; the BIN
+    chunk is copied file-to-file, so peak memory tracks the JSON size rather
+    than the size of the model.
+
+    With merge=True the now identical materials are deduplicated and their
+    primitives merged into one draw call each by merge_wilhelm.
+    With optimize=True the output is then quantized and cache-optimized by
+    optimize_wilhelm (which needs numpy and loads the BIN chunk).
+    With compress=True the geometry streams are finally encoded with
+    EXT_meshopt_compression; viewers then need a meshopt decoder.
+    """
+
+    gltf, bin_range = read_glb_layout(input_path)
+    apply_wilhelm_palette(gltf)
+    output_length = write_glb(output_path, gltf, bin_range)
+
+    if merge:
+        from merge_wilhelm import merge_glb
+        output_length = merge_glb(output_path, output_path)['bytes_after']
+
+    if optimize:
+        from optimize_wilhelm import optimize_glb
+        output_length = optimize_glb(output_path, output_path)['bytes_after']
+
+    if compress:
+        from meshopt_compression import compress_glb
+        output_length = compress_glb(output_path, output_path)['bytes_after']
+
     print(f"✅ Wilhelm customized!")
-    print(f"   Input: {input_path} ({len(data):,} bytes)")
-    print(f"   Output: {output_path} ({len(new_glb):,} bytes)")
+    print(f"   Input: {input_path} ({os.path.getsize(input_path):,} bytes)")
+    print(f"   Output: {output_path} ({output_length:,} bytes)")
     print(f"   Brand color: #e94560 (coral)")
 
 if __name__ == '__main__':
-    input_file = '/home/captain_tommy/.openclaw/workspace/twe_website/experiments/models/wilhelm/Parrot.glb'
-    output_file = '/home/captain_tommy/.openclaw/workspace/twe_website/experiments/models/wilhelm/Wilhelm-v1.glb'
-    
-    customize_wilhelm(input_file, output_file)
\ No newline at end of file
+    models_dir = Path(__file__).resolve().parent / 'models' / 'wilhelm'
+    input_file = models_dir / 'Parrot.glb'
+    output_file = models_dir / 'Wilhelm-v1.glb'
+
+    customize_wilhelm(input_file, output_file)
@@ -2,12 +2,15 @@
 """Generate Wilhelm parrot concept art using OpenAI DALL-E 3"""
 import openai
 import os
-import requests
 from pathlib import Path
 
+import http_client
+from art_cache import CacheKey, get_cache
+
 # Setup
+cache = get_cache()
 openai.api_key = os.getenv("OPENAI_API_KEY")
-output_dir = Path("/home/captain_tommy/.openclaw/workspace/twe_website/experiments/concept-art")
+output_dir = Path(__file__).resolve().parent / "concept-art"
 output_dir.mkdir(parents=True, exist_ok=True)
 
 # Wilhelm character description for consistency
@@ -69,6 +72,13 @@ def generate_image(variation):
     """Generate image using DALL-E 3"""
     print(f"Generating: {variation['name']}...")
     
+    # Reuse a previous result for the same prompt and size
+    output_path = output_dir / f"wilhelm-{variation['name']}.png"
+    cache_key = CacheKey("openai", "dall-e-3", variation['prompt'], size="1024x1024")
+    if cache.restore(cache_key, output_path):
+        print(f"✓ Cached: {output_path}")
+        return True
+    
     try:
         response = openai.images.generate(
             model="dall-e-3",
@@ -81,16 +91,11 @@ def generate_image(variation):
         # Get the image URL
         image_url = response.data[0].url
         
-        # Download the image
-        img_response = requests.get(image_url, timeout=60)
-        img_response.raise_for_status()
-        
-        # Save the image
-        output_path = output_dir / f"wilhelm-{variation['name']}.png"
-        with open(output_path, "wb") as f:
-            f.write(img_response.content)
+        # Stream the image to disk (validated, renamed into place when complete)
+        http_client.download_image(image_url, output_path)
         
         print(f"✓ Saved: {output_path}")
+        cache.put(cache_key, output_path)
         return True
         
     except Exception as e:
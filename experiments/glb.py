@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+GLB - Read and write binary glTF without loading it
+Indexes the chunks of a memory-mapped GLB, exposes bufferViews and accessors
+as zero-copy numpy views into the BIN chunk, and writes GLBs back with every
+bufferView 4-byte aligned. Shared by the customizer, optimizer, converters
+and build tools
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    # Container reads and writes work without numpy; accessors need it
+    np = None
+
+# GLB container constants
+GLB_MAGIC = b'glTF'
+GLB_VERSION = 2
+CHUNK_JSON = b'JSON'
+CHUNK_BIN = b'BIN\x00'
+
+# Copy the BIN chunk through a fixed 1 MiB buffer when the kernel can't do it
+COPY_BUFFER_SIZE = 1 << 20
+
+# glTF accessor componentType -> little-endian numpy dtype
+COMPONENT_FORMATS = {
+    5120: 'i1',   # BYTE
+    5121: 'u1',   # UNSIGNED_BYTE
+    5122: '<i2',  # SHORT
+    5123: '<u2',  # UNSIGNED_SHORT
+    5125: '<u4',  # UNSIGNED_INT
+    5126: '<f4',  # FLOAT
+}
+if np is not None:
+    COMPONENT_DTYPES = {component: np.dtype(f) for component, f in COMPONENT_FORMATS.items()}
+    DTYPE_COMPONENTS = {dtype: component for component, dtype in COMPONENT_DTYPES.items()}
+TYPE_SIZES = {'SCALAR': 1, 'VEC2': 2, 'VEC3': 3, 'VEC4': 4, 'MAT2': 4, 'MAT3': 9, 'MAT4': 16}
+SIZE_TYPES = {1: 'SCALAR', 2: 'VEC2', 3: 'VEC3', 4: 'VEC4'}
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+# Mode a plain open() would give a new file; read once, since os.umask()
+# can only be queried by setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+NEW_FILE_MODE = 0o666 & ~_UMASK
+
+# A byte range inside a file on disk - lets the BIN chunk pass straight through
+FileRange = namedtuple('FileRange', ['path', 'offset', 'length'])
+
+
+def padding(length, alignment=4):
+    """Bytes needed after length to reach the next multiple of alignment."""
+    return (alignment - length % alignment) % alignment
+
+
+def _chunk_index(mm, path):
+    """[(chunk type, data offset, data length)] from a GLB's chunk headers."""
+    if len(mm) < 12:
+        raise ValueError(f"{path} is not a GLB file")
+    magic, version, total_length = struct.unpack_from('<4sII', mm, 0)
+    if magic != GLB_MAGIC:
+        raise ValueError(f"{path} is not a GLB file")
+    total_length = min(total_length, len(mm))
+
+    chunks = []
+    offset = 12
+    while offset + 8 <= total_length:
+        chunk_length, chunk_type = struct.unpack_from('<I4s', mm, offset)
+        start = offset + 8
+        chunks.append((chunk_type, start, min(chunk_length, total_length - start)))
+        offset = start + chunk_length
+    return chunks
+
+
+def read_glb_layout(input_path):
+    """Parse a GLB's chunk headers from a memory map.
+
+    Only the JSON chunk is copied out of the file; the BIN chunk is returned
+    as a FileRange so it never has to be loaded into memory.
+    Returns (gltf, bin_range) where bin_range is None for JSON-only files.
+    """
+    with open(input_path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        gltf = None
+        bin_range = None
+        for chunk_type, start, length in _chunk_index(mm, input_path):
+            if chunk_type == CHUNK_JSON and gltf is None:
+                gltf = json.loads(mm[start:start + length])
+            elif chunk_type == CHUNK_BIN and bin_range is None:
+                bin_range = FileRange(str(input_path), start, length)
+
+    if gltf is None:
+        raise ValueError(f"{input_path} has no JSON chunk")
+    return gltf, bin_range
+
+
+def read_accessor(gltf, bin_data, index, decode=False):
+    """Accessor `index` as a (count, components) numpy array over bin_data.
+
+    The array is a view: byteOffset and byteStride become the array's offset
+    and row stride, so nothing is copied (and it is read-only when bin_data
+    is). Sparse accessors, accessors without a bufferView and decode=True on
+    normalized integers (converted to floats in [-1, 1] or [0, 1]) return a
+    new array instead.
+    """
+    accessor = gltf['accessors'][index]
+    dtype = COMPONENT_DTYPES[accessor['componentType']]
+    components = TYPE_SIZES[accessor['type']]
+    count = accessor['count']
+
+    if 'bufferView' not in accessor or not count:
+        values = np.zeros((count, components), dtype)
+    else:
+        view = gltf['bufferViews'][accessor['bufferView']]
+        if view.get('buffer', 0) != 0:
+            # e.g. the fallback buffer of EXT_meshopt_compression, which holds no data
+            raise ValueError(f"Accessor {index} is not stored in the BIN chunk")
+        element_size = dtype.itemsize * components
+        stride = view.get('byteStride') or element_size
+        start = view.get('byteOffset', 0) + accessor.get('byteOffset', 0)
+        if count and start + (count - 1) * stride + element_size > view.get('byteOffset', 0) + view['byteLength']:
+            raise ValueError(f"Accessor {index} runs past the end of bufferView {accessor['bufferView']}")
+        values = np.ndarray((count, components), dtype, buffer=bin_data, offset=start,
+                            strides=(stride, dtype.itemsize))
+
+    sparse = accessor.get('sparse')
+    if sparse:
+        values = values.copy()
+        indices_view = gltf['bufferViews'][sparse['indices']['bufferView']]
+        values_view = gltf['bufferViews'][sparse['values']['bufferView']]
+        sparse_indices = np.frombuffer(
+            bin_data, COMPONENT_DTYPES[sparse['indices']['componentType']], count=sparse['count'],
+            offset=indices_view.get('byteOffset', 0) + sparse['indices'].get('byteOffset', 0))
+        sparse_values = np.frombuffer(
+            bin_data, dtype, count=sparse['count'] * components,
+            offset=values_view.get('byteOffset', 0) + sparse['values'].get('byteOffset', 0))
+        values[sparse_indices] = sparse_values.reshape(-1, components)
+
+    if decode and accessor.get('normalized'):
+        info = np.iinfo(dtype)
+        values = values.astype(np.float32) / info.max
+        if info.min < 0:
+            values = np.maximum(values, -1.0)
+    return values
+
+
+def pad_columns(values):
+    """Pad rows with zero columns until each vertex is a multiple of 4 bytes."""
+    components = values.shape[1]
+    while (components * values.dtype.itemsize) % 4:
+        components += 1
+    if components == values.shape[1]:
+        return values
+    padded = np.zeros((len(values), components), values.dtype)
+    padded[:, :values.shape[1]] = values
+    return padded
+
+
+def interleave(columns):
+    """Pack per-vertex arrays side by side into one (count, stride) byte array.
+
+    Each array's rows are padded to 4 bytes first, so every attribute stays
+    aligned. Returns the packed rows and each array's byte offset in a row.
+    """
+    rows = [np.ascontiguousarray(pad_columns(values)) for values in columns]
+    count = len(rows[0])
+    rows = [values.view(np.uint8).reshape(count, -1) for values in rows]
+    offsets = [0]
+    for values in rows[:-1]:
+        offsets.append(offsets[-1] + values.shape[1])
+    return np.hstack(rows), offsets
+
+
+class GLB:
+    """A GLB file opened through a read-only memory map.
+
+    Opening reads only the chunk headers. The JSON is parsed on first use
+    of .gltf, and buffer_view()/accessor() return views straight into the
+    mapped BIN chunk, so inspecting a model touches only the pages it reads.
+    Views stay valid after close(); the map is released with the last one.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.chunks = _chunk_index(self._map, path)
+        except ValueError:
+            self._map.close()
+            raise
+        self._gltf = None
+        self._bin = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _chunk(self, chunk_type):
+        for found_type, start, length in self.chunks:
+            if found_type == chunk_type:
+                return start, length
+        return None
+
+    @property
+    def gltf(self) -> dict:
+        if self._gltf is None:
+            chunk = self._chunk(CHUNK_JSON)
+            if chunk is None:
+                raise ValueError(f"{self.path} has no JSON chunk")
+            start, length = chunk
+            self._gltf = json.loads(self._map[start:start + length])
+        return self._gltf
+
+    @property
+    def bin_range(self):
+        """The BIN chunk as a FileRange for write_glb(), or None."""
+        chunk = self._chunk(CHUNK_BIN)
+        return FileRange(self.path, *chunk) if chunk else None
+
+    @property
+    def bin(self) -> memoryview:
+        """The BIN chunk as a read-only memoryview (empty if there is none)."""
+        if self._bin is None:
+            start, length = self._chunk(CHUNK_BIN) or (0, 0)
+            self._bin = memoryview(self._map)[start:start + length]
+        return self._bin
+
+    def buffer_view(self, index) -> memoryview:
+        view = self.gltf['bufferViews'][index]
+        if view.get('buffer', 0) != 0 or 'uri' in self.gltf['buffers'][view.get('buffer', 0)]:
+            raise ValueError(f"bufferView {index} is not stored in the GLB's BIN chunk")
+        start = view.get('byteOffset', 0)
+        return self.bin[start:start + view['byteLength']]
+
+    def accessor(self, index, decode=False):
+        """Accessor `index` as a zero-copy numpy view; see read_accessor()."""
+        return read_accessor(self.gltf, self.bin, index, decode)
+
+    def attributes(self, mesh, primitive=0, decode=False) -> dict:
+        """{attribute name: array} for one primitive of a mesh."""
+        attributes = self.gltf['meshes'][mesh]['primitives'][primitive]['attributes']
+        return {name: self.accessor(index, decode) for name, index in attributes.items()}
+
+    def close(self):
+        self._bin = None
+        try:
+            self._map.close()
+        except BufferError:
+            # Arrays handed out still point into the map
+            pass
+
+
+def _copy_range(src_path, offset, length, dst):
+    """Copy a byte range from src_path to the end of the open file dst.
+
+    Uses copy_file_range/sendfile so the bytes stay in the kernel, falling
+    back to a reusable buffer and memoryview slices on other platforms.
+    """
+    dst.flush()
+    dst_fd = dst.fileno()
+
+    with open(src_path, 'rb') as src:
+        src_fd = src.fileno()
+        remaining = length
+
+        for kernel_copy in ('copy_file_range', 'sendfile'):
+            if not remaining or not hasattr(os, kernel_copy):
+                continue
+            try:
+                while remaining:
+                    if kernel_copy == 'copy_file_range':
+                        copied = os.copy_file_range(src_fd, dst_fd, remaining, offset)
+                    else:
+                        copied = os.sendfile(dst_fd, src_fd, offset, remaining)
+                    if copied == 0:
+                        break
+                    offset += copied
+                    remaining -= copied
+            except OSError:
+                # Cross-device copies, old kernels, non-Linux sendfile targets...
+                continue
+
+        if remaining:
+            src.seek(offset)
+            buffer = memoryview(bytearray(min(COPY_BUFFER_SIZE, remaining)))
+            while remaining:
+                n = src.readinto(buffer[:min(len(buffer), remaining)])
+                if not n:
+                    raise IOError(f"{src_path} ended {remaining:,} bytes early")
+                os.write(dst_fd, buffer[:n])
+                remaining -= n
+
+    # The kernel moved the file offset under the buffered writer
+    dst.seek(0, os.SEEK_END)
+
+
+def _piece_length(piece):
+    return piece.length if isinstance(piece, FileRange) else piece.nbytes
+
+
+def write_glb(output_path, gltf, bin_chunk=None):
+    """Write gltf and an optional BIN chunk to output_path as a GLB.
+
+    bin_chunk may be a FileRange (copied file-to-file), a bytes-like object,
+    or a list of either written back to back without joining them.
+    Returns the total number of bytes written.
+    """
+    json_bytes = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_bytes += b' ' * padding(len(json_bytes))
+
+    if bin_chunk is None:
+        pieces = []
+    elif isinstance(bin_chunk, list):
+        pieces = bin_chunk
+    else:
+        pieces = [bin_chunk]
+    pieces = [p if isinstance(p, FileRange) else memoryview(p).cast('B') for p in pieces]
+
+    bin_length = sum(_piece_length(p) for p in pieces)
+    bin_padding = padding(bin_length)
+
+    total_length = 12 + 8 + len(json_bytes)
+    if bin_chunk is not None:
+        total_length += 8 + bin_length + bin_padding
+
+    # Write beside output_path and swap it in: a FileRange may point into the
+    # file being replaced, so truncating output_path first would corrupt it
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(struct.pack('<4sII', GLB_MAGIC, GLB_VERSION, total_length))
+
+            # JSON chunk
+            f.write(struct.pack('<I4s', len(json_bytes), CHUNK_JSON))
+            f.write(json_bytes)
+
+            # BIN chunk
+            if bin_chunk is not None:
+                f.write(struct.pack('<I4s', bin_length + bin_padding, CHUNK_BIN))
+                for piece in pieces:
+                    if isinstance(piece, FileRange):
+                        _copy_range(piece.path, piece.offset, piece.length, f)
+                    else:
+                        f.write(piece)
+                f.write(b'\x00' * bin_padding)
+        # Keep the replaced file's permissions (mkstemp creates 0600)
+        try:
+            os.chmod(temp_path, os.stat(output_path).st_mode & 0o7777)
+        except FileNotFoundError:
+            os.chmod(temp_path, NEW_FILE_MODE)
+        os.replace(temp_path, output_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return total_length
+
+
+class GlbBuilder:
+    """Collects bufferViews/accessors and the BIN pieces that back them.
+
+    Every view starts on a 4-byte boundary, and vertex attributes whose rows
+    aren't a multiple of 4 bytes get zero-padded rows and a byteStride.
+    """
+
+    def __init__(self, gltf):
+        self.gltf = gltf
+        self.pieces = []
+        self.offset = 0
+
+    def add_view(self, data, target=None, byte_stride=None):
+        data = data if isinstance(data, FileRange) else memoryview(data).cast('B')
+        length = _piece_length(data)
+        view = {'buffer': 0, 'byteOffset': self.offset, 'byteLength': length}
+        if byte_stride:
+            view['byteStride'] = byte_stride
+        if target:
+            view['target'] = target
+        self.pieces.append(data)
+        pad = padding(length)
+        if pad:
+            self.pieces.append(b'\x00' * pad)
+        self.offset += length + pad
+        self.gltf.setdefault('bufferViews', []).append(view)
+        return len(self.gltf['bufferViews']) - 1
+
+    def add_accessor(self, values, target, accessor_type, component_type, bounds=False,
+                     normalized=False):
+        values = np.asarray(values)
+        rows = values.reshape(len(values), -1)
+        byte_stride = None
+        if target == ARRAY_BUFFER and (rows.shape[1] * rows.dtype.itemsize) % 4:
+            rows = pad_columns(rows)
+            byte_stride = rows.shape[1] * rows.dtype.itemsize
+        accessor = {
+            'bufferView': self.add_view(np.ascontiguousarray(rows), target, byte_stride),
+            'componentType': component_type,
+            'count': len(values),
+            'type': accessor_type,
+        }
+        if normalized:
+            accessor['normalized'] = True
+        if bounds:
+            accessor['min'] = values.reshape(len(values), -1).min(axis=0).tolist()
+            accessor['max'] = values.reshape(len(values), -1).max(axis=0).tolist()
+        self.gltf.setdefault('accessors', []).append(accessor)
+        return len(self.gltf['accessors']) - 1
+
+    def finish(self):
+        """Set gltf's buffer to the BIN length and return the pieces for write_glb()."""
+        self.gltf['buffers'] = [{'byteLength': self.offset}] if self.offset else []
+        return self.pieces
+
+
+def existing_views(gltf, bin_data):
+    """gltf's bufferViews as (view dict, zero-copy slice of bin_data) pairs.
+
+    The pairs are the input format of compact_buffers(); offsets and lengths
+    are dropped from the dicts because compaction recomputes them.
+    """
+    views = []
+    for view in gltf.get('bufferViews', []):
+        start = view.get('byteOffset', 0)
+        data = memoryview(bin_data)[start:start + view['byteLength']]
+        views.append(({k: v for k, v in view.items() if k not in ('buffer', 'byteOffset', 'byteLength')}, data))
+    return views
+
+
+def compact_buffers(gltf, views):
+    """Drop accessors and bufferViews nothing references any more.
+
+    views holds (bufferView dict, bytes-like or FileRange) pairs for every
+    view, old and new. Surviving views are repacked back to back, each on a
+    4-byte boundary. Returns the BIN chunk as a list of pieces and rewrites
+    gltf in place.
+    """
+    used_accessors = set()
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh['primitives']:
+            used_accessors.update(primitive['attributes'].values())
+            if 'indices' in primitive:
+                used_accessors.add(primitive['indices'])
+            for target in primitive.get('targets', []):
+                used_accessors.update(target.values())
+    for skin in gltf.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            used_accessors.add(skin['inverseBindMatrices'])
+    for animation in gltf.get('animations', []):
+        for sampler in animation['samplers']:
+            used_accessors.update((sampler['input'], sampler['output']))
+
+    accessor_remap = {}
+    accessors = []
+    for old_index in sorted(used_accessors):
+        accessor_remap[old_index] = len(accessors)
+        accessors.append(gltf['accessors'][old_index])
+
+    def remap_accessor(index):
+        return accessor_remap[index]
+
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh['primitives']:
+            primitive['attributes'] = {k: remap_accessor(v) for k, v in primitive['attributes'].items()}
+            if 'indices' in primitive:
+                primitive['indices'] = remap_accessor(primitive['indices'])
+            if 'targets' in primitive:
+                primitive['targets'] = [{k: remap_accessor(v) for k, v in target.items()}
+                                        for target in primitive['targets']]
+    for skin in gltf.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            skin['inverseBindMatrices'] = remap_accessor(skin['inverseBindMatrices'])
+    for animation in gltf.get('animations', []):
+        for sampler in animation['samplers']:
+            sampler['input'] = remap_accessor(sampler['input'])
+            sampler['output'] = remap_accessor(sampler['output'])
+    gltf['accessors'] = accessors
+
+    used_views = set()
+    for accessor in accessors:
+        if 'bufferView' in accessor:
+            used_views.add(accessor['bufferView'])
+        sparse = accessor.get('sparse')
+        if sparse:
+            used_views.update((sparse['indices']['bufferView'], sparse['values']['bufferView']))
+    for image in gltf.get('images', []):
+        if 'bufferView' in image:
+            used_views.add(image['bufferView'])
+
+    view_remap = {}
+    buffer_views = []
+    pieces = []
+    offset = 0
+    for old_index in sorted(used_views):
+        view, data = views[old_index]
+        if not isinstance(data, FileRange):
+            data = memoryview(data).cast('B')
+        length = _piece_length(data)
+        view = dict(view, buffer=0, byteOffset=offset, byteLength=length)
+        view_remap[old_index] = len(buffer_views)
+        buffer_views.append(view)
+        pieces.append(data)
+        pad = padding(length)
+        pieces.append(b'\x00' * pad)
+        offset += length + pad
+
+    for accessor in accessors:
+        if 'bufferView' in accessor:
+            accessor['bufferView'] = view_remap[accessor['bufferView']]
+        sparse = accessor.get('sparse')
+        if sparse:
+            sparse['indices']['bufferView'] = view_remap[sparse['indices']['bufferView']]
+            sparse['values']['bufferView'] = view_remap[sparse['values']['bufferView']]
+    for image in gltf.get('images', []):
+        if 'bufferView' in image:
+            image['bufferView'] = view_remap[image['bufferView']]
+
+    gltf['bufferViews'] = buffer_views
+    gltf['buffers'] = [{'byteLength': offset}] if offset else []
+    if not buffer_views:
+        del gltf['bufferViews']
+    return pieces
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show the meshes and accessors of a GLB")
+    parser.add_argument("input", help="GLB file")
+    args = parser.parse_args()
+
+    with GLB(args.input) as glb:
+        gltf = glb.gltf
+        print(f"📦 {args.input} ({os.path.getsize(args.input):,} bytes, "
+              f"BIN {len(glb.bin):,} bytes)")
+        print(f"   {len(gltf.get('meshes', []))} meshes, {len(gltf.get('accessors', []))} accessors, "
+              f"{len(gltf.get('bufferViews', []))} bufferViews, {len(gltf.get('materials', []))} materials")
+        for mesh_index, mesh in enumerate(gltf.get('meshes', [])):
+            print(f"\n   Mesh {mesh_index}: {mesh.get('name', '')}")
+            for primitive_index, primitive in enumerate(mesh['primitives']):
+                count = gltf['accessors'][primitive['indices']]['count'] if 'indices' in primitive else None
+                triangles = f", {count // 3:,} triangles" if count is not None else ""
+                print(f"     Primitive {primitive_index} (material {primitive.get('material', '-')}{triangles})")
+                try:
+                    attributes = glb.attributes(mesh_index, primitive_index)
+                except ValueError as e:
+                    print(f"       {e}")
+                    continue
+                for name, values in attributes.items():
+                    stride = values.strides[0]
+                    print(f"       {name:<12}{len(values):>9,} x {values.shape[1]} {values.dtype}"
+                          f"  (stride {stride})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client - One pooled keep-alive session for every generator
+Connection limits and timeouts for all image API calls live here, along with
+the streaming, resumable, validated image download path
+"""
+
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Optional, Union
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from retry import RetryableError, get_guard, parse_retry_after
+from tracing import get_tracer
+
+# Distinct hosts whose connection pools are kept alive at once
+POOL_HOSTS = 8
+
+# Open connections per host; callers beyond this wait for a free one
+MAX_CONNECTIONS_PER_HOST = 4
+
+# (connect, read) timeouts in seconds for each kind of call
+TIMEOUTS = {
+    "api": (10, 60),        # submit a job, small JSON responses
+    "poll": (10, 30),       # status checks
+    "download": (10, 60),   # fetch a finished image
+    "generate": (10, 180),  # synchronous generation (Pollinations, HuggingFace)
+}
+
+# Responses that mean "try again later" rather than "this request is wrong"
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+
+# Downloads are written through in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Connection drops a GET download resumes from (with a Range request)
+DOWNLOAD_ATTEMPTS = 3
+
+# Anything smaller than this is an error page, not an image
+MIN_IMAGE_BYTES = 1000
+
+# Leading bytes that identify each image format we accept
+IMAGE_SIGNATURES = {
+    b'\x89PNG\r\n\x1a\n': 'png',
+    b'\xff\xd8\xff': 'jpeg',
+    b'GIF87a': 'gif',
+    b'GIF89a': 'gif',
+}
+IMAGE_HEADER_BYTES = 16
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_HOSTS,
+                    pool_maxsize=MAX_CONNECTIONS_PER_HOST,
+                    pool_block=True
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                _session = session
+    return _session
+
+
+def raise_for_retry(response: requests.Response):
+    """Raise RetryableError (honouring Retry-After) for 429/5xx responses."""
+    if response.status_code in RETRY_STATUSES:
+        response.content  # read the (small) error body so the connection is reused
+        raise RetryableError(
+            f"HTTP {response.status_code}",
+            retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            response=response
+        )
+
+
+def request(method: str, url: str, kind: str = "api", provider: Optional[str] = None,
+            attempts: Optional[int] = None, cancel: Optional[threading.Event] = None,
+            **kwargs) -> requests.Response:
+    """Send a request on the shared session with the timeout for `kind`.
+
+    With a provider name the call goes through that provider's retry guard:
+    it waits for the provider's token bucket, fails fast while its circuit
+    is open, and retries dropped connections and 429/5xx responses with
+    backoff. If retries run out the last error response is returned as-is.
+    """
+    kwargs.setdefault("timeout", TIMEOUTS[kind])
+    session = get_session()
+    if provider is None:
+        return session.request(method, url, **kwargs)
+
+    def send():
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryableError(str(e)) from e
+        raise_for_retry(response)
+        return response
+
+    try:
+        return get_guard(provider).call(send, attempts=attempts, cancel=cancel)
+    except RetryableError as e:
+        if e.response is not None:
+            return e.response
+        raise e.__cause__ or e
+
+
+def get(url: str, kind: str = "download", **kwargs) -> requests.Response:
+    return request("GET", url, kind, **kwargs)
+
+
+def post(url: str, kind: str = "api", **kwargs) -> requests.Response:
+    return request("POST", url, kind, **kwargs)
+
+
+class DownloadError(Exception):
+    """A download failed, was cut short or was not an image."""
+
+
+class DownloadCancelled(DownloadError):
+    """The caller's cancel event was set mid-download."""
+
+
+class _Truncated(Exception):
+    pass
+
+
+def sniff_image(header: bytes) -> Optional[str]:
+    """Image format from the first IMAGE_HEADER_BYTES of a file, or None.
+
+    PNGs must start with an IHDR chunk; WebP is a RIFF container tagged WEBP.
+    """
+    if header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        return 'webp'
+    for signature, image_format in IMAGE_SIGNATURES.items():
+        if header.startswith(signature):
+            if image_format == 'png' and header[12:16] != b'IHDR':
+                return None
+            return image_format
+    return None
+
+
+def _check_trailer(image_format: str, tail: bytes):
+    """Catch files that stop early: PNGs end with IEND, JPEGs with EOI."""
+    if image_format == 'png' and b'IEND' not in tail:
+        raise DownloadError("PNG is truncated (no IEND chunk)")
+    if image_format == 'jpeg' and not tail.rstrip(b'\x00').endswith(b'\xff\xd9'):
+        raise DownloadError("JPEG is truncated (no end-of-image marker)")
+
+
+def check_image(data: bytes) -> str:
+    """Validate an in-memory image the same way download_image does."""
+    image_format = sniff_image(data[:IMAGE_HEADER_BYTES])
+    if image_format is None:
+        raise DownloadError("Response is not a PNG, JPEG, WebP or GIF image")
+    if len(data) < MIN_IMAGE_BYTES:
+        raise DownloadError(f"Image too small ({len(data)} bytes)")
+    _check_trailer(image_format, data[-16:])
+    return image_format
+
+
+def download_image(url: str, dest: Union[str, Path], method: str = "GET",
+                   kind: str = "download", cancel: Optional[threading.Event] = None,
+                   attempts: int = DOWNLOAD_ATTEMPTS, **kwargs) -> int:
+    """Stream an image to dest without holding it in memory.
+
+    Chunks go to a hidden ".part" file next to dest that is renamed over
+    dest only once the whole body has arrived and validated, so a partial
+    or non-image response never appears under dest's name. The format is
+    checked from the first bytes as they stream in, so an HTML error page
+    is rejected without reading it all. A GET that drops mid-body resumes
+    with a Range request (restarting if the server ignores it). Returns the
+    number of bytes written; raises DownloadError.
+    """
+    with get_tracer().span("download", host=urlparse(url).hostname) as span:
+        received = _download_image(url, dest, method, kind, cancel, attempts, **kwargs)
+        span.set(bytes=received)
+        return received
+
+
+def _download_image(url, dest, method, kind, cancel, attempts, **kwargs) -> int:
+    dest = Path(dest)
+    part = dest.with_name(f".{dest.name}.part")
+    headers = dict(kwargs.pop("headers", None) or {})
+    received = 0
+    header = b''
+    image_format = None
+
+    try:
+        with open(part, "w+b") as f:
+            for attempt in range(attempts):
+                if received:
+                    headers["Range"] = f"bytes={received}-"
+                    get_tracer().count("download_resumes")
+                try:
+                    response = request(method, url, kind, stream=True, headers=headers,
+                                       cancel=cancel, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt + 1 == attempts:
+                        raise DownloadError(f"Download failed: {e}")
+                    continue
+
+                with response:
+                    if received and response.status_code == 206:
+                        match = re.match(r"bytes (\d+)-", response.headers.get("Content-Range", ""))
+                        if not match or int(match.group(1)) != received:
+                            raise DownloadError("Server resumed from the wrong offset")
+                    elif response.status_code == 200:
+                        # First attempt, or the server ignored our Range header
+                        f.seek(0)
+                        f.truncate()
+                        received = 0
+                        header = b''
+                        image_format = None
+                    else:
+                        raise DownloadError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+                    length = response.headers.get("Content-Length")
+                    expected = received + int(length) if length and length.isdigit() else None
+
+                    try:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            if cancel is not None and cancel.is_set():
+                                raise DownloadCancelled("Cancelled")
+                            if image_format is None and len(header) < IMAGE_HEADER_BYTES:
+                                header += chunk[:IMAGE_HEADER_BYTES - len(header)]
+                                if len(header) == IMAGE_HEADER_BYTES:
+                                    image_format = sniff_image(header)
+                                    if image_format is None:
+                                        raise DownloadError("Response is not a PNG, JPEG, WebP or GIF image")
+                            f.write(chunk)
+                            received += len(chunk)
+                        if expected is not None and received < expected:
+                            raise _Truncated()
+                    except (requests.ConnectionError, requests.Timeout,
+                            requests.exceptions.ChunkedEncodingError, _Truncated) as e:
+                        # Only a GET can be resumed where it left off
+                        if method != "GET" or attempt + 1 == attempts:
+                            raise DownloadError(f"Download interrupted after {received:,} bytes: {e!r}")
+                        continue
+                break
+
+            if image_format is None:
+                raise DownloadError("Response is not a PNG, JPEG, WebP or GIF image")
+            if received < MIN_IMAGE_BYTES:
+                raise DownloadError(f"Image too small ({received} bytes)")
+            f.seek(max(received - 16, 0))
+            _check_trailer(image_format, f.read(16))
+
+        os.replace(part, dest)
+        return received
+    except BaseException:
+        try:
+            os.unlink(part)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def close():
+    """Close every pooled connection (a new session is made on next use)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
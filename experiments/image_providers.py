@@ -0,0 +1,515 @@
+#!/usr/bin/env python3
+"""
+Image Providers - One interface for every concept art backend
+Races providers (or models) against each other, keeps the first good image
+and cancels the rest, optionally hedging only after a latency threshold.
+Images stream straight to disk; nothing holds a whole image in memory
+"""
+
+import base64
+import os
+import re
+import threading
+import time
+import urllib.parse
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import List, Optional
+
+import http_client
+from art_cache import ArtCache, CacheKey, get_cache
+
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "concept-art"
+DEFAULT_SIZE = "1024x1024"
+DEFAULT_TIMEOUT = 600
+
+# Wilhelm character description for consistency. Each provider keeps the
+# prompt its original script sent (and so its cached art); Pollinations' text
+# is the default for the rest
+BASE_DESCRIPTION = """A charismatic parrot character named Wilhelm with white and cream colored feathers as the base, coral orange-red feather accents on wings tail and crest, large expressive eyes with personality slightly raised eyebrow knowing look, smart slightly sarcastic expression, clean white background for easy extraction, high quality digital art suitable for avatar use"""
+
+HUGGINGFACE_BASE_DESCRIPTION = """A charismatic parrot character named Wilhelm with white and cream colored feathers as the base, coral orange-red feather accents on wings tail and crest, large expressive eyes with personality slightly raised eyebrow knowing look, smart slightly sarcastic expression, clean white background, high quality digital art suitable for avatar use"""
+
+OPENROUTER_BASE_DESCRIPTION = """A charismatic parrot character named Wilhelm with:
+- White and cream colored feathers as the base
+- Coral orange-red (#e94560) feather accents on wings, tail, and crest
+- Large expressive eyes with personality (slightly raised eyebrow, knowing look)
+- Smart, slightly sarcastic expression
+- Clean white background for easy extraction
+- High quality digital art suitable for avatar use
+"""
+
+# 4 style variations: (name, prompt fragment, OpenRouter's style block)
+STYLES = [
+    ("professional-assistant",
+     "professional assistant style, wearing a small navy captain hat or communication headset, perched on a computer keyboard or standing near a monitor screen, helpful posture but with a knowing smirk, professional yet approachable vibe, digital art style clean lines corporate mascot quality",
+     """Style: Professional Assistant
+- Wearing a small navy captain's hat or communication headset
+- Perched on a computer keyboard or standing near a monitor/screen
+- Helpful posture but with a knowing smirk
+- Professional yet approachable vibe
+- Digital art style, clean lines, corporate mascot quality"""),
+    ("tech-savvy",
+     "tech-savvy cyberpunk-lite style, modern sleek appearance with subtle digital elements, slightly glowing coral eyes or subtle holographic interface nearby, futuristic but not overwhelming cyberpunk-lite aesthetic, clean geometric background accents suggesting technology, digital art style modern and polished",
+     """Style: Tech-Savvy Cyberpunk-Lite
+- Modern, sleek appearance with subtle digital elements
+- Slightly glowing coral eyes or subtle holographic interface nearby
+- Futuristic but not overwhelming - cyberpunk-lite aesthetic
+- Clean geometric background accents suggesting technology
+- Digital art style, modern and polished"""),
+    ("classic-wise",
+     "classic wise parrot style, distinguished appearance with small reading glasses perched on beak, perched on a stack of old books or sitting near a coffee cup, intellectual scholarly vibe like a wise librarian, warm cozy lighting, digital art style with classic illustration qualities",
+     """Style: Classic Wise Parrot
+- Distinguished appearance with small reading glasses perched on beak
+- Perched on a stack of old books or sitting near a coffee cup
+- Intellectual, scholarly vibe - like a wise librarian
+- Warm, cozy lighting
+- Digital art style with classic illustration qualities"""),
+    ("friendly-mascot",
+     "friendly mascot style, cute but not overly childish approachable and warm, waving with one wing or making a welcoming gesture, warm color palette with emphasis on coral accents, cheerful welcoming expression, perfect for a digital assistant avatar, digital art style mascot character design",
+     """Style: Friendly Mascot
+- Cute but not overly childish - approachable and warm
+- Waving with one wing or making a welcoming gesture
+- Warm color palette with emphasis on coral #e94560 accents
+- Cheerful, welcoming expression
+- Perfect for a digital assistant avatar
+- Digital art style, mascot character design"""),
+]
+
+# "prompt" is the default; "prompts" overrides it per provider name
+VARIATIONS = [
+    {
+        "name": name,
+        "prompt": f"{BASE_DESCRIPTION}, {fragment}",
+        "prompts": {
+            "huggingface": f"{HUGGINGFACE_BASE_DESCRIPTION}, {fragment}",
+            "openrouter": f"{OPENROUTER_BASE_DESCRIPTION}\n{style}",
+        },
+    }
+    for name, fragment, style in STYLES
+]
+
+# The winning image of a race
+RaceResult = namedtuple('RaceResult', ['provider', 'path', 'elapsed', 'cached'])
+
+
+class ProviderError(Exception):
+    """A provider could not produce an image."""
+
+
+class Cancelled(ProviderError):
+    """The request was abandoned because another provider won."""
+
+
+def _start_daemon(fn, *args) -> Future:
+    """Run fn in a daemon thread so abandoned requests never block exit."""
+    future = Future()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, daemon=True).start()
+    return future
+
+
+def _unlink(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class ImageProvider:
+    """Base class: turn a prompt into an image file.
+
+    base_url defaults to the provider's <NAME>_BASE_URL environment variable
+    (e.g. POLLINATIONS_BASE_URL), falling back to the real service, so the
+    clients can be pointed at mock_image_server.py.
+
+    Subclasses set name/default_model and implement generate(), which must
+    only create dest once it holds a complete, valid image (the
+    http_client.download_image contract) and should give up when cancel is
+    set. Only the
+    seed and size a backend actually honours (supports_seed/supports_size)
+    become part of the cache key.
+    """
+
+    name = None
+    default_model = None
+    default_base_url = None
+    supports_seed = False
+    supports_size = True
+
+    def __init__(self, model: Optional[str] = None, base_url: Optional[str] = None):
+        self.model = model or self.default_model
+        base_url = base_url or os.getenv(f"{self.name.upper()}_BASE_URL") or self.default_base_url
+        self.base_url = base_url.rstrip("/") if base_url else None
+
+    def __repr__(self):
+        return f"{self.name}:{self.model}"
+
+    def available(self) -> bool:
+        """False when required credentials are missing."""
+        return True
+
+    def cache_key(self, prompt: str, seed=None, size: str = DEFAULT_SIZE) -> CacheKey:
+        return CacheKey(self.name, self.model, prompt,
+                        seed if self.supports_seed else None,
+                        size if self.supports_size else None)
+
+    def generate(self, prompt: str, dest: Path, seed=None, size: str = DEFAULT_SIZE,
+                 cancel: Optional[threading.Event] = None):
+        raise NotImplementedError
+
+
+class PollinationsProvider(ImageProvider):
+    """Pollinations.ai free API: one GET returns the image."""
+
+    name = "pollinations"
+    default_model = "flux"
+    default_base_url = "https://image.pollinations.ai"
+    supports_seed = True
+
+    def generate(self, prompt, dest, seed=None, size=DEFAULT_SIZE, cancel=None):
+        width, height = size.split("x")
+        params = {"width": width, "height": height, "model": self.model, "nologo": "true"}
+        if seed is not None:
+            params["seed"] = seed
+        url = (f"{self.base_url}/prompt/{urllib.parse.quote(prompt)}"
+               f"?{urllib.parse.urlencode(params)}")
+        http_client.download_image(url, dest, kind="generate", provider=self.name, cancel=cancel)
+
+
+class HuggingFaceProvider(ImageProvider):
+    """HuggingFace Inference API: POST the prompt, image bytes come back."""
+
+    name = "huggingface"
+    default_model = "black-forest-labs/FLUX.1-schnell"
+    default_base_url = "https://api-inference.huggingface.co"
+    supports_size = False
+
+    # Fallbacks, in order of preference
+    MODELS = [
+        "black-forest-labs/FLUX.1-schnell",
+        "stabilityai/stable-diffusion-xl-base-1.0",
+        "runwayml/stable-diffusion-v1-5"
+    ]
+
+    def generate(self, prompt, dest, seed=None, size=DEFAULT_SIZE, cancel=None):
+        headers = {}
+        token = os.getenv("HF_TOKEN")
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        http_client.download_image(
+            f"{self.base_url}/models/{self.model}",
+            dest,
+            method="POST",
+            kind="generate",
+            provider=self.name,
+            cancel=cancel,
+            headers=headers,
+            json={"inputs": prompt}
+        )
+
+
+class OpenRouterProvider(ImageProvider):
+    """OpenRouter chat completions with an image-output model."""
+
+    name = "openrouter"
+    default_model = "google/gemini-2.0-flash-exp:free"
+    default_base_url = "https://openrouter.ai/api/v1"
+    supports_size = False
+
+    def available(self):
+        return bool(os.getenv("OPENAI_API_KEY"))  # OpenRouter uses same key format
+
+    def generate(self, prompt, dest, seed=None, size=DEFAULT_SIZE, cancel=None):
+        response = http_client.post(
+            f"{self.base_url}/chat/completions",
+            kind="generate",
+            provider=self.name,
+            cancel=cancel,
+            headers={
+                "Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}",
+                "HTTP-Referer": "https://openclaw.local",
+                "X-Title": "Wilhelm Concept Art Generator"
+            },
+            json={
+                "model": self.model,
+                "messages": [{"role": "user", "content": f"Generate an image: {prompt}"}],
+                "modalities": ["image", "text"],
+                "stream": False
+            }
+        )
+        data = response.json()
+        if response.status_code != 200:
+            raise ProviderError(f"API Error: {data}")
+        if cancel is not None and cancel.is_set():
+            raise Cancelled("Cancelled")
+
+        message = (data.get("choices") or [{}])[0].get("message", {})
+        image_url = None
+        for image in message.get("images") or []:
+            image_url = image.get("imageUrl", {}).get("url")
+            if image_url:
+                break
+        if not image_url:
+            match = re.search(r'data:image/[^;]+;base64,([^"\')\s]+)', message.get("content") or "")
+            if match:
+                image_url = match.group(0)
+        if not image_url:
+            raise ProviderError("No image found in response")
+
+        if not image_url.startswith("data:image"):
+            http_client.download_image(image_url, dest, cancel=cancel)
+            return
+
+        data = base64.b64decode(image_url.split(",", 1)[1])
+        http_client.check_image(data)
+        part = dest.with_name(f".{dest.name}.part")
+        part.write_bytes(data)
+        os.replace(part, dest)
+
+
+class MidAPIProvider(ImageProvider):
+    """Midjourney through MidAPI.ai: submit a task, poll it, download it.
+
+    The model is the Midjourney version. Cancelling stops the polling loop.
+    """
+
+    name = "midapi"
+    default_model = "7"
+    default_base_url = "https://api.midapi.ai/api/v1/mj"
+
+    def __init__(self, model=None, base_url=None, speed="fast"):
+        super().__init__(model, base_url)
+        self.speed = speed
+        self._generator = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return bool(os.getenv("MIDAPI_KEY"))
+
+    def _get_generator(self):
+        with self._lock:
+            if self._generator is None:
+                from wilhelm_midapi_generator import WilhelmGenerator
+                self._generator = WilhelmGenerator(output_dir=DEFAULT_OUTPUT_DIR,
+                                                   base_url=self.base_url)
+            return self._generator
+
+    def cache_key(self, prompt, seed=None, size=DEFAULT_SIZE):
+        # Same key WilhelmGenerator uses, so both share cached results
+        from wilhelm_midapi_generator import DEFAULT_ASPECT_RATIO
+        return CacheKey(self.name, f"midjourney-v{self.model}", prompt, size=DEFAULT_ASPECT_RATIO)
+
+    def generate(self, prompt, dest, seed=None, size=DEFAULT_SIZE, cancel=None):
+        generator = self._get_generator()
+        variation = {"name": "midapi", "prompt": prompt}
+        task_id = generator.submit_task(variation, self.model, self.speed)
+        if task_id is None:
+            raise ProviderError("Task submission failed")
+        image_url = generator._wait_for_completion(task_id, name=variation["name"],
+                                                   speed=self.speed, stop=cancel)
+        if cancel is not None and cancel.is_set():
+            raise Cancelled("Cancelled")
+        if not image_url:
+            raise ProviderError("Generation failed")
+        http_client.download_image(image_url, dest, cancel=cancel)
+
+
+PROVIDERS = {
+    provider.name: provider
+    for provider in (MidAPIProvider, PollinationsProvider, HuggingFaceProvider, OpenRouterProvider)
+}
+
+
+def make_provider(spec: str) -> ImageProvider:
+    """Build a provider from "name" or "name:model"."""
+    name, _, model = spec.partition(":")
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown provider {name!r} (choose from {', '.join(PROVIDERS)})")
+    return PROVIDERS[name](model or None)
+
+
+class Orchestrator:
+    """Runs one prompt against several providers and keeps the first image.
+
+    With hedge_after=None every provider starts at once. Otherwise providers
+    start in order: the next one is launched when the running ones have
+    taken longer than hedge_after seconds, or straight away when one fails.
+    Once an image arrives the others are cancelled and left to wind down in
+    the background. Each attempt writes to its own hidden file next to the
+    output; only the winner's is renamed into place.
+
+    Seeded requests are only served from the cache by providers that honour
+    the seed; a seedless provider's cached image stands in for unseeded ones.
+    """
+
+    def __init__(self, providers: List[ImageProvider], hedge_after: Optional[float] = None,
+                 timeout: float = DEFAULT_TIMEOUT, cache: Optional[ArtCache] = None):
+        self.providers = [p for p in providers if p.available()]
+        if not self.providers:
+            raise ValueError("No available providers (check API keys)")
+        self.hedge_after = hedge_after
+        self.timeout = timeout
+        self.cache = cache or get_cache()
+
+    def generate(self, prompt: str, output_path, seed=None, size: str = DEFAULT_SIZE,
+                 prompts: Optional[dict] = None) -> RaceResult:
+        """Produce output_path from the first provider to deliver an image.
+
+        prompts optionally maps a provider name to the prompt it gets instead.
+        """
+        start = time.time()
+        output_path = Path(output_path)
+        prompts = prompts or {}
+
+        def prompt_for(provider):
+            return prompts.get(provider.name, prompt)
+
+        for provider in self.providers:
+            if seed is not None and not provider.supports_seed:
+                # Its key drops the seed, so every seed of a batch would
+                # restore the same image
+                continue
+            if self.cache.restore(provider.cache_key(prompt_for(provider), seed, size), output_path):
+                return RaceResult(provider, output_path, time.time() - start, True)
+
+        cancel = threading.Event()
+        queue = list(enumerate(self.providers))
+        running = {}
+        errors = []
+
+        def launch():
+            index, provider = queue.pop(0)
+            dest = output_path.with_name(f".{output_path.name}.{index}.tmp")
+            future = _start_daemon(provider.generate, prompt_for(provider), dest, seed, size, cancel)
+            running[future] = (provider, dest)
+
+        try:
+            launch()
+            while queue and self.hedge_after is None:
+                launch()
+
+            deadline = start + self.timeout
+            while running:
+                timeout = deadline - time.time()
+                if queue and self.hedge_after is not None:
+                    timeout = min(timeout, self.hedge_after)
+                if timeout <= 0:
+                    break
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    # Slow so far: hedge with the next provider
+                    if queue and time.time() < deadline:
+                        launch()
+                    continue
+
+                for future in done:
+                    provider, dest = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        errors.append(f"{provider!r}: {e}")
+                        if queue:
+                            launch()
+                        continue
+
+                    os.replace(dest, output_path)
+                    self.cache.put(provider.cache_key(prompt_for(provider), seed, size), output_path)
+                    return RaceResult(provider, output_path, time.time() - start, False)
+        finally:
+            cancel.set()
+            # A loser that finishes anyway must not leave its file behind
+            for future, (provider, dest) in running.items():
+                future.add_done_callback(lambda _, dest=dest: _unlink(dest))
+
+        if running:
+            errors.append(f"timed out after {self.timeout}s")
+        raise ProviderError("All providers failed: " + "; ".join(errors))
+
+
+def generate_variations(orchestrator: Orchestrator, output_dir=DEFAULT_OUTPUT_DIR,
+                        variations=VARIATIONS, seed=42, size=DEFAULT_SIZE,
+                        concurrency: int = 4) -> list:
+    """Race every variation through orchestrator, saving wilhelm-{name}.png.
+
+    Returns [(name, RaceResult or None)].
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    def run(variation):
+        print(f"Generating: {variation['name']}...")
+        output_path = output_dir / f"wilhelm-{variation['name']}.png"
+        try:
+            result = orchestrator.generate(variation["prompt"], output_path, seed, size,
+                                           variation.get("prompts"))
+        except ProviderError as e:
+            print(f"✗ {variation['name']}: {e}")
+            return variation["name"], None
+        source = "cached" if result.cached else f"{result.elapsed:.1f}s"
+        print(f"✓ Saved: {output_path} ({output_path.stat().st_size} bytes, "
+              f"{result.provider!r}, {source})")
+        return variation["name"], result
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        return list(pool.map(run, variations))
+
+
+def print_summary(results: list, output_dir=DEFAULT_OUTPUT_DIR):
+    print("\n" + "="*60)
+    print("GENERATION COMPLETE")
+    print("="*60)
+    for name, result in results:
+        status = f"✓ {name} ({result.provider!r})" if result else f"✗ {name}"
+        print(status)
+
+    print(f"\nAll images saved to: {output_dir}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Race image providers for Wilhelm concept art")
+    parser.add_argument("--providers", nargs="+", default=["pollinations", "huggingface"],
+                        help="Providers to race, as name or name:model "
+                             f"({', '.join(PROVIDERS)})")
+    parser.add_argument("--hedge-after", type=float, default=None,
+                        help="Start the next provider only after this many seconds "
+                             "(default: start all at once)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                        help="Give up on a variation after this many seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--size", default=DEFAULT_SIZE)
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR), help="Output directory")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Variations to generate at once")
+    args = parser.parse_args()
+
+    try:
+        orchestrator = Orchestrator([make_provider(spec) for spec in args.providers],
+                                    hedge_after=args.hedge_after, timeout=args.timeout)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    print("="*60)
+    print(f"Generating Wilhelm Concept Art - racing {', '.join(map(repr, orchestrator.providers))}")
+    print("="*60)
+
+    results = generate_variations(orchestrator, args.output, seed=args.seed, size=args.size,
+                                  concurrency=args.concurrency)
+    print_summary(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Wilhelm LOD Builder - Quadric error metric simplification
+Builds a chain of detail levels (e.g. 100/50/25/10% of the triangles) from the
+avatar OBJ and writes them as GLBs plus a manifest the three.js pages can use
+to pick a level by device class
+
+Collapses are done in vectorized passes: every pass scores all edges with
+Garland-Heckbert quadrics, picks a set of cheapest edges whose one-rings don't
+touch, rejects the ones that would flip a triangle and applies the rest at
+once. UV seams are collapsed on both sides together so textures don't tear.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from obj_to_glb import Primitive, load_obj, write_meshes_glb
+
+DEFAULT_RATIOS = [1.0, 0.5, 0.25, 0.1]
+
+# Suggested device class per level, most detailed first
+DEVICE_CLASSES = ['desktop', 'tablet', 'mobile', 'low-end']
+
+# Seam and open-boundary edges get extra constraint planes so UV borders and
+# the mesh outline keep their shape
+SEAM_WEIGHT = 10.0
+BOUNDARY_WEIGHT = 100.0
+
+# A collapse is rejected if it turns any triangle by more than ~75 degrees
+MIN_NORMAL_COSINE = 0.25
+
+# Each pass only considers the cheaper part of the edges, in a few rounds
+CANDIDATE_FRACTION = 0.5
+SELECTION_ROUNDS = 4
+
+
+def _face_quadrics(points, triangles):
+    """Area-weighted plane quadrics (n, 4, 4) for each triangle."""
+    corners = points[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    double_area = np.linalg.norm(normals, axis=1)
+    normals = normals / np.where(double_area > 0, double_area, 1)[:, None]
+    planes = np.concatenate([normals, -np.einsum('ij,ij->i', normals, corners[:, 0])[:, None]], axis=1)
+    return np.einsum('ni,nj->nij', planes, planes) * (double_area / 2)[:, None, None]
+
+
+def _edge_quadrics(points, edges, face_normals, weight):
+    """Quadrics for planes through each edge, perpendicular to its face."""
+    a, b = points[edges[:, 0]], points[edges[:, 1]]
+    direction = b - a
+    length = np.linalg.norm(direction, axis=1)
+    normals = np.cross(direction, face_normals)
+    norm = np.linalg.norm(normals, axis=1)
+    normals = normals / np.where(norm > 0, norm, 1)[:, None]
+    planes = np.concatenate([normals, -np.einsum('ij,ij->i', normals, a)[:, None]], axis=1)
+    return np.einsum('ni,nj->nij', planes, planes) * (weight * length ** 2)[:, None, None]
+
+
+def _triangle_normals(points, triangles):
+    corners = points[triangles]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals / np.where(length > 0, length, 1)
+
+
+def _directed_edges(triangles):
+    """All (from, to) half-edges of the triangles, shape (3 * n, 2)."""
+    return np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+
+
+def _independent_edges(candidates, cost, src_pos, dst_pos, position_count):
+    """Pick collapses whose one-rings don't touch, cheapest first.
+
+    Each round keeps the candidates no cheaper candidate touches, then
+    blocks their one-rings; a few rounds give a nearly maximal set without
+    leaving numpy. src_pos/dst_pos list every directed edge of the mesh and
+    double as the adjacency.
+    """
+    rank = np.full(len(cost), len(cost), dtype=np.int64)
+    rank[candidates[np.argsort(cost[candidates], kind='stable')]] = np.arange(len(candidates))
+    blocked = np.zeros(position_count, dtype=bool)
+    selected = []
+
+    for _ in range(SELECTION_ROUNDS):
+        candidates = candidates[~blocked[src_pos[candidates]] & ~blocked[dst_pos[candidates]]]
+        if not len(candidates):
+            break
+        vertex_best = np.full(position_count, len(cost), dtype=np.int64)
+        np.minimum.at(vertex_best, src_pos[candidates], rank[candidates])
+        np.minimum.at(vertex_best, dst_pos[candidates], rank[candidates])
+        neighbourhood_best = vertex_best.copy()
+        np.minimum.at(neighbourhood_best, src_pos, vertex_best[dst_pos])
+        chosen = candidates[(rank[candidates] == neighbourhood_best[src_pos[candidates]]) &
+                            (rank[candidates] == neighbourhood_best[dst_pos[candidates]])]
+        selected.append(chosen)
+
+        touched = np.zeros(position_count, dtype=bool)
+        touched[src_pos[chosen]] = True
+        touched[dst_pos[chosen]] = True
+        blocked |= touched
+        blocked[dst_pos[touched[src_pos]]] = True
+
+    chosen = np.concatenate(selected) if selected else candidates[:0]
+    return chosen[np.argsort(rank[chosen])]
+
+
+def _flipping_sources(points, pos_triangles, pos_remap):
+    """Mask of collapsing positions that would flip one of their triangles."""
+    moved = pos_remap[pos_triangles]
+    changed = (moved != pos_triangles).any(axis=1)
+    survives = changed & (moved[:, 0] != moved[:, 1]) & (moved[:, 1] != moved[:, 2]) & \
+        (moved[:, 0] != moved[:, 2])
+    before = _triangle_normals(points, pos_triangles[survives])
+    after = _triangle_normals(points, moved[survives])
+    flipped = np.einsum('ij,ij->i', before, after) < MIN_NORMAL_COSINE
+
+    # The moved corner identifies the collapse responsible
+    old, new = pos_triangles[survives][flipped], moved[survives][flipped]
+    mask = np.zeros(len(points), dtype=bool)
+    mask[old[new != old]] = True
+    return mask
+
+
+def simplify(primitive, target_triangles):
+    """Simplify a Primitive down to about target_triangles triangles.
+
+    Works on welded positions: every attribute vertex ("wedge") belongs to a
+    position, and collapsing a position moves all of its wedges together.
+    Positions on open boundaries only collapse along the boundary.
+    """
+    wedge_positions = primitive.positions.astype(np.float64)
+    points, wedge_pos = np.unique(wedge_positions, axis=0, return_inverse=True)
+    wedge_pos = wedge_pos.ravel()
+    position_count = len(points)
+
+    triangles = primitive.indices.reshape(-1, 3).astype(np.int64)
+    pos_triangles = wedge_pos[triangles]
+
+    # Accumulated quadrics: faces, plus constraint planes along UV seams and
+    # open boundaries so outlines keep their shape
+    quadrics = np.zeros((position_count, 4, 4))
+    face_q = _face_quadrics(points, pos_triangles)
+    for i in range(3):
+        np.add.at(quadrics, pos_triangles[:, i], face_q)
+
+    wedge_edges = _directed_edges(triangles)
+    face_of_edge = np.tile(np.arange(len(triangles)), 3)
+    _, wedge_edge_uses = np.unique(np.sort(wedge_edges, axis=1), axis=0, return_inverse=True)
+    wedge_edge_uses = np.bincount(wedge_edge_uses.ravel())[wedge_edge_uses.ravel()]
+    _, pos_edge_uses = np.unique(np.sort(wedge_pos[wedge_edges], axis=1), axis=0, return_inverse=True)
+    pos_edge_uses = np.bincount(pos_edge_uses.ravel())[pos_edge_uses.ravel()]
+    weights = np.where(pos_edge_uses == 1, BOUNDARY_WEIGHT, np.where(wedge_edge_uses == 1, SEAM_WEIGHT, 0.0))
+    border = weights > 0
+    if border.any():
+        border_q = _edge_quadrics(points, wedge_pos[wedge_edges[border]],
+                                  _triangle_normals(points, pos_triangles)[face_of_edge[border]],
+                                  weights[border])
+        for i in range(2):
+            np.add.at(quadrics, wedge_pos[wedge_edges[border][:, i]], border_q / 2)
+
+    homogeneous = np.concatenate([points, np.ones((position_count, 1))], axis=1)
+    wedge_count = len(wedge_pos)
+
+    while len(triangles) > target_triangles:
+        pos_triangles = wedge_pos[triangles]
+        live_wedges = np.bincount(triangles.ravel(), minlength=wedge_count) > 0
+        wedges_per_position = np.bincount(wedge_pos[live_wedges], minlength=position_count)
+
+        # Directed position edges P -> Q and the wedge pairs behind them
+        # (rows are packed into int64 keys: 1-D unique is much faster)
+        half = _directed_edges(triangles)
+        keys = np.unique(np.concatenate([half[:, 0] * wedge_count + half[:, 1],
+                                         half[:, 1] * wedge_count + half[:, 0]]))
+        wedge_edges = np.stack([keys // wedge_count, keys % wedge_count], axis=1)
+        wedge_edges = wedge_edges[wedge_pos[wedge_edges[:, 0]] != wedge_pos[wedge_edges[:, 1]]]
+        src_wedge = wedge_edges[:, 0]
+        pos_pairs = wedge_pos[wedge_edges]
+
+        # A collapse P -> Q is valid when every wedge of P touches exactly one
+        # wedge of Q, so each wedge has an unambiguous destination
+        wedge_target, per_wedge = np.unique(src_wedge * position_count + pos_pairs[:, 1], return_counts=True)
+        directed, inverse = np.unique(wedge_pos[wedge_target // position_count] * position_count +
+                                      wedge_target % position_count, return_inverse=True)
+        inverse = inverse.ravel()
+        single = np.bincount(inverse, weights=(per_wedge == 1)).astype(np.int64)
+        src_pos, dst_pos = directed // position_count, directed % position_count
+        valid = (single == wedges_per_position[src_pos]) & \
+                (np.bincount(inverse, weights=(per_wedge > 1)) == 0)
+
+        # Boundary positions may only slide along their own boundary, and
+        # positions on non-manifold edges stay where they are
+        pos_half = np.sort(_directed_edges(pos_triangles), axis=1)
+        edge_keys, edge_uses = np.unique(pos_half[:, 0] * position_count + pos_half[:, 1], return_counts=True)
+        on_boundary = np.zeros(position_count, dtype=bool)
+        on_boundary[edge_keys[edge_uses == 1] // position_count] = True
+        on_boundary[edge_keys[edge_uses == 1] % position_count] = True
+        non_manifold = np.zeros(position_count, dtype=bool)
+        non_manifold[edge_keys[edge_uses > 2] // position_count] = True
+        non_manifold[edge_keys[edge_uses > 2] % position_count] = True
+        undirected = np.minimum(src_pos, dst_pos) * position_count + np.maximum(src_pos, dst_pos)
+        edge_use = edge_uses[np.searchsorted(edge_keys, undirected)]
+        valid &= ~non_manifold[src_pos] & (~on_boundary[src_pos] | (edge_use == 1))
+
+        # Garland-Heckbert cost of moving P onto Q
+        combined = quadrics[src_pos] + quadrics[dst_pos]
+        target = homogeneous[dst_pos]
+        cost = np.einsum('ei,eij,ej->e', target, combined, target)
+        cost[~valid] = np.inf
+
+        # Cheapest direction per undirected edge
+        order = np.lexsort((cost, undirected))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = undirected[order][1:] != undirected[order][:-1]
+        candidates = order[first]
+        candidates = candidates[np.isfinite(cost[candidates])]
+        if not len(candidates):
+            break
+        cheapest = max(int(len(candidates) * CANDIDATE_FRACTION), 1)
+        candidates = candidates[np.argpartition(cost[candidates], cheapest - 1)[:cheapest]]
+
+        # Each interior collapse removes about two triangles; don't overshoot
+        needed = max((len(triangles) - target_triangles + 1) // 2, 1)
+
+        # Pick independent collapses; if all of them would flip triangles,
+        # drop those and pick again from the remaining candidates
+        chosen = candidates[:0]
+        while len(candidates):
+            chosen = _independent_edges(candidates, cost, src_pos, dst_pos, position_count)[:needed]
+            pos_remap = np.arange(position_count)
+            pos_remap[src_pos[chosen]] = dst_pos[chosen]
+            flipping = _flipping_sources(points, pos_triangles, pos_remap)
+            if not flipping.any():
+                break
+            rejected = chosen[flipping[src_pos[chosen]]]
+            chosen = chosen[~flipping[src_pos[chosen]]]
+            if len(chosen):
+                pos_remap = np.arange(position_count)
+                pos_remap[src_pos[chosen]] = dst_pos[chosen]
+                break
+            candidates = np.setdiff1d(candidates, rejected)
+        if not len(chosen):
+            break
+
+        # Move every wedge of a collapsed position to its partner wedge
+        collapsing = np.zeros(position_count, dtype=bool)
+        collapsing[src_pos[chosen]] = True
+        wedge_remap = np.arange(len(wedge_pos))
+        move = collapsing[pos_pairs[:, 0]] & (pos_remap[pos_pairs[:, 0]] == pos_pairs[:, 1])
+        wedge_remap[wedge_edges[move, 0]] = wedge_edges[move, 1]
+
+        quadrics[dst_pos[chosen]] += quadrics[src_pos[chosen]]
+        triangles = wedge_remap[triangles]
+        pos_triangles = wedge_pos[triangles]
+        keep = (pos_triangles[:, 0] != pos_triangles[:, 1]) & (pos_triangles[:, 1] != pos_triangles[:, 2]) & \
+            (pos_triangles[:, 0] != pos_triangles[:, 2])
+        triangles = triangles[keep]
+
+    # Drop wedges nothing references any more
+    used, indices = np.unique(triangles.ravel(), return_inverse=True)
+    return Primitive(
+        primitive.material,
+        primitive.positions[used],
+        primitive.normals[used],
+        primitive.uvs[used] if primitive.uvs is not None else None,
+        indices.ravel(),
+    )
+
+
+def build_lod_chain(primitives, ratios=DEFAULT_RATIOS):
+    """Return one list of primitives per ratio, each simplified from the last."""
+    levels = []
+    current = primitives
+    for ratio in ratios:
+        current = [simplify(p, int(len(source.indices) // 3 * ratio))
+                   for p, source in zip(current, primitives)]
+        levels.append(current)
+    return levels
+
+
+def build_lods(obj_path, output_dir, ratios=DEFAULT_RATIOS, single_file=False, name=None):
+    """Build the LOD chain for obj_path and write GLBs plus lod-manifest.json.
+
+    With single_file=True all levels go into one GLB, one scene per level.
+    Otherwise each level is its own GLB and the textures sit beside them as
+    plain files, so the small levels don't each carry a copy.
+    Returns the manifest dict.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    name = name or Path(obj_path).stem
+
+    primitives, materials = load_obj(obj_path)
+    levels = build_lod_chain(primitives, ratios)
+
+    manifest = {'model': name, 'levels': []}
+    if single_file:
+        file_name = f"{name}-lods.glb"
+        write_meshes_glb(output_dir / file_name, levels, materials, name=name)
+
+    for i, (ratio, level) in enumerate(zip(ratios, levels)):
+        entry = {
+            'level': i,
+            'ratio': ratio,
+            'triangles': int(sum(len(p.indices) // 3 for p in level)),
+            'vertices': int(sum(len(p.positions) for p in level)),
+            'device': DEVICE_CLASSES[min(i, len(DEVICE_CLASSES) - 1)],
+        }
+        if single_file:
+            entry['file'] = file_name
+            entry['scene'] = i
+        else:
+            entry['file'] = f"{name}-lod{i}.glb"
+            entry['bytes'] = write_meshes_glb(output_dir / entry['file'], [level], materials, name=name,
+                                              external_images=True)
+        manifest['levels'].append(entry)
+
+    if not single_file:
+        # Shared by every level, on top of each level's own bytes
+        textures = {Path(mtl[key]).name for mtl in materials.values() for key in ('map_Kd', 'map_Kn')
+                    if key in mtl and os.path.exists(mtl[key])}
+        manifest['textures'] = {texture: (output_dir / texture).stat().st_size for texture in sorted(textures)}
+
+    with open(output_dir / 'lod-manifest.json', 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a LOD chain for the Wilhelm avatar")
+    parser.add_argument("input", help="Input .obj file")
+    parser.add_argument("--output", default="models/wilhelm/lod", help="Output directory")
+    parser.add_argument("--ratios", default=",".join(str(r) for r in DEFAULT_RATIOS),
+                        help="Comma-separated triangle ratios, most detailed first")
+    parser.add_argument("--single", action="store_true", help="Pack all levels into one GLB")
+    parser.add_argument("--name", default=None, help="Base name for output files")
+
+    args = parser.parse_args()
+    ratios = [float(r) for r in args.ratios.split(",")]
+
+    start = time.time()
+    manifest = build_lods(args.input, args.output, ratios=ratios, single_file=args.single, name=args.name)
+
+    print(f"✅ LOD chain built in {time.time() - start:.2f}s")
+    print(f"   Input: {args.input} ({os.path.getsize(args.input):,} bytes)")
+    for level in manifest['levels']:
+        print(f"   LOD{level['level']} ({level['device']}): {level['triangles']:,} triangles -> {level['file']}")
+
+
+if __name__ == '__main__':
+    main()
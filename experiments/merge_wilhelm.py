@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Merger - Cut draw calls by merging primitives that share a material
+Deduplicates identical materials (the customizer makes them all 'Wilhelm'),
+bakes node transforms into the vertex data and merges every static primitive
+of a material into one interleaved vertex buffer, so the preview issues one
+draw call per material instead of one per original primitive
+"""
+
+import json
+import os
+
+import numpy as np
+
+from glb import (
+    ARRAY_BUFFER, DTYPE_COMPONENTS, ELEMENT_ARRAY_BUFFER,
+    compact_buffers, existing_views, interleave, read_accessor, read_glb_layout, write_glb
+)
+
+TRIANGLES = 4
+
+# Attributes that change under a node transform and are baked as float32
+BAKED_ATTRIBUTES = ('POSITION', 'NORMAL', 'TANGENT')
+
+# glTF's upper bound for bufferView.byteStride
+MAX_BYTE_STRIDE = 252
+
+
+def dedupe_materials(gltf):
+    """Point primitives at the first of each group of identical materials.
+
+    Materials are compared on everything but their name. Unused duplicates
+    are dropped. Returns the number of materials removed.
+    """
+    materials = gltf.get('materials', [])
+    first = {}
+    remap = []
+    kept = []
+    for material in materials:
+        key = json.dumps({k: v for k, v in material.items() if k != 'name'}, sort_keys=True)
+        if key not in first:
+            first[key] = len(kept)
+            kept.append(material)
+        remap.append(first[key])
+
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh['primitives']:
+            if 'material' in primitive:
+                primitive['material'] = remap[primitive['material']]
+    if materials:
+        gltf['materials'] = kept
+    return len(materials) - len(kept)
+
+
+def node_matrix(node):
+    """A node's local transform as a 4x4 matrix (column vectors)."""
+    if 'matrix' in node:
+        # glTF stores matrices column-major
+        return np.array(node['matrix'], dtype=np.float64).reshape(4, 4).T
+
+    x, y, z, w = node.get('rotation', [0.0, 0.0, 0.0, 1.0])
+    rotation = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    matrix = np.eye(4)
+    matrix[:3, :3] = rotation * np.asarray(node.get('scale', [1.0, 1.0, 1.0]))
+    matrix[:3, 3] = node.get('translation', [0.0, 0.0, 0.0])
+    return matrix
+
+
+def scene_instances(gltf, scene, keep=()):
+    """[(node index, world matrix, animated)] for every node of a scene.
+
+    A node counts as animated when an animation moves it or any ancestor, or
+    when it or an ancestor is named in keep (moved by page code instead).
+    """
+    nodes = gltf.get('nodes', [])
+    animated_nodes = {index for index, node in enumerate(nodes) if node.get('name') in keep}
+    for animation in gltf.get('animations', []):
+        for channel in animation['channels']:
+            target = channel['target']
+            if 'node' in target and target['path'] in ('translation', 'rotation', 'scale'):
+                animated_nodes.add(target['node'])
+
+    instances = []
+    stack = [(index, np.eye(4), False) for index in reversed(scene.get('nodes', []))]
+    while stack:
+        index, parent, parent_animated = stack.pop()
+        node = nodes[index]
+        world = parent @ node_matrix(node)
+        animated = parent_animated or index in animated_nodes
+        instances.append((index, world, animated))
+        for child in reversed(node.get('children', [])):
+            stack.append((child, world, animated))
+    return instances
+
+
+def _mergeable(gltf, node, animated):
+    """Whether a node's mesh can be baked to world space and merged."""
+    if 'mesh' not in node or 'skin' in node or animated:
+        return False
+    for primitive in gltf['meshes'][node['mesh']]['primitives']:
+        if (primitive.get('mode', TRIANGLES) != TRIANGLES or 'targets' in primitive
+                or 'POSITION' not in primitive['attributes'] or primitive.get('extensions')):
+            return False
+    return True
+
+
+def _signature(gltf, primitive):
+    """Attribute names and storage formats - only matching primitives can share a buffer."""
+    signature = []
+    # POSITION first, so it sits at offset 0 of the interleaved rows
+    ordered = sorted(primitive['attributes'].items(), key=lambda item: (item[0] != 'POSITION', item[0]))
+    for name, index in ordered:
+        accessor = gltf['accessors'][index]
+        if name in BAKED_ATTRIBUTES:
+            signature.append((name, accessor['type'], 5126, False))
+        else:
+            signature.append((name, accessor['type'], accessor['componentType'],
+                              accessor.get('normalized', False)))
+    return tuple(signature)
+
+
+def _bake(name, values, world):
+    """Transform one attribute's values by a world matrix."""
+    linear = world[:3, :3]
+    if name == 'POSITION':
+        return values @ linear.T + world[:3, 3]
+
+    # Normals take the inverse transpose so non-uniform scale keeps them perpendicular
+    normal_matrix = np.linalg.inv(linear).T if name == 'NORMAL' else linear
+    vectors = values[:, :3] @ normal_matrix.T
+    lengths = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(lengths > 0, lengths, 1.0)
+    if name == 'TANGENT':
+        # A mirroring transform flips the bitangent's handedness
+        return np.hstack([vectors, values[:, 3:] * np.sign(np.linalg.det(linear))])
+    return vectors
+
+
+def _merge_group(gltf, bin_data, signature, members, views):
+    """Merge one group's primitives into a new primitive with interleaved vertices."""
+    columns = {name: [] for name, _, _, _ in signature}
+    index_parts = []
+    vertex_count = 0
+
+    for primitive, world in members:
+        count = gltf['accessors'][primitive['attributes']['POSITION']]['count']
+        for name, _, _, _ in signature:
+            values = read_accessor(gltf, bin_data, primitive['attributes'][name],
+                                   decode=name in BAKED_ATTRIBUTES)
+            if name in BAKED_ATTRIBUTES:
+                values = _bake(name, values.astype(np.float64), world).astype(np.float32)
+            columns[name].append(values)
+
+        if 'indices' in primitive:
+            indices = read_accessor(gltf, bin_data, primitive['indices']).ravel().astype(np.int64)
+        else:
+            indices = np.arange(count, dtype=np.int64)
+        triangles = indices[:len(indices) - len(indices) % 3].reshape(-1, 3)
+        if np.linalg.det(world[:3, :3]) < 0:
+            # Mirrored instances would otherwise come out inside-out
+            triangles = triangles[:, [0, 2, 1]]
+        index_parts.append(triangles.ravel() + vertex_count)
+        vertex_count += count
+
+    arrays = [np.concatenate(columns[name]) for name, _, _, _ in signature]
+    data, offsets = interleave(arrays)
+    if data.shape[1] <= MAX_BYTE_STRIDE:
+        views.append(({'byteStride': data.shape[1], 'target': ARRAY_BUFFER}, data))
+        placements = [(len(views) - 1, offset) for offset in offsets]
+    else:
+        placements = []
+        for values in arrays:
+            single, _ = interleave([values])
+            views.append(({'byteStride': single.shape[1], 'target': ARRAY_BUFFER}, single))
+            placements.append((len(views) - 1, 0))
+
+    merged = {'attributes': {}, 'mode': TRIANGLES}
+    for (name, accessor_type, component_type, normalized), values, (view, offset) in \
+            zip(signature, arrays, placements):
+        accessor = {
+            'bufferView': view,
+            'componentType': component_type,
+            'count': vertex_count,
+            'type': accessor_type,
+        }
+        if offset:
+            accessor['byteOffset'] = offset
+        if normalized:
+            accessor['normalized'] = True
+        if name == 'POSITION':
+            accessor['min'] = values.min(axis=0).tolist()
+            accessor['max'] = values.max(axis=0).tolist()
+        merged['attributes'][name] = len(gltf['accessors'])
+        gltf['accessors'].append(accessor)
+
+    indices = np.concatenate(index_parts)
+    index_dtype = np.dtype('<u2') if vertex_count <= 0xFFFF else np.dtype('<u4')
+    views.append(({'target': ELEMENT_ARRAY_BUFFER}, indices.astype(index_dtype)))
+    merged['indices'] = len(gltf['accessors'])
+    gltf['accessors'].append({
+        'bufferView': len(views) - 1,
+        'componentType': DTYPE_COMPONENTS[index_dtype],
+        'count': len(indices),
+        'type': 'SCALAR',
+    })
+    if 'material' in members[0][0]:
+        merged['material'] = members[0][0]['material']
+    return merged
+
+
+def _drop_unused_meshes(gltf):
+    """Remove meshes no node references any more and renumber the rest."""
+    used = sorted({node['mesh'] for node in gltf.get('nodes', []) if 'mesh' in node})
+    remap = {old: new for new, old in enumerate(used)}
+    gltf['meshes'] = [gltf['meshes'][old] for old in used]
+    for node in gltf.get('nodes', []):
+        if 'mesh' in node:
+            node['mesh'] = remap[node['mesh']]
+    if not gltf['meshes']:
+        del gltf['meshes']
+
+
+def _draw_calls(gltf, instances):
+    return sum(len(gltf['meshes'][gltf['nodes'][index]['mesh']]['primitives'])
+               for index, _, _ in instances if 'mesh' in gltf['nodes'][index])
+
+
+def merge_gltf(gltf, bin_data, keep=()):
+    """Dedupe materials and merge static primitives per material (gltf modified in place).
+
+    Animated, skinned and morphing meshes are left as they are, and so are
+    the nodes named in keep and their children. Meshes used
+    by several nodes are baked once per node, trading size for draw calls.
+    Returns (pieces, stats); pieces is None when nothing could be merged and
+    the BIN chunk is unchanged.
+    """
+    if any('uri' in buffer for buffer in gltf.get('buffers', [])):
+        raise ValueError("Only self-contained GLBs (no external buffers) are supported")
+    if 'EXT_meshopt_compression' in gltf.get('extensionsUsed', []):
+        raise ValueError("Decompress the GLB first (meshopt_compression.py --decompress)")
+
+    stats = {'materials_before': len(gltf.get('materials', []))}
+    stats['materials_removed'] = dedupe_materials(gltf)
+    stats['materials_after'] = len(gltf.get('materials', []))
+
+    scenes = gltf.get('scenes', [])
+    scene = scenes[gltf.get('scene', 0)] if scenes else {'nodes': []}
+    instances = scene_instances(gltf, scene, keep)
+    stats['draw_calls_before'] = stats['draw_calls_after'] = _draw_calls(gltf, instances)
+
+    groups = {}
+    merged_nodes = []
+    for index, world, animated in instances:
+        node = gltf['nodes'][index]
+        if not _mergeable(gltf, node, animated):
+            continue
+        merged_nodes.append(index)
+        for primitive in gltf['meshes'][node['mesh']]['primitives']:
+            key = (primitive.get('material', -1), _signature(gltf, primitive))
+            groups.setdefault(key, []).append((primitive, world))
+
+    # Nodes shared by several scenes would lose their mesh in the others
+    merged_primitives = sum(len(members) for members in groups.values())
+    if len(scenes) > 1 or merged_primitives <= len(groups):
+        return None, stats
+
+    views = existing_views(gltf, bin_data)
+    primitives = [_merge_group(gltf, bin_data, signature, members, views)
+                  for (_, signature), members in groups.items()]
+
+    for index in merged_nodes:
+        node = gltf['nodes'][index]
+        del node['mesh']
+        node.pop('weights', None)
+    gltf['meshes'].append({'name': 'Wilhelm', 'primitives': primitives})
+    gltf['nodes'].append({'name': 'Wilhelm', 'mesh': len(gltf['meshes']) - 1})
+    scene.setdefault('nodes', []).append(len(gltf['nodes']) - 1)
+    _drop_unused_meshes(gltf)
+
+    stats['draw_calls_after'] = _draw_calls(gltf, scene_instances(gltf, scene, keep))
+    return compact_buffers(gltf, views), stats
+
+
+def merge_glb(input_path, output_path, keep=()):
+    """Merge a GLB file's primitives. input_path and output_path may be the same file."""
+    gltf, bin_range = read_glb_layout(input_path)
+    if bin_range is None:
+        bin_data = b''
+    else:
+        # Read into memory (not a memmap) so output_path may overwrite input_path
+        bin_data = np.fromfile(input_path, np.uint8, count=bin_range.length, offset=bin_range.offset)
+
+    input_size = os.path.getsize(input_path)
+    pieces, stats = merge_gltf(gltf, bin_data, keep)
+    if pieces is None:
+        pieces = bin_data if bin_range is not None else None
+    stats['bytes_before'] = input_size
+    stats['bytes_after'] = write_glb(output_path, gltf, pieces)
+    return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Merge a Wilhelm GLB's primitives by material")
+    parser.add_argument("input", help="Input GLB")
+    parser.add_argument("output", nargs="?", default=None, help="Output GLB (default: overwrite input)")
+    parser.add_argument("--keep", action="append", default=[], metavar="NODE",
+                        help="Leave this node (and its children) unmerged; repeatable")
+    args = parser.parse_args()
+    output = args.output or args.input
+
+    stats = merge_glb(args.input, output, keep=args.keep)
+
+    print(f"✅ Wilhelm merged!")
+    print(f"   Input: {args.input} ({stats['bytes_before']:,} bytes)")
+    print(f"   Output: {output} ({stats['bytes_after']:,} bytes)")
+    print(f"   Materials: {stats['materials_before']} -> {stats['materials_after']}")
+    print(f"   Draw calls: {stats['draw_calls_before']} -> {stats['draw_calls_after']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,926 @@
+#!/usr/bin/env python3
+"""
+Meshopt Compression - EXT_meshopt_compression for the Wilhelm GLB
+Re-encodes vertex attributes, indices and animation data with the
+meshoptimizer vertex/index codecs and filters (octahedral normals,
+quaternion rotations, optional exponential floats). The result gzips far
+better than raw vertex data and decodes in the browser with the meshopt
+WASM decoder. Decoders for every codec are included to verify round trips
+"""
+
+import gzip
+import os
+
+import numpy as np
+
+from glb import (
+    ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, compact_buffers, existing_views, pad_columns,
+    padding, read_accessor, read_glb_layout, write_glb
+)
+
+EXTENSION = 'EXT_meshopt_compression'
+
+VERTEX_HEADER = 0xa0   # vertex codec, version 0
+INDEX_HEADER = 0xe1    # triangle index codec, version 1
+SEQUENCE_HEADER = 0xd1  # index sequence codec, version 1
+
+BYTE_GROUP_SIZE = 16
+VERTEX_BLOCK_SIZE_BYTES = 8192
+VERTEX_BLOCK_MAX_SIZE = 256
+TAIL_MAX_SIZE = 32
+
+# Static table of common (feb << 4 | fec) pairs; also pads the end of the stream
+CODE_AUX_TABLE = bytes([0x00, 0x76, 0x87, 0x56, 0x67, 0x78, 0xa9, 0x86,
+                        0x65, 0x89, 0x68, 0x98, 0x01, 0x69, 0x00, 0x00])
+CODE_AUX_INDEX = {value: i for i, value in reversed(list(enumerate(CODE_AUX_TABLE[:14])))}
+
+# Triangle rotations: which corner becomes a, b, c
+TRIANGLE_ORDER = ((0, 1, 2), (1, 2, 0), (2, 0, 1))
+
+INDEX_MASK = 0xFFFFFFFF
+
+DEFAULT_NORMAL_BITS = 8
+DEFAULT_ROTATION_BITS = 16
+
+
+class CodecError(ValueError):
+    """Encoded data is malformed or doesn't match the declared layout."""
+
+
+# ---------------------------------------------------------------------------
+# Vertex codec (mode ATTRIBUTES)
+# ---------------------------------------------------------------------------
+
+def _vertex_block_size(stride):
+    size = (VERTEX_BLOCK_SIZE_BYTES // stride) & ~(BYTE_GROUP_SIZE - 1)
+    return min(size, VERTEX_BLOCK_MAX_SIZE)
+
+
+def _as_rows(data):
+    """data as a C-contiguous (count, stride) uint8 array."""
+    data = np.ascontiguousarray(data)
+    row_bytes = data.itemsize * int(np.prod(data.shape[1:], dtype=np.int64))
+    return data.view(np.uint8).reshape(len(data), row_bytes)
+
+
+def encode_vertex_buffer(data) -> bytes:
+    """Encode (count, ...) vertex data, one row per vertex.
+
+    Every byte column is delta-coded against the previous vertex, zigzagged
+    and split into groups of 16 that are stored at 0, 2, 4 or 8 bits per
+    value, whichever is smallest. All of that is done on the whole buffer
+    at once; only the final scatter into the output depends on group sizes.
+    """
+    rows = _as_rows(data)
+    count, stride = rows.shape
+    if not 0 < stride <= 256:
+        raise CodecError(f"Vertex size must be 1-256 bytes, got {stride}")
+    tail_size = max(stride, TAIL_MAX_SIZE)
+    if not count:
+        return bytes([VERTEX_HEADER]) + bytes(tail_size)
+
+    block = _vertex_block_size(stride)
+    groups_per_block = block // BYTE_GROUP_SIZE
+    block_count = -(-count // block)
+    last_groups = -(-(count - (block_count - 1) * block) // BYTE_GROUP_SIZE)
+
+    previous = np.concatenate([rows[:1], rows[:-1]])
+    deltas = rows - previous
+    zigzag = np.zeros((block_count * block, stride), np.uint8)
+    zigzag[:count] = (deltas << 1) ^ (deltas.view(np.int8) >> 7).view(np.uint8)
+
+    # Stream order: block, byte column, group, byte within group
+    groups = (zigzag.reshape(block_count, groups_per_block, BYTE_GROUP_SIZE, stride)
+              .transpose(0, 3, 1, 2).reshape(block_count * stride, groups_per_block, BYTE_GROUP_SIZE))
+    segment_groups = np.full(block_count * stride, groups_per_block)
+    segment_groups[-stride:] = last_groups
+    valid = np.arange(groups_per_block) < segment_groups[:, None]
+
+    # Candidate sizes in the encoder's tie-break order: 8, 0, 2 and 4 bits
+    sizes = np.stack([
+        np.full(valid.shape, 16),
+        np.where(groups.any(axis=2), 1 << 30, 0),
+        4 + (groups >= 3).sum(axis=2),
+        8 + (groups >= 15).sum(axis=2),
+    ])
+    choice = sizes.argmin(axis=0)
+    bitslog2 = np.where(valid, np.array([3, 0, 1, 2])[choice], 0)
+    group_size = np.where(valid, np.take_along_axis(sizes, choice[None], 0)[0], 0)
+
+    header_size = (segment_groups + 3) // 4
+    segment_size = header_size + group_size.sum(axis=1)
+    segment_start = 1 + np.cumsum(segment_size) - segment_size
+    group_start = (segment_start + header_size)[:, None] + np.cumsum(group_size, axis=1) - group_size
+
+    out = np.zeros(1 + int(segment_size.sum()) + tail_size, np.uint8)
+    out[0] = VERTEX_HEADER
+
+    # Headers: 2 bits per group, first group in the low bits
+    header_columns = -(-groups_per_block // 4)
+    codes = np.zeros((len(bitslog2), header_columns * 4), np.uint8)
+    codes[:, :groups_per_block] = bitslog2
+    headers = (codes.reshape(len(codes), header_columns, 4) << np.array([0, 2, 4, 6], np.uint8)).sum(
+        axis=2, dtype=np.uint8)
+    header_mask = np.arange(header_columns) < header_size[:, None]
+    out[(segment_start[:, None] + np.arange(header_columns))[header_mask]] = headers[header_mask]
+
+    modes = bitslog2.ravel()
+    starts = group_start.ravel()
+    values = groups.reshape(-1, BYTE_GROUP_SIZE)
+
+    raw = modes == 3
+    out[starts[raw, None] + np.arange(16)] = values[raw]
+    nibbles = modes == 2
+    packed = np.minimum(values[nibbles], 15)
+    out[starts[nibbles, None] + np.arange(8)] = (packed[:, 0::2] << 4) | packed[:, 1::2]
+    crumbs = modes == 1
+    packed = np.minimum(values[crumbs], 3)
+    out[starts[crumbs, None] + np.arange(4)] = ((packed[:, 0::4] << 6) | (packed[:, 1::4] << 4) |
+                                                (packed[:, 2::4] << 2) | packed[:, 3::4])
+
+    # Values that hit the sentinel follow the packed bits as whole bytes
+    threshold = np.select([modes == 1, modes == 2], [3, 15], 256)
+    fixed = np.select([modes == 1, modes == 2], [4, 8], 0)
+    extra = values >= threshold[:, None]
+    rank = np.cumsum(extra, axis=1) - 1
+    out[(starts + fixed)[:, None].repeat(BYTE_GROUP_SIZE, axis=1)[extra] + rank[extra]] = values[extra]
+
+    # Tail: the first vertex is the baseline of the first block
+    out[-stride:] = rows[0]
+    return out.tobytes()
+
+
+_UNPACK_2 = [((b >> 6) & 3, (b >> 4) & 3, (b >> 2) & 3, b & 3) for b in range(256)]
+_UNPACK_4 = [(b >> 4, b & 15) for b in range(256)]
+
+
+def _decode_bytes(data, pos, group_count, column):
+    """Decode one byte column of a block into the bytearray column."""
+    header_size = (group_count + 3) // 4
+    header = data[pos:pos + header_size]
+    pos += header_size
+    for group in range(group_count):
+        bits = (header[group >> 2] >> ((group & 3) * 2)) & 3
+        base = group * BYTE_GROUP_SIZE
+        if bits == 0:
+            continue
+        if bits == 3:
+            column[base:base + 16] = data[pos:pos + 16]
+            pos += 16
+            continue
+        if bits == 1:
+            fixed, sentinel = 4, 3
+            packed = [v for b in data[pos:pos + 4] for v in _UNPACK_2[b]]
+        else:
+            fixed, sentinel = 8, 15
+            packed = [v for b in data[pos:pos + 8] for v in _UNPACK_4[b]]
+        pos += fixed
+        for i, value in enumerate(packed):
+            if value == sentinel:
+                value = data[pos]
+                pos += 1
+            column[base + i] = value
+    return pos
+
+
+def decode_vertex_buffer(encoded, count, stride) -> np.ndarray:
+    """Decode a vertex codec stream back into a (count, stride) uint8 array."""
+    data = bytes(encoded)
+    tail_size = max(stride, TAIL_MAX_SIZE)
+    if len(data) < 1 + tail_size:
+        raise CodecError("Vertex stream is too short")
+    if data[0] != VERTEX_HEADER:
+        raise CodecError(f"Unsupported vertex stream header 0x{data[0]:02x}")
+
+    block = _vertex_block_size(stride)
+    zigzag = np.zeros((-(-count // block) * block, stride), np.uint8)
+    pos = 1
+    for block_start in range(0, count, block):
+        group_count = -(-min(block, count - block_start) // BYTE_GROUP_SIZE)
+        for k in range(stride):
+            column = bytearray(group_count * BYTE_GROUP_SIZE)
+            pos = _decode_bytes(data, pos, group_count, column)
+            zigzag[block_start:block_start + len(column), k] = np.frombuffer(column, np.uint8)
+            if pos > len(data) - tail_size:
+                raise CodecError("Vertex stream ends early")
+    if pos != len(data) - tail_size:
+        raise CodecError("Vertex stream has trailing data")
+
+    zigzag = zigzag[:count]
+    deltas = (zigzag >> 1) ^ ((zigzag & 1) * np.uint8(255))
+    baseline = np.frombuffer(data, np.uint8, count=stride, offset=len(data) - stride)
+    return np.cumsum(deltas, axis=0, dtype=np.uint8) + baseline
+
+
+# ---------------------------------------------------------------------------
+# Index codecs (modes TRIANGLES and INDICES)
+# ---------------------------------------------------------------------------
+
+def _write_vbyte(out, value):
+    while True:
+        out.append((value & 127) | (128 if value > 127 else 0))
+        value >>= 7
+        if not value:
+            return
+
+
+def _read_vbyte(data, pos):
+    lead = data[pos]
+    pos += 1
+    if lead < 128:
+        return lead, pos
+    result = lead & 127
+    shift = 7
+    for _ in range(4):
+        group = data[pos]
+        pos += 1
+        result |= (group & 127) << shift
+        shift += 7
+        if group < 128:
+            break
+    return result, pos
+
+
+def _zigzag32(delta):
+    delta &= INDEX_MASK
+    return ((delta << 1) & INDEX_MASK) ^ (INDEX_MASK if delta & 0x80000000 else 0)
+
+
+def _unzigzag32(value):
+    return (value >> 1) ^ (INDEX_MASK if value & 1 else 0)
+
+
+def _fifo_code(vertex_seq, vertices_pushed, vertex):
+    """1-14 for one of the 14 most recently pushed vertices, else -1."""
+    seq = vertex_seq.get(vertex)
+    if seq is not None and vertices_pushed - 1 - seq < 14:
+        return vertices_pushed - seq
+    return -1
+
+
+def encode_index_buffer(indices) -> bytes:
+    """Encode a triangle list with the FIFO-based triangle codec.
+
+    Each triangle becomes a 4+4 bit code (a recently seen edge plus a
+    recently seen / next / free third vertex) with free indices as varint
+    deltas. Triangles may come back rotated, never with flipped winding.
+    This is a state machine over the triangle order, so it runs as one
+    tight loop; the FIFOs are dicts from edge or vertex to push counter
+    instead of 16-entry scans.
+    """
+    indices = np.asarray(indices).ravel()
+    if len(indices) % 3:
+        raise CodecError("Triangle index count must be a multiple of 3")
+    triangles = indices.astype(np.int64).tolist()
+
+    codes = bytearray([INDEX_HEADER])
+    data = bytearray()
+    edge_seq = {}
+    edges_pushed = 0
+    vertex_seq = {}
+    vertices_pushed = 0
+    next_index = 0
+    last = 0
+
+    for i in range(0, len(triangles), 3):
+        corners = triangles[i:i + 3]
+        i0, i1, i2 = corners
+
+        best, rotation = 16, 0
+        for r, edge in enumerate(((i0, i1), (i1, i2), (i2, i0))):
+            seq = edge_seq.get(edge)
+            if seq is not None and edges_pushed - 1 - seq < best:
+                best, rotation = edges_pushed - 1 - seq, r
+
+        if best < 15:
+            a, b, c = (corners[k] for k in TRIANGLE_ORDER[rotation])
+            seq = vertex_seq.get(c)
+            fc = vertices_pushed - 1 - seq if seq is not None and vertices_pushed - 1 - seq < 16 else -1
+            if 1 <= fc < 13:
+                fec = fc
+            elif c == next_index:
+                fec = 0
+                next_index += 1
+            else:
+                fec = 15
+                # Strip-like runs: the free index is last - 1 or last + 1
+                if (c + 1) & INDEX_MASK == last:
+                    fec, last = 13, c
+                elif c == (last + 1) & INDEX_MASK:
+                    fec, last = 14, c
+
+            codes.append((best << 4) | fec)
+            if fec == 15:
+                _write_vbyte(data, _zigzag32(c - last))
+                last = c
+            if fec == 0 or fec >= 13:
+                vertex_seq[c] = vertices_pushed
+                vertices_pushed += 1
+            edge_seq[(c, b)] = edges_pushed
+            edge_seq[(a, c)] = edges_pushed + 1
+            edges_pushed += 2
+            continue
+
+        rotation = 1 if i1 == next_index else 2 if i2 == next_index else 0
+        a, b, c = (corners[k] for k in TRIANGLE_ORDER[rotation])
+
+        reset = a == 0 and b == 1 and c == 2 and next_index > 0
+        if reset:
+            next_index = 0
+            vertex_seq.clear()
+
+        fb = _fifo_code(vertex_seq, vertices_pushed, b)
+        fc = _fifo_code(vertex_seq, vertices_pushed, c)
+        if a == next_index:
+            fea = 0
+            next_index += 1
+        else:
+            fea = 15
+        if fb >= 0:
+            feb = fb
+        elif b == next_index:
+            feb = 0
+            next_index += 1
+        else:
+            feb = 15
+        if fc >= 0:
+            fec = fc
+        elif c == next_index:
+            fec = 0
+            next_index += 1
+        else:
+            fec = 15
+
+        code_aux = (feb << 4) | fec
+        table_index = CODE_AUX_INDEX.get(code_aux)
+        if fea == 0 and table_index is not None and not reset:
+            codes.append(0xf0 | table_index)
+        else:
+            codes.append(0xf0 | 14 | fea)
+            data.append(code_aux)
+
+        for vertex, fe in ((a, fea), (b, feb), (c, fec)):
+            if fe == 15:
+                _write_vbyte(data, _zigzag32(vertex - last))
+                last = vertex
+        for vertex, fe in ((a, fea), (b, feb), (c, fec)):
+            if fe == 0 or fe == 15:
+                vertex_seq[vertex] = vertices_pushed
+                vertices_pushed += 1
+        edge_seq[(b, a)] = edges_pushed
+        edge_seq[(c, b)] = edges_pushed + 1
+        edge_seq[(a, c)] = edges_pushed + 2
+        edges_pushed += 3
+
+    return bytes(codes + data + CODE_AUX_TABLE)
+
+
+def decode_index_buffer(encoded, count, index_size=4) -> np.ndarray:
+    """Decode a triangle codec stream into count indices."""
+    data = bytes(encoded)
+    if len(data) < 1 + count // 3 + 16:
+        raise CodecError("Index stream is too short")
+    if data[0] != INDEX_HEADER:
+        raise CodecError(f"Unsupported index stream header 0x{data[0]:02x}")
+
+    edge_fifo = [(INDEX_MASK, INDEX_MASK)] * 16
+    vertex_fifo = [INDEX_MASK] * 16
+    edge_offset = vertex_offset = 0
+    next_index = last = 0
+    code_pos = 1
+    pos = 1 + count // 3
+    data_end = len(data) - 16
+    table = data[data_end:]
+    out = []
+
+    def push_vertex(vertex, condition=True):
+        nonlocal vertex_offset
+        vertex_fifo[vertex_offset] = vertex
+        vertex_offset = (vertex_offset + condition) & 15
+
+    def push_edge(a, b):
+        nonlocal edge_offset
+        edge_fifo[edge_offset] = (a, b)
+        edge_offset = (edge_offset + 1) & 15
+
+    for _ in range(count // 3):
+        if pos > data_end:
+            raise CodecError("Index stream ends early")
+        code = data[code_pos]
+        code_pos += 1
+
+        if code < 0xf0:
+            a, b = edge_fifo[(edge_offset - 1 - (code >> 4)) & 15]
+            fec = code & 15
+            if fec < 13:
+                c = next_index if fec == 0 else vertex_fifo[(vertex_offset - 1 - fec) & 15]
+                next_index += fec == 0
+                push_vertex(c, fec == 0)
+            else:
+                if fec == 15:
+                    value, pos = _read_vbyte(data, pos)
+                    c = (last + _unzigzag32(value)) & INDEX_MASK
+                else:
+                    c = (last + (-1 if fec == 13 else 1)) & INDEX_MASK
+                last = c
+                push_vertex(c)
+            out += (a, b, c)
+            push_edge(c, b)
+            push_edge(a, c)
+            continue
+
+        if code < 0xfe:
+            code_aux = table[code & 15]
+            fea = 0
+        else:
+            code_aux = data[pos]
+            pos += 1
+            fea = 0 if code == 0xfe else 15
+            if code_aux == 0:
+                next_index = 0
+        feb, fec = code_aux >> 4, code_aux & 15
+
+        if fea == 0:
+            a = next_index
+            next_index += 1
+        else:
+            a = 0
+        if feb == 0:
+            b = next_index
+            next_index += 1
+        else:
+            b = vertex_fifo[(vertex_offset - feb) & 15]
+        if fec == 0:
+            c = next_index
+            next_index += 1
+        else:
+            c = vertex_fifo[(vertex_offset - fec) & 15]
+
+        if fea == 15:
+            value, pos = _read_vbyte(data, pos)
+            a = last = (last + _unzigzag32(value)) & INDEX_MASK
+        if feb == 15:
+            value, pos = _read_vbyte(data, pos)
+            b = last = (last + _unzigzag32(value)) & INDEX_MASK
+        if fec == 15:
+            value, pos = _read_vbyte(data, pos)
+            c = last = (last + _unzigzag32(value)) & INDEX_MASK
+
+        out += (a, b, c)
+        push_vertex(a)
+        push_vertex(b, feb == 0 or feb == 15)
+        push_vertex(c, fec == 0 or fec == 15)
+        push_edge(b, a)
+        push_edge(c, b)
+        push_edge(a, c)
+
+    if pos != data_end:
+        raise CodecError("Index stream has trailing data")
+    return np.array(out, np.uint16 if index_size == 2 else np.uint32)
+
+
+def same_triangles(decoded, original) -> bool:
+    """Whether two triangle lists match up to the rotations the codec applies."""
+    decoded = np.asarray(decoded).reshape(-1, 3)
+    original = np.asarray(original).reshape(-1, 3)
+    if decoded.shape != original.shape:
+        return False
+    matches = [(decoded == np.roll(original, -k, axis=1)).all(axis=1) for k in range(3)]
+    return bool(np.logical_or.reduce(matches).all())
+
+
+def encode_index_sequence(indices) -> bytes:
+    """Encode arbitrary index lists (lines, points, strips) as two-baseline deltas."""
+    out = bytearray([SEQUENCE_HEADER])
+    last = [0, 0]
+    current = 0
+    for index in np.asarray(indices).ravel().astype(np.int64).tolist():
+        # Switch baselines when the delta from the current one gets large
+        delta = index - last[current]
+        current ^= abs(delta) >= 30
+        _write_vbyte(out, (_zigzag32(index - last[current]) << 1) | current)
+        last[current] = index
+    return bytes(out + bytes(4))
+
+
+def decode_index_sequence(encoded, count, index_size=4) -> np.ndarray:
+    data = bytes(encoded)
+    if len(data) < 1 + count + 4 or data[0] != SEQUENCE_HEADER:
+        raise CodecError("Not an index sequence stream")
+    last = [0, 0]
+    pos = 1
+    out = []
+    for _ in range(count):
+        value, pos = _read_vbyte(data, pos)
+        current = value & 1
+        index = (last[current] + _unzigzag32(value >> 1)) & INDEX_MASK
+        last[current] = index
+        out.append(index)
+    if pos != len(data) - 4:
+        raise CodecError("Index sequence has trailing data")
+    return np.array(out, np.uint16 if index_size == 2 else np.uint32)
+
+
+# ---------------------------------------------------------------------------
+# Filters
+# ---------------------------------------------------------------------------
+
+def _quantize_snorm(values, bits):
+    scale = (1 << (bits - 1)) - 1
+    values = np.clip(values, -1.0, 1.0)
+    return np.trunc(values * scale + np.where(values >= 0, 0.5, -0.5)).astype(np.int32)
+
+
+def _round_signed(values):
+    half = np.where(values >= 0, 0.5, -0.5).astype(values.dtype)
+    return np.trunc(values + half).astype(np.int32)
+
+
+def encode_filter_oct(vectors, stride=4, bits=DEFAULT_NORMAL_BITS) -> np.ndarray:
+    """Octahedral-encode unit vectors (n, 3) or tangents (n, 4, w = sign).
+
+    Returns (n, 4) int8 for stride 4 or int16 for stride 8; the third
+    component stores the encoding of 1.0 so the decoder knows the scale.
+    """
+    vectors = np.asarray(vectors, np.float32)
+    x, y, z = vectors[:, 0], vectors[:, 1], vectors[:, 2]
+    w = vectors[:, 3] if vectors.shape[1] > 3 else np.zeros_like(x)
+
+    length = np.abs(x) + np.abs(y) + np.abs(z)
+    inverse = np.where(length == 0, 0, 1 / np.where(length == 0, 1, length)).astype(np.float32)
+    x, y = x * inverse, y * inverse
+    u = np.where(z >= 0, x, (1 - np.abs(y)) * np.where(x >= 0, 1, -1))
+    v = np.where(z >= 0, y, (1 - np.abs(x)) * np.where(y >= 0, 1, -1))
+
+    out = np.empty((len(vectors), 4), np.int8 if stride == 4 else np.dtype('<i2'))
+    out[:, 0] = _quantize_snorm(u, bits)
+    out[:, 1] = _quantize_snorm(v, bits)
+    out[:, 2] = _quantize_snorm(np.ones_like(u), bits)
+    out[:, 3] = _quantize_snorm(w, stride * 2)
+    return out
+
+
+def decode_filter_oct(data) -> np.ndarray:
+    """Decode octahedral int8/int16 (n, 4) data into normalized integer vectors."""
+    data = np.asarray(data)
+    limit = np.iinfo(data.dtype).max
+    x = data[:, 0].astype(np.float32)
+    y = data[:, 1].astype(np.float32)
+    z = data[:, 2].astype(np.float32) - np.abs(x) - np.abs(y)
+    t = np.minimum(z, 0)
+    x = x + np.where(x >= 0, t, -t)
+    y = y + np.where(y >= 0, t, -t)
+    scale = np.float32(limit) / np.sqrt(x * x + y * y + z * z)
+    out = data.copy()
+    out[:, 0] = _round_signed(x * scale)
+    out[:, 1] = _round_signed(y * scale)
+    out[:, 2] = _round_signed(z * scale)
+    return out
+
+
+def encode_filter_quat(quaternions, bits=DEFAULT_ROTATION_BITS) -> np.ndarray:
+    """Encode unit quaternions (n, 4) as three components plus the index of the dropped one."""
+    q = np.asarray(quaternions, np.float32)
+    largest = np.abs(q).argmax(axis=1)
+    rows = np.arange(len(q))
+    sign = np.where(q[rows, largest] < 0, -1.0, 1.0).astype(np.float32)
+    out = np.empty((len(q), 4), np.dtype('<i2'))
+    for k in range(3):
+        out[:, k] = _quantize_snorm(q[rows, (largest + k + 1) & 3] * np.float32(np.sqrt(2)) * sign, bits)
+    out[:, 3] = (_quantize_snorm(np.ones(1), bits)[0] & ~3) | largest
+    return out
+
+
+def decode_filter_quat(data) -> np.ndarray:
+    """Decode quaternion filter data into normalized int16 quaternions."""
+    data = np.asarray(data, np.dtype('<i2'))
+    scale = np.float32(1 / np.sqrt(2)) / (data[:, 3].astype(np.int32) | 3).astype(np.float32)
+    xyz = data[:, :3].astype(np.float32) * scale[:, None]
+    w = np.sqrt(np.maximum(1 - (xyz * xyz).sum(axis=1), 0))
+    largest = data[:, 3].astype(np.int32) & 3
+    rows = np.arange(len(data))
+    out = np.empty_like(data)
+    for k in range(3):
+        out[rows, (largest + k + 1) & 3] = _round_signed(xyz[:, k] * 32767)
+    out[rows, largest] = _round_signed(w * 32767)
+    return out
+
+
+def encode_filter_exp(values, bits) -> np.ndarray:
+    """Encode float rows as 24-bit mantissas sharing each row's exponent."""
+    values = np.asarray(values, np.float32)
+    exponent = np.maximum(np.frexp(values)[1].max(axis=1), -100).astype(np.int64) - (bits - 1)
+    mantissa = _round_signed(np.ldexp(values, -exponent[:, None]))
+    return ((mantissa & 0xFFFFFF) | ((exponent[:, None] & 0xFF) << 24)).astype(np.uint32)
+
+
+def decode_filter_exp(data) -> np.ndarray:
+    data = np.asarray(data, np.uint32)
+    mantissa = (data << 8).view(np.int32) >> 8
+    exponent = data.view(np.int32) >> 24
+    return np.ldexp(mantissa.astype(np.float32), exponent).astype(np.float32)
+
+
+# ---------------------------------------------------------------------------
+# glTF
+# ---------------------------------------------------------------------------
+
+def decode_view(bin_data, meshopt) -> bytes:
+    """The uncompressed bytes of a bufferView's EXT_meshopt_compression data."""
+    start = meshopt.get('byteOffset', 0)
+    encoded = memoryview(bin_data)[start:start + meshopt['byteLength']]
+    count, stride = meshopt['count'], meshopt['byteStride']
+    mode = meshopt['mode']
+
+    if mode == 'ATTRIBUTES':
+        data = decode_vertex_buffer(encoded, count, stride)
+    elif mode == 'TRIANGLES':
+        data = decode_index_buffer(encoded, count, stride)
+    elif mode == 'INDICES':
+        data = decode_index_sequence(encoded, count, stride)
+    else:
+        raise CodecError(f"Unknown {EXTENSION} mode {mode!r}")
+
+    filter_name = meshopt.get('filter', 'NONE')
+    if filter_name == 'OCTAHEDRAL':
+        data = decode_filter_oct(data.view(np.int8 if stride == 4 else np.dtype('<i2')).reshape(count, 4))
+    elif filter_name == 'QUATERNION':
+        data = decode_filter_quat(data.view(np.dtype('<i2')).reshape(count, 4))
+    elif filter_name == 'EXPONENTIAL':
+        data = decode_filter_exp(data.view(np.uint32).reshape(count, -1))
+    elif filter_name != 'NONE':
+        raise CodecError(f"Unknown {EXTENSION} filter {filter_name!r}")
+    return np.ascontiguousarray(data).tobytes()
+
+
+def _add_extension(gltf, name):
+    for key in ('extensionsUsed', 'extensionsRequired'):
+        extensions = gltf.setdefault(key, [])
+        if name not in extensions:
+            extensions.append(name)
+
+
+def _usages(gltf):
+    """{accessor index: usage} for every accessor worth compressing.
+
+    usage is ('attribute', name), ('target', name), ('indices', mode),
+    ('input', None) or ('output', (path, interpolation)).
+    """
+    usages = {}
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh['primitives']:
+            for name, index in primitive['attributes'].items():
+                usages.setdefault(index, ('attribute', name))
+            for target in primitive.get('targets', []):
+                for name, index in target.items():
+                    usages.setdefault(index, ('target', name))
+            if 'indices' in primitive:
+                usages.setdefault(primitive['indices'], ('indices', primitive.get('mode', 4)))
+    for animation in gltf.get('animations', []):
+        for channel in animation['channels']:
+            sampler = animation['samplers'][channel['sampler']]
+            usages.setdefault(sampler['input'], ('input', None))
+            usages.setdefault(sampler['output'], ('output', (channel['target']['path'],
+                                                             sampler.get('interpolation', 'LINEAR'))))
+    for skin in gltf.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            usages.setdefault(skin['inverseBindMatrices'], ('input', None))
+    return usages
+
+
+def _encode_accessor(gltf, bin_data, index, usage, normal_bits, rotation_bits, exponential_bits):
+    """Return (data rows, mode, filter, target) for one accessor, or None to leave it alone.
+
+    Updates the accessor when a filter changes how its values are stored.
+    """
+    accessor = gltf['accessors'][index]
+    kind, detail = usage
+    is_float = accessor['componentType'] == 5126
+
+    if kind == 'indices':
+        indices = read_accessor(gltf, bin_data, index).ravel()
+        if accessor['componentType'] == 5121:
+            indices = indices.astype(np.dtype('<u2'))
+            accessor['componentType'] = 5123
+        mode = 'TRIANGLES' if detail == 4 and len(indices) % 3 == 0 else 'INDICES'
+        return indices.reshape(-1, 1), mode, 'NONE', ELEMENT_ARRAY_BUFFER
+
+    target = ARRAY_BUFFER if kind in ('attribute', 'target') else None
+
+    if kind == 'attribute' and detail in ('NORMAL', 'TANGENT') and normal_bits:
+        vectors = read_accessor(gltf, bin_data, index, decode=True)
+        stride = 4 if normal_bits <= 8 else 8
+        accessor.update(componentType=5120 if stride == 4 else 5122, normalized=True)
+        accessor.pop('min', None)
+        accessor.pop('max', None)
+        return encode_filter_oct(vectors, stride, normal_bits), 'ATTRIBUTES', 'OCTAHEDRAL', target
+
+    if kind == 'output' and detail in (('rotation', 'LINEAR'), ('rotation', 'STEP')) and rotation_bits:
+        quaternions = read_accessor(gltf, bin_data, index, decode=True)
+        accessor.update(componentType=5122, normalized=True)
+        accessor.pop('min', None)
+        accessor.pop('max', None)
+        return encode_filter_quat(quaternions, rotation_bits), 'ATTRIBUTES', 'QUATERNION', target
+
+    values = read_accessor(gltf, bin_data, index)
+    if exponential_bits and is_float and kind != 'input':
+        encoded = encode_filter_exp(values, exponential_bits)
+        if 'min' in accessor:
+            decoded = decode_filter_exp(encoded)
+            accessor['min'] = decoded.min(axis=0).tolist()
+            accessor['max'] = decoded.max(axis=0).tolist()
+        return encoded, 'ATTRIBUTES', 'EXPONENTIAL', target
+
+    if target is not None:
+        values = pad_columns(values)
+    elif (values.shape[1] * values.dtype.itemsize) % 4:
+        # Non-vertex data can't carry a byteStride, so it has to be 4-byte rows already
+        return None
+    return values, 'ATTRIBUTES', 'NONE', target
+
+
+def compress_gltf(gltf, bin_data, normal_bits=DEFAULT_NORMAL_BITS, rotation_bits=DEFAULT_ROTATION_BITS,
+                  exponential_bits=None, verify=False):
+    """Move gltf's vertex, index and animation data to EXT_meshopt_compression.
+
+    Normals and tangents are octahedral-encoded at normal_bits and rotation
+    keyframes quaternion-encoded at rotation_bits (0 disables either).
+    exponential_bits additionally applies the lossy exponential filter to
+    other float data. gltf is rewritten in place; returns (pieces, stats).
+    With verify=True every stream is decoded again and compared.
+    """
+    if any('uri' in buffer for buffer in gltf.get('buffers', [])):
+        raise ValueError("Only self-contained GLBs (no external buffers) are supported")
+    if EXTENSION in gltf.get('extensionsUsed', []):
+        raise ValueError(f"Already uses {EXTENSION}")
+
+    views = existing_views(gltf, bin_data)
+    stats = {'streams': 0, 'raw_bytes': 0, 'encoded_bytes': 0}
+    quantized_attributes = False
+
+    for index, usage in sorted(_usages(gltf).items()):
+        accessor = gltf['accessors'][index]
+        if 'bufferView' not in accessor or 'sparse' in accessor:
+            continue
+        encoded = _encode_accessor(gltf, bin_data, index, usage, normal_bits, rotation_bits,
+                                   exponential_bits)
+        if encoded is None:
+            continue
+        rows, mode, filter_name, target = encoded
+        rows = _as_rows(rows)
+        count, stride = rows.shape
+
+        if mode == 'TRIANGLES':
+            stream = encode_index_buffer(rows.view(np.dtype(f'<u{stride}')).ravel())
+        elif mode == 'INDICES':
+            stream = encode_index_sequence(rows.view(np.dtype(f'<u{stride}')).ravel())
+        else:
+            stream = encode_vertex_buffer(rows)
+
+        meshopt = {'byteStride': stride, 'count': count, 'mode': mode}
+        if filter_name != 'NONE':
+            meshopt['filter'] = filter_name
+        if verify:
+            decoder_input = dict(meshopt, byteOffset=0, byteLength=len(stream), filter='NONE')
+            decoded = decode_view(stream, decoder_input)
+            if mode == 'TRIANGLES':
+                dtype = np.dtype(f'<u{stride}')
+                intact = same_triangles(np.frombuffer(decoded, dtype), rows.view(dtype).ravel())
+            else:
+                intact = decoded == rows.tobytes()
+            if not intact:
+                raise CodecError(f"Accessor {index} did not survive a round trip")
+
+        view = {'_meshopt': meshopt}
+        if target is not None:
+            view['target'] = target
+        if target == ARRAY_BUFFER:
+            view['byteStride'] = stride
+        views.append((view, stream))
+        accessor['bufferView'] = len(views) - 1
+        accessor.pop('byteOffset', None)
+
+        quantized_attributes |= filter_name == 'OCTAHEDRAL'
+        stats['streams'] += 1
+        stats['raw_bytes'] += rows.nbytes
+        stats['encoded_bytes'] += len(stream)
+
+    pieces = compact_buffers(gltf, views)
+
+    # Compressed streams live in the BIN chunk; the views themselves point
+    # into a fallback buffer with no data that the decoder fills in
+    fallback_length = 0
+    for view in gltf.get('bufferViews', []):
+        meshopt = view.pop('_meshopt', None)
+        if meshopt is None:
+            continue
+        length = meshopt['count'] * meshopt['byteStride']
+        meshopt.update(buffer=0, byteOffset=view['byteOffset'], byteLength=view['byteLength'])
+        view.update(buffer=1, byteOffset=fallback_length, byteLength=length)
+        view['extensions'] = {EXTENSION: dict(sorted(meshopt.items()))}
+        fallback_length += length + padding(length)
+
+    if stats['streams']:
+        if not gltf['buffers']:
+            gltf['buffers'] = [{'byteLength': 0}]
+        gltf['buffers'].append({'byteLength': fallback_length, 'extensions': {EXTENSION: {'fallback': True}}})
+        _add_extension(gltf, EXTENSION)
+    if quantized_attributes:
+        _add_extension(gltf, 'KHR_mesh_quantization')
+    return pieces, stats
+
+
+def decompress_gltf(gltf, bin_data):
+    """Decode every EXT_meshopt_compression view back into a plain GLB layout.
+
+    Rewrites gltf in place and returns the new BIN chunk pieces.
+    """
+    views = []
+    for view in gltf.get('bufferViews', []):
+        meshopt = view.get('extensions', {}).get(EXTENSION)
+        info = {k: v for k, v in view.items() if k not in ('buffer', 'byteOffset', 'byteLength', 'extensions')}
+        if meshopt is not None:
+            if meshopt.get('buffer', 0) != 0:
+                raise ValueError("Compressed data outside the BIN chunk is not supported")
+            views.append((info, decode_view(bin_data, meshopt)))
+            continue
+        start = view.get('byteOffset', 0)
+        views.append((info, memoryview(bin_data)[start:start + view['byteLength']]))
+
+    pieces = compact_buffers(gltf, views)
+    for key in ('extensionsUsed', 'extensionsRequired'):
+        if EXTENSION in gltf.get(key, []):
+            gltf[key].remove(EXTENSION)
+            if not gltf[key]:
+                del gltf[key]
+    return pieces
+
+
+def _load_bin(path, bin_range):
+    if bin_range is None:
+        return b''
+    # Read into memory (not a memmap) so the output may overwrite the input
+    return np.fromfile(path, np.uint8, count=bin_range.length, offset=bin_range.offset)
+
+
+def compress_glb(input_path, output_path, normal_bits=DEFAULT_NORMAL_BITS,
+                 rotation_bits=DEFAULT_ROTATION_BITS, exponential_bits=None, verify=False):
+    """Compress a GLB file. input_path and output_path may be the same file."""
+    gltf, bin_range = read_glb_layout(input_path)
+    bin_data = _load_bin(input_path, bin_range)
+    input_size = os.path.getsize(input_path)
+    pieces, stats = compress_gltf(gltf, bin_data, normal_bits, rotation_bits, exponential_bits, verify)
+    stats['bytes_before'] = input_size
+    stats['bytes_after'] = write_glb(output_path, gltf, pieces)
+    return stats
+
+
+def decompress_glb(input_path, output_path):
+    """Write a copy of a meshopt-compressed GLB with plain buffers."""
+    gltf, bin_range = read_glb_layout(input_path)
+    pieces = decompress_gltf(gltf, _load_bin(input_path, bin_range))
+    return write_glb(output_path, gltf, pieces)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compress a GLB with EXT_meshopt_compression")
+    parser.add_argument("input", help="Input GLB")
+    parser.add_argument("output", nargs="?", default=None, help="Output GLB (default: overwrite input)")
+    parser.add_argument("--normal-bits", type=int, default=DEFAULT_NORMAL_BITS,
+                        help="Octahedral normal/tangent precision, 0 to disable (default: 8)")
+    parser.add_argument("--rotation-bits", type=int, default=DEFAULT_ROTATION_BITS,
+                        help="Quaternion filter precision for rotations, 0 to disable (default: 16)")
+    parser.add_argument("--exponential-bits", type=int, default=None,
+                        help="Apply the lossy exponential filter to other float data at this precision")
+    parser.add_argument("--verify", action="store_true", help="Decode every stream again and compare")
+    parser.add_argument("--decompress", action="store_true", help="Decode a compressed GLB instead")
+    args = parser.parse_args()
+
+    output_path = args.output or args.input
+    input_size = os.path.getsize(args.input)
+
+    if args.decompress:
+        output_size = decompress_glb(args.input, output_path)
+        print(f"✅ Decompressed: {output_path} ({input_size:,} -> {output_size:,} bytes)")
+        return
+
+    with open(args.input, 'rb') as f:
+        gzip_before = len(gzip.compress(f.read(), 9))
+    stats = compress_glb(args.input, output_path, args.normal_bits, args.rotation_bits,
+                         args.exponential_bits, args.verify)
+    with open(output_path, 'rb') as f:
+        gzip_after = len(gzip.compress(f.read(), 9))
+
+    print(f"✅ Compressed with {EXTENSION}!")
+    print(f"   Input: {args.input} ({input_size:,} bytes, {gzip_before:,} gzipped)")
+    print(f"   Output: {output_path} ({stats['bytes_after']:,} bytes, {gzip_after:,} gzipped)")
+    if stats['streams']:
+        print(f"   Streams: {stats['streams']} ({stats['raw_bytes']:,} -> {stats['encoded_bytes']:,} bytes)")
+    if args.verify:
+        print("   Round trip verified")
+
+
+if __name__ == '__main__':
+    main()
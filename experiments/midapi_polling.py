@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+MidAPI Polling Scheduler - One loop for every in-flight generation task
+Polls task status on adaptive intervals seeded from how long past tasks took
+for each speed tier, with jitter and a global request budget
+"""
+
+import heapq
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+# Typical completion times (seconds) until we have history of our own
+DEFAULT_EXPECTED_SECONDS = {
+    "turbo": 20.0,
+    "fast": 45.0,
+    "relaxed": 180.0,
+}
+
+DEFAULT_HISTORY_PATH = Path(__file__).resolve().parent / ".midapi-timings.json"
+
+
+class CompletionHistory:
+    """Recent completion times per speed tier, persisted as JSON."""
+
+    def __init__(self, path: Optional[Path] = DEFAULT_HISTORY_PATH, window: int = 50):
+        self.path = Path(path) if path else None
+        self.window = window
+        self.samples = {}
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.samples = json.load(f)
+            except (OSError, ValueError):
+                self.samples = {}
+
+    def expected(self, speed: str) -> float:
+        """Median completion time for a tier, or the built-in default."""
+        samples = self.samples.get(speed)
+        if samples:
+            return statistics.median(samples)
+        return DEFAULT_EXPECTED_SECONDS.get(speed, DEFAULT_EXPECTED_SECONDS["fast"])
+
+    def record(self, speed: str, seconds: float):
+        with self._lock:
+            samples = self.samples.setdefault(speed, [])
+            samples.append(round(seconds, 1))
+            del samples[:-self.window]
+
+    def save(self):
+        """Write the history atomically next to its final location."""
+        if not self.path:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(self.samples, f, indent=2)
+            os.replace(temp_path, self.path)
+
+
+class PollScheduler:
+    """Multiplexes status checks for many tasks through a single loop.
+
+    check(task_id) returns ("pending", None), ("success", result) or
+    ("failed", error). The first check for a task is scheduled shortly
+    before its tier's expected completion time; after that the interval
+    halves towards the expected time, then backs off exponentially once a
+    task runs late. Checks across all tasks are spaced to stay within
+    requests_per_minute, and max_requests caps the whole run.
+    """
+
+    def __init__(self, check: Callable[[str], tuple],
+                 history: Optional[CompletionHistory] = None,
+                 min_interval: float = 2.0,
+                 max_interval: float = 30.0,
+                 max_wait: float = 300.0,
+                 requests_per_minute: float = 60.0,
+                 max_requests: Optional[int] = None,
+                 jitter: float = 0.15,
+                 backoff: float = 1.5):
+        self.check = check
+        self.history = history or CompletionHistory(path=None)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_wait = max_wait
+        self.request_spacing = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.max_requests = max_requests
+        self.jitter = jitter
+        self.backoff = backoff
+
+        self._queue = []
+        self._tasks = {}
+        self.requests = 0
+        self.polls = {}
+
+    def add(self, task_id: str, speed: str = "fast", submitted_at: Optional[float] = None,
+            context=None):
+        """Start tracking a submitted task."""
+        submitted_at = submitted_at or time.time()
+        expected = self.history.expected(speed)
+        self._tasks[task_id] = {
+            "speed": speed,
+            "submitted_at": submitted_at,
+            "expected": expected,
+            "interval": self.min_interval,
+            "context": context,
+        }
+        self.polls[task_id] = 0
+        first_check = submitted_at + max(self.min_interval, expected * 0.6)
+        heapq.heappush(self._queue, (self._jittered(first_check, submitted_at), task_id))
+
+    def elapsed(self, task_id: str) -> float:
+        """Seconds since a tracked task was submitted."""
+        return time.time() - self._tasks[task_id]["submitted_at"]
+
+    def _jittered(self, due: float, now: float) -> float:
+        delay = max(due - now, 0.0)
+        return now + delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _next_interval(self, task: dict, now: float) -> float:
+        elapsed = now - task["submitted_at"]
+        remaining = task["expected"] - elapsed
+        if remaining > self.min_interval:
+            # Close in on the expected finish time
+            interval = remaining / 2
+        else:
+            # Running late: back off exponentially
+            interval = task["interval"]
+            task["interval"] = min(interval * self.backoff, self.max_interval)
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def run(self, on_complete: Callable[[str, str, object, object], None],
+            stop: Optional[threading.Event] = None) -> dict:
+        """Poll until every task has finished, failed or timed out.
+
+        on_complete(task_id, state, value, context) is called from this loop
+        as soon as each task resolves, with state "success", "failed" or
+        "timeout". Setting stop ends the loop early and resolves the
+        remaining tasks as "cancelled". Returns {task_id: (state, value)}.
+        """
+        outcomes = {}
+        last_request = 0.0
+
+        while self._queue:
+            due, task_id = heapq.heappop(self._queue)
+            task = self._tasks[task_id]
+
+            # Sleep until the task is due and the request budget allows it
+            wait = max(due, last_request + self.request_spacing) - time.time()
+            if wait > 0:
+                if stop is not None:
+                    stop.wait(wait)
+                else:
+                    time.sleep(wait)
+
+            now = time.time()
+            if stop is not None and stop.is_set():
+                outcome = ("cancelled", None)
+            elif now - task["submitted_at"] > self.max_wait:
+                outcome = ("timeout", "Timeout waiting for generation")
+            elif self.max_requests is not None and self.requests >= self.max_requests:
+                outcome = ("failed", "Poll request budget exhausted")
+            else:
+                last_request = now
+                self.requests += 1
+                self.polls[task_id] += 1
+                try:
+                    outcome = self.check(task_id)
+                except Exception as e:
+                    outcome = ("pending", e)
+
+            state, value = outcome
+            if state == "pending":
+                now = time.time()
+                next_due = now + self._next_interval(task, now)
+                heapq.heappush(self._queue, (self._jittered(next_due, now), task_id))
+                continue
+
+            if state == "success":
+                self.history.record(task["speed"], time.time() - task["submitted_at"])
+            outcomes[task_id] = outcome
+            on_complete(task_id, state, value, task["context"])
+
+        self.history.save()
+        return outcomes
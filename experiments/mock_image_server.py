@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Mock Image Server - Local stand-in for MidAPI, Pollinations and HuggingFace
+Serves real PNGs with configurable latency, failures and 429 rate limiting,
+so the generators and benchmarks run without API keys
+
+Point the clients at it with:
+
+    MIDAPI_BASE_URL=http://127.0.0.1:8765/api/v1/mj
+    POLLINATIONS_BASE_URL=http://127.0.0.1:8765
+    HUGGINGFACE_BASE_URL=http://127.0.0.1:8765
+"""
+
+import itertools
+import json
+import os
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8765
+
+
+def make_png(size_kb: int) -> bytes:
+    """An incompressible RGB PNG of roughly size_kb kilobytes (stdlib only)."""
+    side = max(8, int((size_kb * 1024 / 3) ** 0.5))
+    rows = b''.join(b'\x00' + os.urandom(side * 3) for _ in range(side))
+
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', side, side, 8, 2, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(rows, 1)) +
+            chunk(b'IEND', b''))
+
+
+class MockConfig:
+    """Knobs for how the fake backends behave."""
+
+    def __init__(self, latency=0.5, jitter=0.5, failure_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=1, task_seconds=3.0, task_failure_rate=0.0, image_kb=256):
+        self.latency = latency                      # median seconds per synchronous call
+        self.jitter = jitter                        # lognormal sigma; higher = heavier tail
+        self.failure_rate = failure_rate            # chance of an HTTP 500
+        self.rate_limit_rate = rate_limit_rate      # chance of an HTTP 429 + Retry-After
+        self.retry_after = retry_after
+        self.task_seconds = task_seconds            # median MidAPI task duration
+        self.task_failure_rate = task_failure_rate  # chance a MidAPI task ends failed
+        self.image_kb = image_kb
+
+    def delay(self, median):
+        return median * random.lognormvariate(0, self.jitter) if median > 0 else 0.0
+
+
+class MockState:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.image = make_png(config.image_kb)
+        self.tasks = {}
+        self.ids = itertools.count(1)
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def count(self, key):
+        with self.lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None  # set by make_server
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, payload, status=200):
+        self._send(status, json.dumps(payload).encode('utf-8'))
+
+    def _injected_error(self) -> bool:
+        """Maybe answer with a 429 or 500 instead of the real response."""
+        config = self.state.config
+        roll = random.random()
+        if roll < config.rate_limit_rate:
+            self.state.count('429')
+            self._send(429, b'{"error": "Rate limit exceeded"}',
+                       headers={'Retry-After': str(config.retry_after)})
+            return True
+        if roll < config.rate_limit_rate + config.failure_rate:
+            self.state.count('500')
+            self._json({'error': 'Internal server error'}, 500)
+            return True
+        return False
+
+    def _image(self):
+        """The PNG, honouring a Range request like a CDN would."""
+        image = self.state.image
+        match = re.match(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        if match and int(match.group(1)) < len(image):
+            start = int(match.group(1))
+            self._send(206, image[start:], 'image/png',
+                       {'Content-Range': f'bytes {start}-{len(image) - 1}/{len(image)}'})
+        else:
+            self._send(200, image, 'image/png')
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        config = self.state.config
+
+        if url.path.endswith('/record-info'):
+            self.state.count('midapi.record-info')
+            if self._injected_error():
+                return
+            task_id = parse_qs(url.query).get('taskId', [''])[0]
+            task = self.state.tasks.get(task_id)
+            if task is None:
+                self._json({'code': 404, 'msg': 'Task not found'})
+                return
+            ready_at, failed = task
+            if time.time() < ready_at:
+                data = {'taskId': task_id, 'successFlag': 0}
+            elif failed:
+                data = {'taskId': task_id, 'successFlag': 2, 'errorMessage': 'Mock task failure'}
+            else:
+                host = self.headers.get('Host')
+                data = {'taskId': task_id, 'successFlag': 1, 'resultInfoJson': {
+                    'resultUrls': [{'resultUrl': f'http://{host}/images/{task_id}.png'}]}}
+            self._json({'code': 200, 'msg': 'success', 'data': data})
+
+        elif url.path.startswith('/images/'):
+            self.state.count('images')
+            self._image()
+
+        elif url.path.startswith('/prompt/'):
+            self.state.count('pollinations')
+            time.sleep(config.delay(config.latency))
+            if not self._injected_error():
+                self._image()
+
+        else:
+            self._json({'error': 'Not found'}, 404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        config = self.state.config
+        body = self._read_body()
+
+        if url.path.endswith('/generate'):
+            self.state.count('midapi.generate')
+            if self._injected_error():
+                return
+            prompt = json.loads(body or b'{}').get('prompt')
+            if not prompt:
+                self._json({'code': 422, 'msg': 'prompt is required'})
+                return
+            task_id = f"mock-{next(self.state.ids)}"
+            failed = random.random() < config.task_failure_rate
+            self.state.tasks[task_id] = (time.time() + config.delay(config.task_seconds), failed)
+            self._json({'code': 200, 'msg': 'success', 'data': {'taskId': task_id}})
+
+        elif url.path.startswith('/models/'):
+            self.state.count('huggingface')
+            time.sleep(config.delay(config.latency))
+            if not self._injected_error():
+                self._image()
+
+        else:
+            self._json({'error': 'Not found'}, 404)
+
+
+def make_server(config: MockConfig, host='127.0.0.1', port=DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Build (but don't start) a server; port 0 picks a free port."""
+    handler = type('BoundMockHandler', (MockHandler,), {'state': MockState(config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mock MidAPI/Pollinations/HuggingFace server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.5,
+                        help="Median seconds per Pollinations/HuggingFace call")
+    parser.add_argument("--jitter", type=float, default=0.5,
+                        help="Lognormal sigma of all delays (tail heaviness)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of HTTP 500s")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of HTTP 429s")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After sent with 429s")
+    parser.add_argument("--task-seconds", type=float, default=3.0,
+                        help="Median MidAPI task duration")
+    parser.add_argument("--task-failure-rate", type=float, default=0.0,
+                        help="Fraction of MidAPI tasks that end failed")
+    parser.add_argument("--image-kb", type=int, default=256, help="Size of the served PNG")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency, args.jitter, args.failure_rate, args.rate_limit_rate,
+                        args.retry_after, args.task_seconds, args.task_failure_rate, args.image_kb)
+    server = make_server(config, args.host, args.port)
+    host, port = server.server_address[:2]
+    # First line is machine-readable so the benchmark can find a port-0 server
+    print(f"http://{host}:{port}", flush=True)
+    print(f"🦜 Mock image server ready (MIDAPI_BASE_URL=http://{host}:{port}/api/v1/mj)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests: {json.dumps(server.RequestHandlerClass.state.counts)}")
+
+
+if __name__ == "__main__":
+    main()
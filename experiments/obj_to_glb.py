@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+OBJ to GLB Converter - Pack the Wilhelm scan for the browser viewers
+Streams an OBJ + MTL line by line into compact arrays and writes one
+self-contained binary GLB with the textures embedded
+"""
+
+import os
+import shutil
+from array import array
+from pathlib import Path
+
+import numpy as np
+
+from glb import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, FileRange, GlbBuilder, write_glb
+
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+}
+
+DEFAULT_MATERIAL = '__default__'
+
+
+class ObjMesh:
+    """Geometry parsed from an OBJ file.
+
+    positions/uvs/normals hold the raw OBJ vertex pools; corners maps each
+    material name to a flat int array of (position, uv, normal) index triples
+    (zero-based, -1 when missing), three corners per triangle.
+    """
+
+    def __init__(self):
+        self.positions = array('f')
+        self.uvs = array('f')
+        self.normals = array('f')
+        self.corners = {}
+        self.material_libraries = []
+
+
+def _resolve_index(token, pool_size):
+    """OBJ indices are 1-based, negative ones count back from the end."""
+    if not token:
+        return -1
+    index = int(token)
+    return index - 1 if index > 0 else pool_size + index
+
+
+def parse_obj(obj_path):
+    """Stream an OBJ file into an ObjMesh without holding its text in memory."""
+    mesh = ObjMesh()
+    corners = mesh.corners.setdefault(DEFAULT_MATERIAL, array('i'))
+
+    with open(obj_path, 'rb') as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            keyword = parts[0]
+
+            if keyword == b'v':
+                mesh.positions.extend((float(parts[1]), float(parts[2]), float(parts[3])))
+            elif keyword == b'vt':
+                mesh.uvs.extend((float(parts[1]), float(parts[2]) if len(parts) > 2 else 0.0))
+            elif keyword == b'vn':
+                mesh.normals.extend((float(parts[1]), float(parts[2]), float(parts[3])))
+            elif keyword == b'f':
+                counts = (len(mesh.positions) // 3, len(mesh.uvs) // 2, len(mesh.normals) // 3)
+                polygon = []
+                for vertex in parts[1:]:
+                    fields = vertex.split(b'/') + [b'', b'']
+                    polygon.append(tuple(_resolve_index(fields[i], counts[i]) for i in range(3)))
+                # Triangulate polygons as a fan
+                for i in range(1, len(polygon) - 1):
+                    for corner in (polygon[0], polygon[i], polygon[i + 1]):
+                        corners.extend(corner)
+            elif keyword == b'usemtl':
+                name = line.split(None, 1)[1].strip().decode('utf-8')
+                corners = mesh.corners.setdefault(name, array('i'))
+            elif keyword == b'mtllib':
+                mesh.material_libraries.append(line.split(None, 1)[1].strip().decode('utf-8'))
+
+    mesh.corners = {name: c for name, c in mesh.corners.items() if len(c)}
+    return mesh
+
+
+def parse_mtl(mtl_path):
+    """Parse an MTL file into {name: {'Kd': [...], 'd': 1.0, 'map_Kd': path, ...}}."""
+    materials = {}
+    current = None
+    base_dir = Path(mtl_path).parent
+
+    with open(mtl_path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            keyword = parts[0]
+
+            if keyword == 'newmtl':
+                current = materials.setdefault(line.split(None, 1)[1].strip(), {})
+            elif current is None:
+                continue
+            elif keyword in ('Kd', 'Ks', 'Ke'):
+                current[keyword] = [float(x) for x in parts[1:4]]
+            elif keyword in ('d', 'Ns'):
+                current[keyword] = float(parts[1])
+            elif keyword == 'Tr':
+                current['d'] = 1.0 - float(parts[1])
+            elif keyword in ('map_Kd', 'map_Kn', 'map_Bump', 'map_bump', 'bump', 'norm'):
+                # Texture options (-bm 1.0 ...) come before the file name
+                key = 'map_Kd' if keyword == 'map_Kd' else 'map_Kn'
+                current[key] = str(base_dir / parts[-1])
+
+    return materials
+
+
+def _smooth_normals(positions, triangles):
+    """Area-weighted vertex normals, for OBJ files that ship without vn lines."""
+    corners = positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals = np.zeros_like(positions)
+    for i in range(3):
+        np.add.at(normals, triangles[:, i], face_normals)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    return (normals / np.where(lengths > 0, lengths, 1)).astype(np.float32)
+
+
+def _material_for(builder, name, mtl, textures, image_dir=None):
+    """Translate one MTL entry into a glTF PBR material.
+
+    Textures are embedded, or with image_dir copied there and referenced by
+    file name.
+    """
+    gltf = builder.gltf
+    pbr = {'metallicFactor': 0.0}
+    material = {'name': name, 'pbrMetallicRoughness': pbr}
+
+    alpha = mtl.get('d', 1.0)
+    if 'Ns' in mtl:
+        # Blinn-Phong exponent -> roughness (Walter et al. approximation)
+        pbr['roughnessFactor'] = round(float(np.sqrt(2 / (mtl['Ns'] + 2))), 4)
+    if alpha < 1.0:
+        material['alphaMode'] = 'BLEND'
+
+    def texture(path):
+        if path not in textures:
+            if not os.path.exists(path):
+                print(f"   ⚠️  Missing texture: {path}")
+                textures[path] = None
+                return None
+            if image_dir is None:
+                mime_type = IMAGE_MIME_TYPES.get(Path(path).suffix.lower(), 'image/png')
+                image = {
+                    'bufferView': builder.add_view(FileRange(path, 0, os.path.getsize(path))),
+                    'mimeType': mime_type,
+                }
+            else:
+                copy = Path(image_dir) / Path(path).name
+                if not copy.exists() or not os.path.samefile(path, copy):
+                    shutil.copyfile(path, copy)
+                image = {'uri': copy.name}
+            image['name'] = Path(path).stem
+            gltf.setdefault('images', []).append(image)
+            gltf.setdefault('textures', []).append({'source': len(gltf['images']) - 1})
+            textures[path] = len(gltf['textures']) - 1
+        return textures[path]
+
+    base_texture = texture(mtl['map_Kd']) if 'map_Kd' in mtl else None
+    if base_texture is not None:
+        pbr['baseColorTexture'] = {'index': base_texture}
+        pbr['baseColorFactor'] = [1.0, 1.0, 1.0, alpha]
+    else:
+        pbr['baseColorFactor'] = mtl.get('Kd', [0.8, 0.8, 0.8]) + [alpha]
+
+    normal_texture = texture(mtl['map_Kn']) if 'map_Kn' in mtl else None
+    if normal_texture is not None:
+        material['normalTexture'] = {'index': normal_texture}
+
+    gltf.setdefault('materials', []).append(material)
+    return len(gltf['materials']) - 1
+
+
+class Primitive:
+    """One material's worth of indexed triangle geometry.
+
+    uvs is None when the OBJ faces carry no texture coordinates; indices is a
+    flat array, three per triangle.
+    """
+
+    def __init__(self, material, positions, normals, uvs, indices):
+        self.material = material
+        self.positions = positions
+        self.normals = normals
+        self.uvs = uvs
+        self.indices = indices
+
+
+def load_obj(obj_path):
+    """Parse an OBJ and its MTL libraries into (primitives, materials)."""
+    obj_path = Path(obj_path)
+    mesh = parse_obj(obj_path)
+
+    materials = {}
+    for library in mesh.material_libraries:
+        mtl_path = obj_path.parent / library
+        if mtl_path.exists():
+            materials.update(parse_mtl(mtl_path))
+        else:
+            print(f"   ⚠️  Missing material library: {mtl_path}")
+
+    positions = np.frombuffer(mesh.positions, np.float32).reshape(-1, 3)
+    uvs = np.frombuffer(mesh.uvs, np.float32).reshape(-1, 2)
+    obj_normals = np.frombuffer(mesh.normals, np.float32).reshape(-1, 3)
+    smooth_normals = None
+
+    primitives = []
+    for name, corner_data in mesh.corners.items():
+        corners = np.frombuffer(corner_data, np.int32).reshape(-1, 3)
+        if (corners[:, 2] < 0).any():
+            # Faces without vn references get smooth per-position normals
+            if smooth_normals is None:
+                all_triangles = np.concatenate([np.frombuffer(c, np.int32).reshape(-1, 3)[:, 0]
+                                                for c in mesh.corners.values()]).reshape(-1, 3)
+                smooth_normals = _smooth_normals(positions, all_triangles)
+            normals = smooth_normals
+            corners = corners.copy()
+            corners[:, 2] = corners[:, 0]
+        else:
+            normals = obj_normals
+
+        # Each distinct (position, uv, normal) triple becomes one GLB vertex
+        unique, indices = np.unique(corners, axis=0, return_inverse=True)
+
+        texcoords = None
+        if len(uvs) and (unique[:, 1] >= 0).all():
+            # OBJ puts the UV origin bottom-left, glTF top-left
+            texcoords = uvs[unique[:, 1]] * np.float32([1, -1]) + np.float32([0, 1])
+
+        primitives.append(Primitive(name, positions[unique[:, 0]], normals[unique[:, 2]],
+                                    texcoords, indices.ravel()))
+
+    return primitives, materials
+
+
+def write_meshes_glb(output_path, meshes, materials, name='model', external_images=False):
+    """Write meshes (a list of Primitive lists) into one GLB.
+
+    Every mesh gets its own node and scene, so callers can pack several
+    versions of a model (LODs, variants) that share materials and textures.
+    With external_images the textures are copied next to output_path and
+    referenced by URI instead of embedded, so separate GLBs can share them.
+    Returns the number of bytes written.
+    """
+    image_dir = Path(output_path).parent if external_images else None
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'twe obj_to_glb.py'},
+        'scene': 0,
+        'scenes': [],
+        'nodes': [],
+        'meshes': [],
+    }
+    builder = GlbBuilder(gltf)
+    textures = {}
+    material_indices = {}
+
+    for mesh_index, primitives in enumerate(meshes):
+        mesh_name = name if len(meshes) == 1 else f"{name}-{mesh_index}"
+        gltf_primitives = []
+        for primitive in primitives:
+            attributes = {
+                'POSITION': builder.add_accessor(primitive.positions, ARRAY_BUFFER, 'VEC3', 5126, bounds=True),
+                'NORMAL': builder.add_accessor(primitive.normals, ARRAY_BUFFER, 'VEC3', 5126),
+            }
+            if primitive.uvs is not None:
+                attributes['TEXCOORD_0'] = builder.add_accessor(primitive.uvs, ARRAY_BUFFER, 'VEC2', 5126)
+
+            vertex_count = len(primitive.positions)
+            index_dtype, component_type = (np.uint16, 5123) if vertex_count <= 0xFFFF else (np.uint32, 5125)
+            gltf_primitive = {
+                'attributes': attributes,
+                'indices': builder.add_accessor(primitive.indices.astype(index_dtype), ELEMENT_ARRAY_BUFFER,
+                                                'SCALAR', component_type),
+            }
+            if primitive.material != DEFAULT_MATERIAL:
+                if primitive.material not in material_indices:
+                    material_indices[primitive.material] = _material_for(
+                        builder, primitive.material, materials.get(primitive.material, {}), textures,
+                        image_dir)
+                gltf_primitive['material'] = material_indices[primitive.material]
+            gltf_primitives.append(gltf_primitive)
+
+        gltf['meshes'].append({'name': mesh_name, 'primitives': gltf_primitives})
+        gltf['nodes'].append({'mesh': mesh_index, 'name': mesh_name})
+        gltf['scenes'].append({'name': mesh_name, 'nodes': [mesh_index]})
+
+    return write_glb(output_path, gltf, builder.finish())
+
+
+def convert_obj_to_glb(obj_path, output_path, optimize=False):
+    """Convert an OBJ (+ MTL and textures) into a single packed GLB.
+
+    Returns the number of bytes written.
+    """
+    primitives, materials = load_obj(obj_path)
+    output_length = write_meshes_glb(output_path, [primitives], materials, name=Path(obj_path).stem)
+
+    if optimize:
+        from optimize_wilhelm import optimize_glb
+        output_length = optimize_glb(output_path, output_path)['bytes_after']
+
+    return output_length
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert an OBJ + MTL model into a packed GLB")
+    parser.add_argument("input", help="Input .obj file")
+    parser.add_argument("output", nargs="?", default=None, help="Output .glb (default: next to the input)")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Quantize and cache-optimize the result (optimize_wilhelm)")
+
+    args = parser.parse_args()
+    output = args.output or str(Path(args.input).with_suffix('.glb'))
+
+    output_length = convert_obj_to_glb(args.input, output, optimize=args.optimize)
+
+    print(f"✅ Converted!")
+    print(f"   Input: {args.input} ({os.path.getsize(args.input):,} bytes)")
+    print(f"   Output: {output} ({output_length:,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Optimizer - Shrink the GLB's BIN payload for mobile visitors
+Quantizes vertex data (KHR_mesh_quantization), removes duplicate vertices,
+reorders triangles for the post-transform vertex cache and repacks the
+accessors and bufferViews to match
+"""
+
+import os
+
+import numpy as np
+
+from glb import (
+    ARRAY_BUFFER, DTYPE_COMPONENTS, ELEMENT_ARRAY_BUFFER, SIZE_TYPES, TYPE_SIZES,
+    compact_buffers, existing_views, interleave, pad_columns, read_accessor, read_glb_layout,
+    write_glb
+)
+
+TRIANGLES = 4
+
+# Typical post-transform cache size on mobile GPUs
+VERTEX_CACHE_SIZE = 16
+
+
+def _quantize_normalized(values, dtype):
+    """Encode floats as normalized integers of dtype (KHR_mesh_quantization)."""
+    info = np.iinfo(dtype)
+    return np.round(np.clip(values, info.min / info.max, 1.0) * info.max).astype(dtype)
+
+
+def tipsify(triangles, vertex_count, cache_size=VERTEX_CACHE_SIZE):
+    """Reorder triangles for vertex cache locality.
+
+    Implements Sander, Nehab and Barczak's "Tipsify" (2007): fan around the
+    most recently used vertex that will still be in the cache, falling back
+    to a dead-end stack. Returns the new triangle order as indices.
+    """
+    triangle_count = len(triangles)
+    flat = triangles.ravel()
+
+    # Vertex -> triangle adjacency in CSR form
+    valence = np.bincount(flat, minlength=vertex_count)
+    offsets = np.concatenate(([0], np.cumsum(valence)))
+    adjacency = np.argsort(flat, kind='stable') // 3
+
+    # Plain lists are much faster than numpy scalars in the hot loop
+    tris = triangles.tolist()
+    offsets = offsets.tolist()
+    adjacency = adjacency.tolist()
+    live = valence.tolist()
+    cache_time = [0] * vertex_count
+    emitted = [False] * triangle_count
+
+    order = []
+    dead_end = []
+    timestamp = cache_size + 1
+    cursor = 1
+    fan = 0 if vertex_count else -1
+
+    while fan >= 0:
+        candidates = []
+        for t in adjacency[offsets[fan]:offsets[fan + 1]]:
+            if emitted[t]:
+                continue
+            emitted[t] = True
+            order.append(t)
+            for v in tris[t]:
+                dead_end.append(v)
+                candidates.append(v)
+                live[v] -= 1
+                if timestamp - cache_time[v] > cache_size:
+                    cache_time[v] = timestamp
+                    timestamp += 1
+
+        # Next fanning vertex: the candidate that stays in cache longest
+        fan = -1
+        best = -1
+        for v in candidates:
+            if live[v] > 0:
+                priority = 0
+                if timestamp - cache_time[v] + 2 * live[v] <= cache_size:
+                    priority = timestamp - cache_time[v]
+                if priority > best:
+                    best = priority
+                    fan = v
+
+        if fan == -1:
+            while dead_end:
+                v = dead_end.pop()
+                if live[v] > 0:
+                    fan = v
+                    break
+        if fan == -1:
+            while cursor < vertex_count:
+                if live[cursor] > 0:
+                    fan = cursor
+                    break
+                cursor += 1
+
+    return np.asarray(order, dtype=np.int64)
+
+
+def _average_cache_miss_ratio(indices, cache_size=VERTEX_CACHE_SIZE):
+    """ACMR of an index buffer under a FIFO cache - lower is better."""
+    cache = []
+    misses = 0
+    for v in indices.tolist():
+        if v not in cache:
+            misses += 1
+            cache.append(v)
+            if len(cache) > cache_size:
+                cache.pop(0)
+    return misses / max(len(indices) // 3, 1)
+
+
+def _mesh_quantization(gltf, bin_data, mesh_index):
+    """Return (offset, scale) for quantizing a mesh's positions, or None.
+
+    Positions are stored as SHORT with a uniform scale so that normals stay
+    valid; meshes with morph targets keep float positions.
+    """
+    mesh = gltf['meshes'][mesh_index]
+    lows, highs = [], []
+    for primitive in mesh['primitives']:
+        if 'targets' in primitive or 'POSITION' not in primitive['attributes']:
+            return None
+        accessor = gltf['accessors'][primitive['attributes']['POSITION']]
+        if accessor['componentType'] != 5126:
+            return None
+        positions = read_accessor(gltf, bin_data, primitive['attributes']['POSITION'], decode=True)
+        lows.append(positions.min(axis=0))
+        highs.append(positions.max(axis=0))
+
+    low = np.min(lows, axis=0)
+    high = np.max(highs, axis=0)
+    offset = (low + high) / 2
+    scale = float((high - low).max()) / 2 / 32767 or 1.0
+    return offset, scale
+
+
+def _encode_attribute(gltf, bin_data, name, accessor_index, quantization, quantize):
+    """Return (values, componentType, normalized, type) for one attribute."""
+    accessor = gltf['accessors'][accessor_index]
+    components = TYPE_SIZES[accessor['type']]
+    is_float = accessor['componentType'] == 5126
+
+    if quantize and is_float:
+        values = read_accessor(gltf, bin_data, accessor_index, decode=True)
+        if name == 'POSITION' and quantization is not None:
+            offset, scale = quantization
+            quantized = np.round((values - offset) / scale).astype(np.int16)
+            return quantized, 5122, False, accessor['type']
+        if name in ('NORMAL', 'TANGENT'):
+            return _quantize_normalized(values, np.int8), 5120, True, accessor['type']
+        if name.startswith('TEXCOORD_') and values.size and values.min() >= 0 and values.max() <= 1:
+            return _quantize_normalized(values, np.uint16), 5123, True, accessor['type']
+
+    values = read_accessor(gltf, bin_data, accessor_index, decode=False)
+    return values, accessor['componentType'], accessor.get('normalized', False), SIZE_TYPES[components]
+
+
+def _is_supported(gltf, primitive):
+    """Whether a primitive can be rewritten: indexed or plain triangles only."""
+    if primitive.get('mode', TRIANGLES) != TRIANGLES or 'targets' in primitive:
+        return False
+    accessors = [gltf['accessors'][i] for i in primitive['attributes'].values()]
+    return bool(accessors) and not any('sparse' in a for a in accessors)
+
+
+def _optimize_primitive(gltf, bin_data, primitive, quantization, options, views, stats):
+    """Rewrite one triangle primitive's attributes and indices into new views.
+
+    Attributes that shared one interleaved bufferView (e.g. after
+    merge_wilhelm) are written interleaved again.
+    """
+    source_views = {gltf['accessors'][i].get('bufferView') for i in primitive['attributes'].values()}
+    interleaved = len(primitive['attributes']) > 1 and len(source_views) == 1
+
+    attributes = {}
+    for name, accessor_index in primitive['attributes'].items():
+        attributes[name] = _encode_attribute(gltf, bin_data, name, accessor_index,
+                                             quantization, options['quantize'])
+        if attributes[name][1] != gltf['accessors'][accessor_index]['componentType']:
+            stats['quantized'] = True
+
+    vertex_count = len(next(iter(attributes.values()))[0])
+    if 'indices' in primitive:
+        indices = read_accessor(gltf, bin_data, primitive['indices'], decode=False).ravel().astype(np.int64)
+    else:
+        indices = np.arange(vertex_count, dtype=np.int64)
+    stats['vertices_before'] += vertex_count
+
+    padded = {name: pad_columns(values) for name, (values, _, _, _) in attributes.items()}
+
+    if options['dedup']:
+        # Byte-identical vertices (after quantization) collapse into one
+        rows = np.hstack([padded[name].view(np.uint8).reshape(vertex_count, -1) for name in padded])
+        _, first, inverse = np.unique(rows, axis=0, return_index=True, return_inverse=True)
+        indices = inverse.ravel()[indices]
+        for name in padded:
+            padded[name] = padded[name][first]
+        vertex_count = len(first)
+
+    triangles = indices.reshape(-1, 3)
+    # Dedup and quantization can produce zero-area triangles
+    triangles = triangles[(triangles[:, 0] != triangles[:, 1]) &
+                          (triangles[:, 1] != triangles[:, 2]) &
+                          (triangles[:, 0] != triangles[:, 2])]
+
+    if options['reorder']:
+        stats['acmr_before'].append(_average_cache_miss_ratio(triangles.ravel()))
+        triangles = triangles[tipsify(triangles, vertex_count)]
+        stats['acmr_after'].append(_average_cache_miss_ratio(triangles.ravel()))
+
+    # Vertex fetch order: lay vertices out in order of first use, drop unused ones
+    used, first_use = np.unique(triangles.ravel(), return_index=True)
+    fetch_order = used[np.argsort(first_use)]
+    remap = np.full(vertex_count, -1, dtype=np.int64)
+    remap[fetch_order] = np.arange(len(fetch_order))
+    indices = remap[triangles.ravel()]
+    vertex_count = len(fetch_order)
+    stats['vertices_after'] += vertex_count
+
+    if interleaved:
+        rows, offsets = interleave([padded[name][fetch_order] for name in attributes])
+        views.append(({'byteStride': rows.shape[1], 'target': ARRAY_BUFFER}, rows))
+        placements = [(len(views) - 1, offset) for offset in offsets]
+    else:
+        placements = []
+        for name in attributes:
+            data = padded[name][fetch_order]
+            views.append(({'byteStride': data.strides[0], 'target': ARRAY_BUFFER}, data))
+            placements.append((len(views) - 1, 0))
+
+    for (name, (values, component_type, normalized, accessor_type)), (view, offset) in \
+            zip(attributes.items(), placements):
+        data = padded[name][fetch_order]
+        components = TYPE_SIZES[accessor_type]
+        accessor = {
+            'bufferView': view,
+            'componentType': component_type,
+            'count': vertex_count,
+            'type': accessor_type,
+        }
+        if offset:
+            accessor['byteOffset'] = offset
+        if normalized:
+            accessor['normalized'] = True
+        if name == 'POSITION':
+            accessor['min'] = data[:, :components].min(axis=0).tolist()
+            accessor['max'] = data[:, :components].max(axis=0).tolist()
+        primitive['attributes'][name] = len(gltf['accessors'])
+        gltf['accessors'].append(accessor)
+
+    index_dtype = np.dtype('<u2') if vertex_count <= 0xFFFF else np.dtype('<u4')
+    views.append(({'target': ELEMENT_ARRAY_BUFFER}, indices.astype(index_dtype)))
+    primitive['indices'] = len(gltf['accessors'])
+    gltf['accessors'].append({
+        'bufferView': len(views) - 1,
+        'componentType': DTYPE_COMPONENTS[index_dtype],
+        'count': len(indices),
+        'type': 'SCALAR',
+    })
+
+
+def optimize_gltf(gltf, bin_data, quantize=True, dedup=True, reorder=True):
+    """Optimize the meshes in gltf (modified in place) backed by bin_data.
+
+    Returns (pieces, stats) where pieces is the new BIN chunk as a list of
+    bytes-like objects ready for write_glb().
+    """
+    if any('uri' in buffer for buffer in gltf.get('buffers', [])):
+        raise ValueError("Only self-contained GLBs (no external buffers) are supported")
+
+    options = {'quantize': quantize, 'dedup': dedup, 'reorder': reorder}
+    stats = {'vertices_before': 0, 'vertices_after': 0, 'acmr_before': [], 'acmr_after': [],
+             'quantized': False}
+
+    views = existing_views(gltf, bin_data)
+
+    skinned = {node['mesh'] for node in gltf.get('nodes', []) if 'mesh' in node and 'skin' in node}
+    quantized_meshes = {}
+    for mesh_index, mesh in enumerate(gltf.get('meshes', [])):
+        supported = [_is_supported(gltf, primitive) for primitive in mesh['primitives']]
+        # Skinned meshes keep full-precision vertex data (still deduplicated
+        # and reordered); morph-target primitives aren't rewritten at all
+        mesh_options = dict(options, quantize=False) if mesh_index in skinned else options
+        # Positions can only be quantized if every primitive gets rewritten
+        quantization = None
+        if mesh_options['quantize'] and all(supported):
+            quantization = _mesh_quantization(gltf, bin_data, mesh_index)
+
+        for primitive, ok in zip(mesh['primitives'], supported):
+            if ok:
+                _optimize_primitive(gltf, bin_data, primitive, quantization, mesh_options, views, stats)
+        if quantization is not None:
+            quantized_meshes[mesh_index] = quantization
+
+    # Positions are now in quantized units: move the mesh under a child
+    # node whose transform dequantizes them
+    for node in list(gltf.get('nodes', [])):
+        if node.get('mesh') in quantized_meshes:
+            offset, scale = quantized_meshes[node.get('mesh')]
+            child = {
+                'mesh': node.pop('mesh'),
+                'translation': [float(x) for x in offset],
+                'scale': [scale] * 3,
+            }
+            if 'weights' in node:
+                child['weights'] = node.pop('weights')
+            node.setdefault('children', []).append(len(gltf['nodes']))
+            gltf['nodes'].append(child)
+
+    # Only declare the extension when something was actually quantized:
+    # viewers without it refuse files that require it
+    if stats['quantized']:
+        for key in ('extensionsUsed', 'extensionsRequired'):
+            extensions = gltf.setdefault(key, [])
+            if 'KHR_mesh_quantization' not in extensions:
+                extensions.append('KHR_mesh_quantization')
+
+    return compact_buffers(gltf, views), stats
+
+
+def optimize_glb(input_path, output_path, quantize=True, dedup=True, reorder=True):
+    """Optimize a GLB file. input_path and output_path may be the same file."""
+    gltf, bin_range = read_glb_layout(input_path)
+    if bin_range is None:
+        bin_data = b''
+    else:
+        # Read into memory (not a memmap) so output_path may overwrite input_path
+        bin_data = np.fromfile(input_path, np.uint8, count=bin_range.length, offset=bin_range.offset)
+
+    input_size = os.path.getsize(input_path)
+    pieces, stats = optimize_gltf(gltf, bin_data, quantize=quantize, dedup=dedup, reorder=reorder)
+    output_size = write_glb(output_path, gltf, pieces)
+    stats['bytes_before'] = input_size
+    stats['bytes_after'] = output_size
+    return stats
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Quantize and cache-optimize a Wilhelm GLB")
+    parser.add_argument("input", help="Input GLB")
+    parser.add_argument("output", nargs="?", default=None, help="Output GLB (default: overwrite input)")
+    parser.add_argument("--no-quantize", action="store_true", help="Keep float32 vertex data")
+    parser.add_argument("--no-dedup", action="store_true", help="Skip vertex deduplication")
+    parser.add_argument("--no-reorder", action="store_true", help="Skip vertex cache reordering")
+
+    args = parser.parse_args()
+    output = args.output or args.input
+
+    stats = optimize_glb(args.input, output,
+                         quantize=not args.no_quantize,
+                         dedup=not args.no_dedup,
+                         reorder=not args.no_reorder)
+
+    print(f"✅ Wilhelm optimized!")
+    print(f"   Input: {args.input} ({stats['bytes_before']:,} bytes)")
+    print(f"   Output: {output} ({stats['bytes_after']:,} bytes)")
+    print(f"   Vertices: {stats['vertices_before']:,} -> {stats['vertices_after']:,}")
+    if stats['acmr_before']:
+        print(f"   ACMR: {np.mean(stats['acmr_before']):.3f} -> {np.mean(stats['acmr_after']):.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Renderer - Headless poster frames and turntable sprite sheets
+Rasterizes the avatar GLB or OBJ on the CPU with numpy: perspective-correct
+z-buffered triangles, bilinear base-colour texture sampling and tangent-space
+normal mapping, supersampled for anti-aliasing. The poster is an instant
+first paint while three.js and the model download, and the turntable sheet
+stands in for the 3D view on devices without WebGL
+
+Frames render in a process pool; each worker loads the model once.
+"""
+
+import base64
+import io
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from avatar_pipeline import EXTENSIONS, QUALITY, avatar_formats
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DEFAULT_MODEL = SCRIPT_DIR / "models" / "wilhelm-model" / "2FDQZMQ2RK51HCRHSBLIKX62T.obj"
+DEFAULT_OUTPUT_DIR = SCRIPT_DIR / "renders"
+
+FRAMES = 24
+FRAME_SIZE = 256
+POSTER_SIZE = 1024
+POSTER_YAW = 30.0
+
+# Vertical field of view and camera height above the model centre, in degrees
+FIELD_OF_VIEW = 30.0
+ELEVATION = 12.0
+# Margin between the model's bounding sphere and the frame edge
+FRAME_PADDING = 1.05
+
+# Lighting is fixed to the camera, so every turntable frame is lit alike
+LIGHT_DIRECTION = (-0.45, 0.6, 0.65)
+AMBIENT = 0.35
+DIFFUSE = 0.8
+SPECULAR = 0.12
+SHININESS = 24.0
+
+# Pixel candidates tested per rasterizer batch, which bounds peak memory
+RASTER_BATCH = 1 << 21
+
+# WebP can't encode images wider than this
+MAX_SHEET_WIDTH = 16383
+
+
+class Surface:
+    """Triangles sharing one material, in model space.
+
+    uvs and tangents are None when the mesh has none; texture and normal_map
+    are uint8 arrays. Tangents are (x, y, z, w) with glTF's handedness rule.
+    """
+
+    def __init__(self, positions, normals, uvs, tangents, triangles, base_color=(1.0, 1.0, 1.0),
+                 texture=None, normal_map=None, normal_scale=1.0, double_sided=False):
+        self.positions = np.asarray(positions, np.float32)
+        self.normals = np.asarray(normals, np.float32)
+        self.uvs = None if uvs is None else np.asarray(uvs, np.float32)
+        self.tangents = tangents
+        self.triangles = np.asarray(triangles, np.int64).reshape(-1, 3)
+        self.base_color = np.asarray(base_color[:3], np.float32)
+        self.texture = texture
+        self.normal_map = normal_map
+        self.normal_scale = normal_scale
+        self.double_sided = double_sided
+        if self.tangents is None and self.normal_map is not None and self.uvs is not None:
+            self.tangents = vertex_tangents(self.positions, self.normals, self.uvs, self.triangles)
+        # Box-filtered copies of the textures, by reduction factor
+        self.levels = {}
+
+
+def _normalize(vectors):
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(lengths > 0, lengths, 1)
+
+
+def vertex_normals(positions, triangles):
+    """Area-weighted smooth normals, for meshes that ship without any."""
+    corners = positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals = np.zeros_like(positions)
+    for i in range(3):
+        np.add.at(normals, triangles[:, i], face_normals)
+    return _normalize(normals)
+
+
+def vertex_tangents(positions, normals, uvs, triangles):
+    """Per-vertex tangents from UV gradients, as glTF (x, y, z, w) tangents.
+
+    glTF UVs start top-left but normal maps point +Y up the image, so the
+    bitangent cross(N, T) * w follows -dP/dv.
+    """
+    p0, p1, p2 = (positions[triangles[:, i]] for i in range(3))
+    t0, t1, t2 = (uvs[triangles[:, i]] for i in range(3))
+    edge1, edge2 = p1 - p0, p2 - p0
+    duv1, duv2 = t1 - t0, t2 - t0
+    det = duv1[:, 0] * duv2[:, 1] - duv2[:, 0] * duv1[:, 1]
+    r = np.where(np.abs(det) > 1e-12, 1 / np.where(det == 0, 1, det), 0)[:, None]
+    dp_du = (edge1 * duv2[:, 1:] - edge2 * duv1[:, 1:]) * r
+    dp_dv = (edge2 * duv1[:, :1] - edge1 * duv2[:, :1]) * r
+
+    tangents = np.zeros_like(positions)
+    bitangents = np.zeros_like(positions)
+    for i in range(3):
+        np.add.at(tangents, triangles[:, i], dp_du)
+        np.add.at(bitangents, triangles[:, i], -dp_dv)
+
+    # Gram-Schmidt against the normal; the sign records mirrored UVs
+    tangents = _normalize(tangents - normals * np.sum(normals * tangents, axis=1, keepdims=True))
+    handedness = np.where(np.sum(np.cross(normals, tangents) * bitangents, axis=1) < 0, -1.0, 1.0)
+    return np.hstack([tangents, handedness[:, None]]).astype(np.float32)
+
+
+def _load_image(source):
+    with Image.open(source) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def load_obj_surfaces(obj_path, texture=None, normal_map=None):
+    """Surfaces of an OBJ; texture and normal_map override its MTL maps."""
+    from obj_to_glb import load_obj
+
+    primitives, materials = load_obj(obj_path)
+    images = {}
+
+    def image(path):
+        if path is None or not os.path.exists(path):
+            return None
+        if path not in images:
+            images[path] = _load_image(path)
+        return images[path]
+
+    surfaces = []
+    for primitive in primitives:
+        mtl = materials.get(primitive.material, {})
+        color_map = image(texture or mtl.get("map_Kd"))
+        surfaces.append(Surface(
+            primitive.positions, primitive.normals, primitive.uvs, None, primitive.indices,
+            base_color=(1.0, 1.0, 1.0) if color_map is not None else mtl.get("Kd", (0.8, 0.8, 0.8)),
+            texture=color_map,
+            normal_map=image(normal_map or mtl.get("map_Kn")),
+        ))
+    return surfaces
+
+
+def load_glb_surfaces(glb_path, texture=None, normal_map=None):
+    """Surfaces of a GLB's default scene with node transforms applied."""
+    from glb import GLB
+    from merge_wilhelm import scene_instances
+
+    surfaces = []
+    with GLB(glb_path) as glb:
+        gltf = glb.gltf
+        if "EXT_meshopt_compression" in gltf.get("extensionsUsed", []):
+            raise ValueError("Decompress the GLB first (meshopt_compression.py --decompress)")
+        images = {}
+
+        def image(texture_info, override):
+            if override:
+                return _load_image(override)
+            if texture_info is None:
+                return None
+            texture_def = gltf["textures"][texture_info["index"]]
+            source = texture_def.get("source")
+            for extension in texture_def.get("extensions", {}).values():
+                # EXT_texture_webp / _avif point at an alternate image Pillow reads too
+                source = extension.get("source", source)
+            if source not in images:
+                image_def = gltf["images"][source]
+                if "bufferView" in image_def:
+                    data = io.BytesIO(bytes(glb.buffer_view(image_def["bufferView"])))
+                elif image_def["uri"].startswith("data:"):
+                    data = io.BytesIO(base64.b64decode(image_def["uri"].split(",", 1)[1]))
+                else:
+                    data = Path(glb_path).parent / image_def["uri"]
+                images[source] = _load_image(data)
+            return images[source]
+
+        scenes = gltf.get("scenes", [])
+        if scenes:
+            scene = scenes[gltf.get("scene", 0)]
+        else:
+            children = {child for node in gltf.get("nodes", []) for child in node.get("children", [])}
+            scene = {"nodes": [i for i in range(len(gltf.get("nodes", []))) if i not in children]}
+
+        for index, world, _ in scene_instances(gltf, scene):
+            node = gltf["nodes"][index]
+            if "mesh" not in node:
+                continue
+            linear = world[:3, :3]
+            mirrored = np.linalg.det(linear) < 0
+            for primitive in gltf["meshes"][node["mesh"]]["primitives"]:
+                if primitive.get("mode", 4) != 4:
+                    continue
+                attributes = primitive["attributes"]
+                positions = glb.accessor(attributes["POSITION"], decode=True).astype(np.float64)
+                positions = positions @ linear.T + world[:3, 3]
+                if "indices" in primitive:
+                    triangles = np.array(glb.accessor(primitive["indices"]), np.int64).reshape(-1, 3)
+                else:
+                    triangles = np.arange(len(positions)).reshape(-1, 3)
+                if mirrored:
+                    triangles = triangles[:, [0, 2, 1]]
+
+                if "NORMAL" in attributes:
+                    normals = glb.accessor(attributes["NORMAL"], decode=True).astype(np.float64)
+                    normals = _normalize(normals @ np.linalg.inv(linear))
+                else:
+                    normals = vertex_normals(positions, triangles)
+                # Copied out: accessors are views into the memory map closed below
+                uvs = None
+                if "TEXCOORD_0" in attributes:
+                    uvs = np.array(glb.accessor(attributes["TEXCOORD_0"], decode=True), np.float32)
+                tangents = None
+                if "TANGENT" in attributes:
+                    tangents = glb.accessor(attributes["TANGENT"], decode=True).astype(np.float64)
+                    tangents = np.hstack([_normalize(tangents[:, :3] @ linear.T),
+                                          tangents[:, 3:] * (-1 if mirrored else 1)]).astype(np.float32)
+
+                material = gltf["materials"][primitive["material"]] if "material" in primitive else {}
+                pbr = material.get("pbrMetallicRoughness", {})
+                normal_texture = material.get("normalTexture")
+                surfaces.append(Surface(
+                    positions, normals, uvs, tangents, triangles,
+                    base_color=pbr.get("baseColorFactor", (1.0, 1.0, 1.0)),
+                    texture=image(pbr.get("baseColorTexture"), texture),
+                    normal_map=image(normal_texture, normal_map),
+                    normal_scale=(normal_texture or {}).get("scale", 1.0),
+                    double_sided=material.get("doubleSided", False),
+                ))
+    return surfaces
+
+
+def load_model(model_path, texture=None, normal_map=None):
+    """Surfaces of a .glb or .obj model."""
+    if Path(model_path).suffix.lower() == ".obj":
+        return load_obj_surfaces(model_path, texture, normal_map)
+    return load_glb_surfaces(model_path, texture, normal_map)
+
+
+def _bounding_sphere(surfaces):
+    positions = np.vstack([surface.positions for surface in surfaces])
+    center = (positions.min(axis=0) + positions.max(axis=0)) / 2
+    return center, float(np.linalg.norm(positions - center, axis=1).max())
+
+
+def _rotation(yaw, elevation):
+    """Model -> view rotation: turn the model by yaw, then tilt it towards a raised camera."""
+    yaw, elevation = math.radians(yaw), math.radians(elevation)
+    turn = np.array([[math.cos(yaw), 0, math.sin(yaw)], [0, 1, 0], [-math.sin(yaw), 0, math.cos(yaw)]])
+    tilt = np.array([[1, 0, 0], [0, math.cos(elevation), -math.sin(elevation)],
+                     [0, math.sin(elevation), math.cos(elevation)]])
+    return tilt @ turn
+
+
+def rasterize(screen, inverse_depth, triangles, cull, width, height):
+    """Z-buffer triangles into a width x height grid.
+
+    screen holds pixel coordinates per vertex (y down) and inverse_depth 1/w;
+    cull marks single-sided triangles whose back faces are skipped. Returns
+    (triangle index per pixel, -1 where empty, and perspective-correct
+    barycentric weights per pixel).
+    """
+    x = screen[triangles, 0]
+    y = screen[triangles, 1]
+    area = (x[:, 1] - x[:, 0]) * (y[:, 2] - y[:, 0]) - (x[:, 2] - x[:, 0]) * (y[:, 1] - y[:, 0])
+
+    # Pixel centres (i + 0.5) inside each triangle's bounding box
+    i0 = np.clip(np.ceil(x.min(axis=1) - 0.5), 0, width).astype(np.int64)
+    i1 = np.clip(np.floor(x.max(axis=1) - 0.5), -1, width - 1).astype(np.int64)
+    j0 = np.clip(np.ceil(y.min(axis=1) - 0.5), 0, height).astype(np.int64)
+    j1 = np.clip(np.floor(y.max(axis=1) - 0.5), -1, height - 1).astype(np.int64)
+    box_width = np.maximum(i1 - i0 + 1, 0)
+    counts = box_width * np.maximum(j1 - j0 + 1, 0)
+
+    # Counter-clockwise front faces come out clockwise with y pointing down
+    visible = (np.abs(area) > 1e-12) & (counts > 0) & (inverse_depth[triangles] > 0).all(axis=1)
+    visible &= ~cull | (area < 0)
+    ids = np.flatnonzero(visible)
+
+    depth = np.zeros(width * height)
+    pixel_triangles = np.full(width * height, -1, np.int64)
+    weights = np.zeros((width * height, 3), np.float32)
+    if not len(ids):
+        return pixel_triangles, weights
+
+    # Batches of whole triangles with about RASTER_BATCH candidate pixels each
+    running = np.cumsum(counts[ids])
+    splits = np.searchsorted(running, np.arange(RASTER_BATCH, running[-1], RASTER_BATCH))
+    for batch in np.split(ids, splits):
+        n = counts[batch]
+        tri = np.repeat(batch, n)
+        local = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+        px = i0[tri] + local % box_width[tri]
+        py = j0[tri] + local // box_width[tri]
+        cx, cy = px + 0.5, py + 0.5
+
+        xs, ys = x[tri], y[tri]
+        e0 = (xs[:, 1] - cx) * (ys[:, 2] - cy) - (xs[:, 2] - cx) * (ys[:, 1] - cy)
+        e1 = (xs[:, 2] - cx) * (ys[:, 0] - cy) - (xs[:, 0] - cx) * (ys[:, 2] - cy)
+        b = np.stack([e0, e1, area[tri] - e0 - e1], axis=1) / area[tri][:, None]
+        inside = (b >= 0).all(axis=1)
+        tri, b, pixel = tri[inside], b[inside], (py * width + px)[inside]
+
+        # Interpolating 1/w is linear in screen space; larger is nearer
+        weighted = b * inverse_depth[triangles[tri]]
+        z = weighted.sum(axis=1)
+
+        # Nearest candidate per pixel, then against what's already there
+        order = np.lexsort((-z, pixel))
+        first = np.ones(len(order), bool)
+        first[1:] = pixel[order[1:]] != pixel[order[:-1]]
+        winners = order[first]
+        winners = winners[z[winners] > depth[pixel[winners]]]
+        target = pixel[winners]
+        depth[target] = z[winners]
+        pixel_triangles[target] = tri[winners]
+        weights[target] = weighted[winners] / z[winners][:, None]
+
+    return pixel_triangles, weights
+
+
+def sample_texture(texture, uvs):
+    """Bilinear, repeat-wrapped lookup of a uint8 texture at glTF UVs (origin top-left)."""
+    height, width = texture.shape[:2]
+    x = uvs[:, 0] * width - 0.5
+    y = uvs[:, 1] * height - 0.5
+    x0, y0 = np.floor(x), np.floor(y)
+    fx = (x - x0).astype(np.float32)[:, None]
+    fy = (y - y0).astype(np.float32)[:, None]
+    x0 = x0.astype(np.int64) % width
+    y0 = y0.astype(np.int64) % height
+    x1, y1 = (x0 + 1) % width, (y0 + 1) % height
+    top = texture[y0, x0] * (1 - fx) + texture[y0, x1] * fx
+    bottom = texture[y1, x0] * (1 - fx) + texture[y1, x1] * fx
+    return (top * (1 - fy) + bottom * fy) / 255
+
+
+def _texture_level(surface, name, texels):
+    """The surface texture box-filtered down to about texels across.
+
+    A 2048px map sampled into a 256px frame would otherwise alias badly.
+    """
+    texture = getattr(surface, name)
+    factor = 1
+    while texture.shape[1] // (factor * 2) >= texels:
+        factor *= 2
+    if factor == 1:
+        return texture
+    if (name, factor) not in surface.levels:
+        reduced = Image.fromarray(texture).reduce(factor)
+        surface.levels[(name, factor)] = np.asarray(reduced)
+    return surface.levels[(name, factor)]
+
+
+def srgb_to_linear(values):
+    return np.where(values <= 0.04045, values / 12.92, ((values + 0.055) / 1.055) ** 2.4)
+
+
+def linear_to_srgb(values):
+    values = np.clip(values, 0, 1)
+    return np.where(values <= 0.0031308, values * 12.92, 1.055 * values ** (1 / 2.4) - 0.055)
+
+
+def render_frame(surfaces, size=FRAME_SIZE, yaw=0.0, elevation=ELEVATION, supersample=2,
+                 normal_mapping=True):
+    """Render surfaces turned by yaw degrees into a size x size RGBA uint8 array.
+
+    The camera frames the model's bounding sphere, so frames at different
+    yaws line up. The background is transparent.
+    """
+    center, radius = _bounding_sphere(surfaces)
+    rotation = _rotation(yaw, elevation)
+    focal = 1 / math.tan(math.radians(FIELD_OF_VIEW) / 2)
+    distance = radius * FRAME_PADDING * focal * math.sqrt(1 + 1 / focal ** 2)
+    pixels = size * supersample
+
+    # All surfaces go through the rasterizer together so they occlude each other
+    offsets = np.cumsum([0] + [len(s.positions) for s in surfaces])
+    view = np.vstack([(s.positions - center) @ rotation.T for s in surfaces])
+    triangles = np.vstack([s.triangles + offset for s, offset in zip(surfaces, offsets)])
+    owner = np.concatenate([np.full(len(s.triangles), i) for i, s in enumerate(surfaces)])
+    cull = np.concatenate([np.full(len(s.triangles), not s.double_sided) for s in surfaces])
+
+    # Camera on +z looking down -z
+    w = distance - view[:, 2]
+    inverse_depth = 1 / np.where(w > 1e-6, w, -1)
+    screen = np.empty((len(view), 2))
+    screen[:, 0] = (view[:, 0] * focal * inverse_depth * 0.5 + 0.5) * pixels
+    screen[:, 1] = (0.5 - view[:, 1] * focal * inverse_depth * 0.5) * pixels
+
+    pixel_triangles, weights = rasterize(screen, inverse_depth, triangles, cull, pixels, pixels)
+    covered = np.flatnonzero(pixel_triangles >= 0)
+    image = np.zeros((pixels * pixels, 4), np.float32)
+    light = _normalize(np.asarray(LIGHT_DIRECTION, np.float64))
+    half_vector = _normalize(light + [0.0, 0.0, 1.0])
+
+    # Deferred shading: every covered pixel is shaded exactly once
+    for index, surface in enumerate(surfaces):
+        pixel = covered[owner[pixel_triangles[covered]] == index]
+        if not len(pixel):
+            continue
+        corners = triangles[pixel_triangles[pixel]] - offsets[index]
+        b = weights[pixel][:, :, None]
+
+        def interpolate(values):
+            return (values[corners] * b).sum(axis=1)
+
+        normals = _normalize(interpolate(surface.normals) @ rotation.T)
+        if surface.double_sided:
+            normals *= np.where(normals[:, 2:] < 0, -1, 1)
+
+        uvs = interpolate(surface.uvs) if surface.uvs is not None else None
+        if normal_mapping and surface.normal_map is not None and surface.tangents is not None:
+            tangents = interpolate(surface.tangents)
+            handedness = np.where(tangents[:, 3:] < 0, -1.0, 1.0)
+            tangents = tangents[:, :3] @ rotation.T
+            tangents = _normalize(tangents - normals * np.sum(normals * tangents, axis=1, keepdims=True))
+            bitangents = np.cross(normals, tangents) * handedness
+            mapped = sample_texture(_texture_level(surface, "normal_map", pixels), uvs) * 2 - 1
+            mapped[:, :2] *= surface.normal_scale
+            normals = _normalize(tangents * mapped[:, :1] + bitangents * mapped[:, 1:2] + normals * mapped[:, 2:])
+
+        albedo = np.broadcast_to(surface.base_color, (len(pixel), 3))
+        if surface.texture is not None and uvs is not None:
+            albedo = albedo * srgb_to_linear(sample_texture(_texture_level(surface, "texture", pixels), uvs))
+
+        diffuse = np.clip(normals @ light, 0, None)[:, None]
+        specular = np.clip(normals @ half_vector, 0, None)[:, None] ** SHININESS
+        image[pixel, :3] = albedo * (AMBIENT + DIFFUSE * diffuse) + SPECULAR * specular
+        image[pixel, 3] = 1
+
+    # Box-filter the supersamples in linear light, premultiplied by coverage
+    image = image.reshape(size, supersample, size, supersample, 4).mean(axis=(1, 3))
+    alpha = image[:, :, 3:]
+    rgb = linear_to_srgb(image[:, :, :3] / np.where(alpha > 0, alpha, 1))
+    return np.round(np.concatenate([rgb, alpha], axis=2) * 255).astype(np.uint8)
+
+
+def _save(pixels, path, fmt):
+    image = Image.fromarray(pixels, "RGBA")
+    if fmt == "png":
+        image.save(path, "PNG", optimize=True)
+    elif fmt == "webp":
+        image.save(path, "WEBP", quality=QUALITY["webp"], method=4)
+    else:
+        image.save(path, "AVIF", quality=QUALITY["avif"])
+
+
+# Per-process model cache: each pool worker loads the model on its first frame.
+# Loading in the job rather than a pool initializer lets a bad model raise its
+# own error instead of a BrokenProcessPool
+_MODEL = None
+
+
+def _render_job(model, size, yaw, elevation, supersample, normal_mapping):
+    global _MODEL
+    if _MODEL is None or _MODEL[0] != model:
+        _MODEL = (model, load_model(*model))
+    return render_frame(_MODEL[1], size, yaw, elevation, supersample, normal_mapping)
+
+
+def render_turntable(model_path=DEFAULT_MODEL, output_dir=DEFAULT_OUTPUT_DIR, name="wilhelm",
+                     frames=FRAMES, size=FRAME_SIZE, poster_size=POSTER_SIZE, poster_yaw=POSTER_YAW,
+                     columns=None, elevation=ELEVATION, supersample=2, normal_mapping=True,
+                     texture=None, normal_map=None, formats=None, workers=None):
+    """Render a poster frame and an N-angle turntable sprite sheet.
+
+    Writes <name>-poster and <name>-turntable images (one per format) plus
+    <name>-renders.json describing the sheet layout, and returns that
+    manifest. Frame k of the sheet shows the model turned by k * 360 / frames
+    degrees, left to right and then top to bottom.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    formats = formats or avatar_formats()
+    columns = columns or max(1, min(frames, MAX_SHEET_WIDTH // size))
+    rows = math.ceil(frames / columns)
+
+    jobs = [(poster_size, poster_yaw)] if poster_size else []
+    jobs += [(size, 360.0 * k / frames) for k in range(frames)]
+    model = (str(model_path), texture, normal_map)
+    with ProcessPoolExecutor(max_workers=workers,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        renders = list(pool.map(_render_job, *zip(*[
+            (model, job_size, yaw, elevation, supersample, normal_mapping) for job_size, yaw in jobs])))
+
+    manifest = {"model": Path(model_path).name}
+    if poster_size:
+        poster = renders.pop(0)
+        manifest["poster"] = {"size": poster_size, "yaw": poster_yaw, "files": {}}
+        for fmt in formats:
+            path = output_dir / f"{name}-poster{EXTENSIONS[fmt]}"
+            _save(poster, path, fmt)
+            manifest["poster"]["files"][fmt] = {"file": path.name, "bytes": path.stat().st_size}
+
+    if frames:
+        sheet = np.zeros((rows * size, columns * size, 4), np.uint8)
+        for k, frame in enumerate(renders):
+            row, column = divmod(k, columns)
+            sheet[row * size:(row + 1) * size, column * size:(column + 1) * size] = frame
+        manifest["turntable"] = {"frames": frames, "frameSize": size, "columns": columns, "rows": rows,
+                                 "files": {}}
+        for fmt in formats:
+            path = output_dir / f"{name}-turntable{EXTENSIONS[fmt]}"
+            _save(sheet, path, fmt)
+            manifest["turntable"]["files"][fmt] = {"file": path.name, "bytes": path.stat().st_size}
+
+    with open(output_dir / f"{name}-renders.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render Wilhelm poster frames and turntable sprite sheets")
+    parser.add_argument("model", nargs="?", default=str(DEFAULT_MODEL), help="GLB or OBJ to render")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR), help="Output directory")
+    parser.add_argument("--name", default="wilhelm", help="Output file name prefix")
+    parser.add_argument("--frames", type=int, default=FRAMES, help="Turntable angles (0 for poster only)")
+    parser.add_argument("--size", type=int, default=FRAME_SIZE, help="Turntable frame size in pixels")
+    parser.add_argument("--poster-size", type=int, default=POSTER_SIZE, help="Poster size (0 to skip)")
+    parser.add_argument("--poster-yaw", type=float, default=POSTER_YAW, help="Poster angle in degrees")
+    parser.add_argument("--columns", type=int, default=None, help="Sprite sheet columns (default: one row)")
+    parser.add_argument("--elevation", type=float, default=ELEVATION, help="Camera elevation in degrees")
+    parser.add_argument("--supersample", type=int, default=2, help="Samples per pixel along each axis")
+    parser.add_argument("--texture", default=None, help="Base colour texture (default: the model's)")
+    parser.add_argument("--normal-map", default=None, help="Normal map (default: the model's)")
+    parser.add_argument("--no-normal-map", action="store_true", help="Shade with vertex normals only")
+    parser.add_argument("--formats", default=None, help="Comma-separated formats (default: all available)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.time()
+    manifest = render_turntable(
+        args.model, args.output, name=args.name, frames=args.frames, size=args.size,
+        poster_size=args.poster_size, poster_yaw=args.poster_yaw, columns=args.columns,
+        elevation=args.elevation, supersample=args.supersample, normal_mapping=not args.no_normal_map,
+        texture=args.texture, normal_map=args.normal_map,
+        formats=args.formats.split(",") if args.formats else None, workers=args.workers,
+    )
+
+    print(f"✅ Wilhelm rendered in {time.time() - start:.2f}s")
+    if "poster" in manifest:
+        files = ", ".join(f"{entry['file']} {entry['bytes']:,}" for entry in manifest["poster"]["files"].values())
+        print(f"   Poster ({manifest['poster']['size']}px): {files}")
+    if "turntable" in manifest:
+        sheet = manifest["turntable"]
+        files = ", ".join(f"{entry['file']} {entry['bytes']:,}" for entry in sheet["files"].values())
+        print(f"   Turntable ({sheet['frames']} x {sheet['frameSize']}px, "
+              f"{sheet['columns']}x{sheet['rows']} sheet): {files}")
+    print(f"\nRenders saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Retry Engine - Rate limits, backoff and circuit breaking per image provider
+Keeps batch runs at the highest request rate a provider's quota allows
+without tripping its abuse limits, and stops calling providers that are down
+"""
+
+import email.utils
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+from tracing import get_tracer
+
+# Sustained requests per second and burst size for each provider
+PROVIDER_LIMITS = {
+    "midapi": {"rate": 1.0, "burst": 5},
+    "pollinations": {"rate": 0.5, "burst": 2},
+    "huggingface": {"rate": 0.5, "burst": 3},
+    "openrouter": {"rate": 0.33, "burst": 2},
+}
+DEFAULT_LIMIT = {"rate": 1.0, "burst": 2}
+
+# Backoff: full jitter on base * 2^attempt, capped
+DEFAULT_ATTEMPTS = 4
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Consecutive transient failures that open the circuit, and how long it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 60.0
+
+
+class RetryableError(Exception):
+    """A transient failure (429, 5xx, dropped connection) worth retrying.
+
+    retry_after is the server's requested wait in seconds, if it sent one;
+    response is the last HTTP response, if there was one.
+    """
+
+    def __init__(self, message: str, retry_after: Optional[float] = None, response=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.response = response
+
+
+class CircuitOpenError(Exception):
+    """The provider has failed repeatedly and is being left alone for a while."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(when.timestamp() - time.time(), 0.0)
+
+
+def _sleep(seconds: float, cancel: Optional[threading.Event]) -> bool:
+    """Sleep, waking early if cancel is set. Returns True if cancelled."""
+    if cancel is not None:
+        return cancel.wait(seconds)
+    time.sleep(seconds)
+    return False
+
+
+class TokenBucket:
+    """Allows `rate` calls per second on average, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is available, else return the wait for the next."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, cancel: Optional[threading.Event] = None) -> bool:
+        """Block until a token is available. Returns False if cancelled."""
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if _sleep(wait, cancel):
+                return False
+
+    def pause(self, seconds: float):
+        """Spend future tokens so nobody calls again for `seconds` (Retry-After)."""
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class CircuitBreaker:
+    """Closed -> open after `threshold` consecutive failures -> half-open.
+
+    While open every call fails fast. After reset_seconds a single trial
+    call is let through; its success closes the circuit, its failure opens
+    it again.
+    """
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def before_call(self, name: str = "provider") -> bool:
+        """Raise CircuitOpenError while calls are blocked.
+
+        Returns True when this call is the half-open trial; the caller must
+        then end it with record_success, record_failure or release_trial.
+        """
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._trial_running):
+                remaining = self.reset_seconds - (time.monotonic() - self.opened_at)
+                raise CircuitOpenError(
+                    f"{name} circuit open after {self.failures} failures "
+                    f"(retrying in {max(remaining, 0):.0f}s)")
+            if state == "half-open":
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_running or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def release_trial(self):
+        """End a trial that proved nothing either way (cancelled, or a
+        permanent error), so the next call becomes the trial."""
+        with self._lock:
+            self._trial_running = False
+
+
+class ProviderGuard:
+    """Token bucket + circuit breaker + retries for one provider."""
+
+    def __init__(self, name: str, rate: float, burst: int,
+                 attempts: int = DEFAULT_ATTEMPTS,
+                 backoff_base: float = BACKOFF_BASE,
+                 backoff_cap: float = BACKOFF_CAP,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.attempts = attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retries = 0
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential delay, never shorter than Retry-After."""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def call(self, fn: Callable, attempts: Optional[int] = None,
+             cancel: Optional[threading.Event] = None):
+        """Call fn(), retrying RetryableError with backoff.
+
+        Any other exception is permanent: it is raised at once and does not
+        count against the circuit. When attempts run out the last
+        RetryableError is raised; an open circuit raises CircuitOpenError.
+        """
+        attempts = attempts or self.attempts
+        for attempt in range(attempts):
+            trial = self.breaker.before_call(self.name)
+            try:
+                waited = time.perf_counter()
+                if not self.bucket.acquire(cancel):
+                    raise RetryableError(f"{self.name}: cancelled")
+                waited = time.perf_counter() - waited
+                if waited > 0.001:
+                    get_tracer().record("throttle", waited, provider=self.name)
+                try:
+                    result = fn()
+                except RetryableError as e:
+                    self.breaker.record_failure()
+                    trial = False
+                    if e.retry_after:
+                        # The server asked everyone to back off, not just this call
+                        self.bucket.pause(e.retry_after)
+                    if attempt + 1 == attempts:
+                        raise
+                    self.retries += 1
+                    get_tracer().count("retries", provider=self.name,
+                                       status=e.response.status_code if e.response is not None else "error")
+                    delay = self.backoff(attempt, e.retry_after)
+                    print(f"   {self.name}: {e} - retrying in {delay:.1f}s "
+                          f"(attempt {attempt + 2}/{attempts})")
+                    if _sleep(delay, cancel):
+                        raise
+                    continue
+                self.breaker.record_success()
+                trial = False
+                return result
+            finally:
+                if trial:
+                    # Cancelled before calling, or a permanent error: neither
+                    # counts against the circuit, but the trial slot must free up
+                    self.breaker.release_trial()
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(provider: str) -> ProviderGuard:
+    """The process-wide guard for a provider, configured from PROVIDER_LIMITS."""
+    with _guards_lock:
+        if provider not in _guards:
+            limits = PROVIDER_LIMITS.get(provider, DEFAULT_LIMIT)
+            _guards[provider] = ProviderGuard(provider, limits["rate"], limits["burst"])
+        return _guards[provider]
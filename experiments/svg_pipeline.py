@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Wilhelm SVG Pipeline - Minify the concept-art SVGs and pre-rasterize them
+Rounds path data and coordinates, strips comments, metadata and editor
+attributes, unwraps redundant groups, and optionally renders cached PNG/WebP
+copies at the sizes the pages display them
+
+Results are cached under .svg-cache by a hash of the source SVG and the
+settings, so unchanged files are never re-minified or re-rendered.
+Rasterizing needs cairosvg (and the cairo library); without it only the
+minified SVGs are written.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+CACHE_DIR = SCRIPT_DIR / ".svg-cache"
+DEFAULT_INPUT_DIR = SCRIPT_DIR / "concept-art"
+DEFAULT_OUTPUT_DIR = DEFAULT_INPUT_DIR / "optimized"
+
+SVG_NS = "http://www.w3.org/2000/svg"
+XLINK_NS = "http://www.w3.org/1999/xlink"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Decimal places kept in path data and coordinates (the art is on a 400px grid)
+PRECISION = 1
+
+# Widths rendered by --rasterize: 0.25x to 2x the 400px viewBox
+RASTER_SIZES = (100, 200, 400, 800)
+RASTER_FORMATS = ("png", "webp")
+WEBP_QUALITY = 85
+
+# Elements that never affect rendering
+DROP_ELEMENTS = {"metadata", "title", "desc"}
+
+# Namespaces written by editors (Inkscape, Sodipodi, Illustrator, Sketch)
+EDITOR_NAMESPACES = (
+    "http://www.inkscape.org/namespaces/inkscape",
+    "http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd",
+    "http://ns.adobe.com/",
+    "http://www.bohemiancoding.com/sketch/ns",
+)
+
+# Attribute values that are the SVG defaults anyway. Inherited ones are only
+# dropped when no ancestor sets them, since there they may be overrides.
+DEFAULT_ATTRIBUTES = {
+    "opacity": "1", "fill-opacity": "1", "stroke-opacity": "1",
+    "stroke-width": "1", "fill-rule": "nonzero", "stroke": "none",
+    "stroke-linecap": "butt", "stroke-linejoin": "miter", "version": None,
+}
+
+# Attributes holding plain numbers (or number lists) that can be rounded
+NUMERIC_ATTRIBUTES = {
+    "x", "y", "x1", "y1", "x2", "y2", "cx", "cy", "r", "rx", "ry",
+    "width", "height", "stroke-width", "opacity", "fill-opacity",
+    "stroke-opacity", "font-size", "points", "viewBox",
+}
+
+# Presentation attributes a child inherits from its group
+INHERITED_ATTRIBUTES = {
+    "fill", "fill-opacity", "fill-rule", "stroke", "stroke-width", "stroke-opacity",
+    "stroke-linecap", "stroke-linejoin", "font-family", "font-size", "font-weight",
+    "text-anchor",
+}
+
+COLOR_NAMES = {"white": "#fff", "black": "#000"}
+
+TEXT_ELEMENTS = ("text", "tspan", "textPath")
+
+NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+PATH_TOKEN = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+def format_number(value, precision=PRECISION):
+    """Shortest text for value rounded to precision: 0.50 -> .5, -0.0 -> 0."""
+    text = f"{round(float(value), precision):.{precision}f}".rstrip("0").rstrip(".")
+    if text in ("-0", ""):
+        return "0"
+    if text.startswith("0."):
+        return text[1:]
+    if text.startswith("-0."):
+        return "-" + text[2:]
+    return text
+
+
+def _needs_space(previous, number):
+    """Whether number must be separated from the number written before it.
+
+    "-" always starts a new number, and so does "." once the previous
+    number already has a decimal point: "10 -5 1.5 .5" -> "10-5 1.5.5".
+    """
+    if previous is None or number.startswith("-"):
+        return False
+    return not (number.startswith(".") and "." in previous)
+
+
+def minify_path(d, precision=PRECISION):
+    """Round path data and drop redundant separators and repeated commands."""
+    commands = []
+    for token in PATH_TOKEN.findall(d):
+        if token.isalpha():
+            commands.append([token, []])
+        elif commands:
+            commands[-1][1].append(format_number(token, precision))
+
+    out = []
+    previous_command = previous_number = None
+    for command, numbers in commands:
+        # A repeated command letter is implicit (except after moveto, where it means lineto)
+        if not (numbers and command == previous_command and command not in "Mm"):
+            out.append(command)
+            previous_number = None
+        for number in numbers:
+            if _needs_space(previous_number, number):
+                out.append(" ")
+            out.append(number)
+            previous_number = number
+        previous_command = command
+    return "".join(out)
+
+
+def _minify_numbers(value, precision):
+    numbers = NUMBER.findall(value)
+    if not numbers or NUMBER.sub("", value).strip(" ,"):
+        return value  # units (e.g. "50%") or keywords: leave alone
+    return " ".join(format_number(n, precision) for n in numbers)
+
+
+def _short_color(value):
+    value = COLOR_NAMES.get(value.strip().lower(), value.strip())
+    match = re.fullmatch(r"#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3", value)
+    if match:
+        return "#" + "".join(match.groups()).lower()
+    return value.lower() if value.startswith("#") else value
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _clean_element(element, precision, inherited=frozenset(), in_text=False):
+    """Clean element and its subtree; inherited names attributes set by ancestors."""
+    for name in list(element.attrib):
+        value = element.attrib[name]
+        local = _local(name)
+        if name.startswith("{") and name[1:].startswith(EDITOR_NAMESPACES) or \
+                local.startswith("data-"):
+            del element.attrib[name]
+        elif local in DEFAULT_ATTRIBUTES and DEFAULT_ATTRIBUTES[local] in (None, value.strip()) \
+                and local not in inherited:
+            del element.attrib[name]
+        elif local == "d":
+            element.attrib[name] = minify_path(value, precision)
+        elif local in NUMERIC_ATTRIBUTES:
+            element.attrib[name] = _minify_numbers(value, precision)
+        elif local in ("fill", "stroke", "stop-color", "color"):
+            element.attrib[name] = _short_color(value)
+
+    if element.get(XML_SPACE) != "preserve":
+        # Runs of whitespace render as one space; it only separates words
+        # when there is text (or a <tspan>) on the other side
+        local = _local(element.tag)
+        if element.text is not None and local in TEXT_ELEMENTS:
+            text = re.sub(r"\s+", " ", element.text)
+            element.text = (text if len(element) else text.strip()) or None
+        elif element.text is not None and local not in ("style", "script"):
+            element.text = element.text.strip() or None
+        if element.tail is not None:
+            element.tail = re.sub(r"\s+", " ", element.tail) if in_text else None
+
+    inherited = inherited | (set(map(_local, element.attrib)) & INHERITED_ATTRIBUTES)
+    child_in_text = _local(element.tag) in TEXT_ELEMENTS
+    for child in element:
+        _clean_element(child, precision, inherited, child_in_text)
+
+
+def _unwrap_groups(parent):
+    """Inline groups that do nothing: no attributes, or one child to pass them to."""
+    index = 0
+    while index < len(parent):
+        child = parent[index]
+        _unwrap_groups(child)
+        if _local(child.tag) == "g":
+            attributes = dict(child.attrib)
+            if not attributes:
+                parent[index:index + 1] = list(child)
+                continue
+            if len(child) == 1 and set(attributes) <= INHERITED_ATTRIBUTES:
+                only = child[0]
+                for name, value in attributes.items():
+                    only.attrib.setdefault(name, value)
+                parent[index] = only
+                continue
+            if len(child) == 0:
+                del parent[index]
+                continue
+        index += 1
+
+
+def minify_svg(source, precision=PRECISION):
+    """Minified SVG text for SVG source text."""
+    ET.register_namespace("", SVG_NS)
+    ET.register_namespace("xlink", XLINK_NS)
+    root = ET.fromstring(source)  # comments and the XML declaration are dropped here
+
+    for parent in list(root.iter()):
+        for child in list(parent):
+            if _local(child.tag) in DROP_ELEMENTS or \
+                    child.tag.startswith("{") and child.tag[1:].startswith(EDITOR_NAMESPACES):
+                parent.remove(child)
+    _clean_element(root, precision)
+    _unwrap_groups(root)
+
+    # ElementTree escapes ">" in text, so " />" can only be a tag ending
+    return ET.tostring(root, encoding="unicode").replace(" />", "/>")
+
+
+def rasterizer_available():
+    """True if cairosvg and the cairo library are importable."""
+    try:
+        import cairosvg  # noqa: F401
+    except (ImportError, OSError):  # OSError: the package is there but libcairo isn't
+        return False
+    return True
+
+
+def _svg_size(svg_text):
+    root = ET.fromstring(svg_text)
+    view_box = root.get("viewBox")
+    if view_box:
+        _, _, width, height = (float(n) for n in NUMBER.findall(view_box))
+        return width, height
+    return float(root.get("width", 300)), float(root.get("height", 150))
+
+
+def _write_atomic(cache_path, data):
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, cache_path)
+
+
+def _rasterize(svg_path, cache_path, width, fmt):
+    """Render an SVG at width pixels and encode it (runs in a worker)."""
+    import cairosvg
+
+    svg_text = Path(svg_path).read_text()
+    view_width, view_height = _svg_size(svg_text)
+    height = round(width * view_height / view_width)
+    png = cairosvg.svg2png(bytestring=svg_text.encode("utf-8"),
+                           output_width=width, output_height=height)
+    if fmt == "webp":
+        buffer = io.BytesIO()
+        with Image.open(io.BytesIO(png)) as image:
+            image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+        png = buffer.getvalue()
+    _write_atomic(cache_path, png)
+    return str(cache_path)
+
+
+def build_svgs(sources, output_dir=DEFAULT_OUTPUT_DIR, precision=PRECISION,
+               rasterize=False, sizes=RASTER_SIZES, formats=RASTER_FORMATS,
+               workers=None, cache_dir=CACHE_DIR):
+    """Minify each SVG (and optionally rasterize it) into output_dir.
+
+    Writes <name>.svg, <name>-<width>.<fmt> and svg-manifest.json, and
+    returns the manifest.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = Path(cache_dir)
+    if rasterize and not rasterizer_available():
+        print("⚠️  cairosvg/libcairo not available - skipping rasterization")
+        rasterize = False
+
+    manifest = {"svgs": {}}
+    minified = 0
+    jobs = []
+    for source in sources:
+        data = Path(source).read_bytes()
+        source_hash = hashlib.sha256(data).hexdigest()
+        name = Path(source).stem
+
+        cache_path = cache_dir / source_hash[:2] / f"{source_hash}-p{precision}.svg"
+        if not cache_path.exists():
+            _write_atomic(cache_path, minify_svg(data.decode("utf-8"), precision).encode("utf-8"))
+            minified += 1
+        shutil.copyfile(cache_path, output_dir / f"{name}.svg")
+
+        entry = {"source": str(source), "sha256": source_hash, "bytes": len(data),
+                 "minified": {"file": f"{name}.svg", "bytes": cache_path.stat().st_size},
+                 "rasters": []}
+        if rasterize:
+            for width in sizes:
+                raster = {"width": width, "files": {}}
+                for fmt in formats:
+                    raster_cache = cache_path.with_name(f"{cache_path.stem}-{width}.{fmt}")
+                    output_path = output_dir / f"{name}-{width}.{fmt}"
+                    raster["files"][fmt] = output_path.name
+                    jobs.append((cache_path, raster_cache, width, fmt, output_path))
+                entry["rasters"].append(raster)
+        manifest["svgs"][name] = entry
+
+    pending = [job for job in jobs if not job[1].exists()]
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_rasterize, *zip(*[job[:4] for job in pending])))
+    for job in jobs:
+        shutil.copyfile(job[1], job[4])
+
+    manifest["minified"] = minified
+    manifest["rendered"] = len(pending)
+    manifest["cached"] = len(sources) - minified + len(jobs) - len(pending)
+    for entry in manifest["svgs"].values():
+        for raster in entry["rasters"]:
+            raster["bytes"] = {fmt: (output_dir / file).stat().st_size
+                               for fmt, file in raster["files"].items()}
+
+    with open(output_dir / "svg-manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Minify and pre-rasterize the concept-art SVGs")
+    parser.add_argument("sources", nargs="*",
+                        help=f"SVGs to process (default: {DEFAULT_INPUT_DIR}/*.svg)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_DIR), help="Output directory")
+    parser.add_argument("--precision", type=int, default=PRECISION,
+                        help="Decimal places kept in coordinates")
+    parser.add_argument("--rasterize", action="store_true",
+                        help="Also render PNG/WebP copies (needs cairosvg)")
+    parser.add_argument("--sizes", default=",".join(map(str, RASTER_SIZES)),
+                        help="Comma-separated raster widths")
+    parser.add_argument("--formats", default=",".join(RASTER_FORMATS),
+                        help="Comma-separated raster formats (png, webp)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    sources = args.sources or sorted(str(p) for p in DEFAULT_INPUT_DIR.glob("*.svg"))
+    if not sources:
+        print(f"❌ No SVGs found in {DEFAULT_INPUT_DIR}")
+        return
+
+    start = time.time()
+    manifest = build_svgs(
+        sources, args.output, precision=args.precision, rasterize=args.rasterize,
+        sizes=[int(s) for s in args.sizes.split(",")], formats=args.formats.split(","),
+        workers=args.workers
+    )
+
+    print(f"✅ SVGs built in {time.time() - start:.2f}s "
+          f"({manifest['minified']} minified, {manifest['rendered']} rendered, "
+          f"{manifest['cached']} from cache)")
+    total_before = total_after = 0
+    for name, entry in manifest["svgs"].items():
+        before, after = entry["bytes"], entry["minified"]["bytes"]
+        total_before += before
+        total_after += after
+        print(f"   {name}: {before:,} -> {after:,} bytes ({100 * (1 - after / before):.0f}% smaller)")
+        for raster in entry["rasters"]:
+            sizes = ", ".join(f"{fmt} {size:,}" for fmt, size in raster["bytes"].items())
+            print(f"      {raster['width']}px: {sizes}")
+    if total_before:
+        print(f"   Total: {total_before:,} -> {total_after:,} bytes")
+    print(f"\nAll files saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Texture Pipeline - Resize, mipmap and recompress the avatar textures
+Builds power-of-two mip chains of texture.jpg / texture_N.jpg, re-encodes each
+level as JPEG plus WebP/AVIF alternates, and embeds (or references) a chosen
+level in a GLB such as the one customize_wilhelm() writes
+
+Encodes run in a process pool and are cached under .texture-cache by a hash of
+the source texture's bytes and the encode settings, so unchanged textures are
+never re-encoded.
+"""
+
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, features
+
+from glb import FileRange, compact_buffers, existing_views, read_glb_layout, write_glb
+
+CACHE_DIR = Path(__file__).resolve().parent / ".texture-cache"
+
+MAX_SIZE = 2048
+MIN_SIZE = 128
+
+# Normal maps get higher quality: blocky normals show up as lighting artifacts
+QUALITY = {
+    "color": {"jpeg": 82, "webp": 80, "avif": 55},
+    "normal": {"jpeg": 92, "webp": 90, "avif": 75},
+}
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp", "avif": "image/avif"}
+EXTENSIONS = {"jpeg": ".jpg", "webp": ".webp", "avif": ".avif"}
+
+# glTF extension that carries each alternate format
+FORMAT_EXTENSIONS = {"webp": "EXT_texture_webp", "avif": "EXT_texture_avif"}
+
+
+def available_formats():
+    """Formats this Pillow build can encode (AVIF needs Pillow 11.3+ or pillow-avif-plugin)."""
+    formats = ["jpeg"]
+    if features.check("webp"):
+        formats.append("webp")
+    try:
+        avif = features.check("avif")
+    except ValueError:
+        avif = False
+    if not avif:
+        try:
+            import pillow_avif  # noqa: F401 - registers the AVIF codec
+            avif = True
+        except ImportError:
+            pass
+    if avif:
+        formats.append("avif")
+    return formats
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def mip_sizes(width, height, max_size=MAX_SIZE, min_size=MIN_SIZE):
+    """Power-of-two (width, height) levels from the largest that fits down to min_size."""
+    def floor_pow2(n):
+        return 1 << (max(int(n), 1).bit_length() - 1)
+
+    w = min(floor_pow2(width), max_size)
+    h = min(floor_pow2(height), max_size)
+    sizes = []
+    while True:
+        sizes.append((w, h))
+        if min(w, h) <= min_size:
+            break
+        w, h = w // 2, h // 2
+    return sizes
+
+
+def _renormalize(image):
+    """Re-normalize a tangent-space normal map after filtering shortened its vectors."""
+    pixels = np.asarray(image, dtype=np.float32) / 127.5 - 1.0
+    length = np.linalg.norm(pixels, axis=2, keepdims=True)
+    pixels /= np.where(length > 0, length, 1.0)
+    return Image.fromarray(np.round((pixels + 1.0) * 127.5).clip(0, 255).astype(np.uint8))
+
+
+def _encode_level(source_path, cache_path, size, fmt, kind):
+    """Resize source_path to size, encode it and store it at cache_path.
+
+    Runs in a worker process; writes to a temp file first so a crash never
+    leaves a half-written cache entry behind.
+    """
+    with Image.open(source_path) as image:
+        image = image.convert("RGB")
+        if image.size != size:
+            image = image.resize(size, Image.LANCZOS)
+    if kind == "normal":
+        image = _renormalize(image)
+
+    quality = QUALITY[kind][fmt]
+    buffer = io.BytesIO()
+    if fmt == "jpeg":
+        image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True,
+                   subsampling=0 if kind == "normal" else 2)
+    elif fmt == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=6)
+    else:
+        image.save(buffer, "AVIF", quality=quality)
+
+    cache_path = Path(cache_path)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buffer.getbuffer())
+    os.replace(temp_path, cache_path)
+    return str(cache_path)
+
+
+def build_textures(textures, output_dir, formats=None, max_size=MAX_SIZE, min_size=MIN_SIZE,
+                   workers=None, cache_dir=CACHE_DIR):
+    """Build mip chains for textures ({name: (path, 'color' | 'normal')}).
+
+    Writes <name>-<size><ext> files into output_dir plus textures-manifest.json
+    and returns the manifest.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    cache_dir = Path(cache_dir)
+    formats = formats or available_formats()
+
+    manifest = {"textures": {}}
+    jobs = []
+    for name, (path, kind) in textures.items():
+        source_hash = file_hash(path)
+        with Image.open(path) as image:
+            sizes = mip_sizes(*image.size, max_size=max_size, min_size=min_size)
+
+        entry = {"source": str(path), "sha256": source_hash, "kind": kind, "levels": []}
+        for size in sizes:
+            level = {"width": size[0], "height": size[1], "files": {}}
+            for fmt in formats:
+                settings = f"{size[0]}x{size[1]}-{fmt}-q{QUALITY[kind][fmt]}-{kind}"
+                cache_path = cache_dir / source_hash[:2] / f"{source_hash}-{settings}{EXTENSIONS[fmt]}"
+                output_path = output_dir / f"{name}-{size[0]}{EXTENSIONS[fmt]}"
+                level["files"][fmt] = output_path.name
+                jobs.append((path, cache_path, size, fmt, kind, output_path))
+            entry["levels"].append(level)
+        manifest["textures"][name] = entry
+
+    pending = [job for job in jobs if not job[1].exists()]
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            list(pool.map(_encode_level, *zip(*[job[:5] for job in pending])))
+
+    for job in jobs:
+        cache_path, output_path = job[1], job[5]
+        shutil.copyfile(cache_path, output_path)
+
+    manifest["cached"] = len(jobs) - len(pending)
+    manifest["encoded"] = len(pending)
+    for entry in manifest["textures"].values():
+        for level in entry["levels"]:
+            level["bytes"] = {fmt: (output_dir / file).stat().st_size for fmt, file in level["files"].items()}
+
+    with open(output_dir / "textures-manifest.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _add_image(gltf, views, path, fmt, reference_from):
+    """Append an image for path, embedded as a bufferView or referenced by uri."""
+    image = {"mimeType": MIME_TYPES[fmt], "name": Path(path).stem}
+    if reference_from is not None:
+        image["uri"] = os.path.relpath(path, reference_from).replace(os.sep, "/")
+        del image["mimeType"]
+    else:
+        image["bufferView"] = len(views)
+        views.append(({}, FileRange(str(path), 0, os.path.getsize(path))))
+    gltf.setdefault("images", []).append(image)
+    return len(gltf["images"]) - 1
+
+
+def _texture_for(gltf, views, files, reference_from):
+    """A glTF texture for {format: path}: JPEG as the base image, the other
+    formats through EXT_texture_webp / EXT_texture_avif.
+
+    Without a JPEG the alternates become required extensions.
+    """
+    texture = {}
+    alternates = {fmt: path for fmt, path in files.items() if fmt != "jpeg"}
+    if "jpeg" in files:
+        texture["source"] = _add_image(gltf, views, files["jpeg"], "jpeg", reference_from)
+
+    for fmt, path in alternates.items():
+        extension = FORMAT_EXTENSIONS[fmt]
+        texture.setdefault("extensions", {})[extension] = {
+            "source": _add_image(gltf, views, path, fmt, reference_from)
+        }
+        if extension not in gltf.setdefault("extensionsUsed", []):
+            gltf["extensionsUsed"].append(extension)
+        if "jpeg" not in files and extension not in gltf.setdefault("extensionsRequired", []):
+            gltf["extensionsRequired"].append(extension)
+
+    gltf.setdefault("textures", []).append(texture)
+    return len(gltf["textures"]) - 1
+
+
+def embed_textures(input_path, output_path, base_color=None, normal=None, reference=False):
+    """Point every material of a GLB at new base color / normal textures.
+
+    base_color and normal map formats to files, e.g. {"jpeg": ..., "webp": ...}.
+    With reference=True the images are referenced by relative uri instead of
+    embedded. Images and bufferViews nothing uses any more are dropped.
+    Returns the number of bytes written.
+    """
+    gltf, bin_range = read_glb_layout(input_path)
+    if bin_range is None:
+        bin_data = b""
+    else:
+        bin_data = np.fromfile(input_path, np.uint8, count=bin_range.length, offset=bin_range.offset)
+    views = existing_views(gltf, bin_data)
+    reference_from = Path(output_path).resolve().parent if reference else None
+
+    slots = {}
+    if base_color:
+        slots["baseColor"] = _texture_for(gltf, views, base_color, reference_from)
+    if normal:
+        slots["normal"] = _texture_for(gltf, views, normal, reference_from)
+
+    for material in gltf.get("materials", []):
+        pbr = material.setdefault("pbrMetallicRoughness", {})
+        for slot, holder, key in (("baseColor", pbr, "baseColorTexture"),
+                                  ("normal", material, "normalTexture")):
+            if slot not in slots:
+                continue
+            old = holder.get(key, {})
+            # The new texture keeps the wrap/filter settings of the one it replaces
+            sampler = gltf["textures"][old["index"]].get("sampler") if "index" in old else None
+            if sampler is not None:
+                gltf["textures"][slots[slot]].setdefault("sampler", sampler)
+            holder[key] = dict(old, index=slots[slot])
+
+    _drop_unused_textures(gltf)
+    pieces = compact_buffers(gltf, views)
+    return write_glb(output_path, gltf, pieces)
+
+
+def _drop_unused_textures(gltf):
+    """Remove textures and images no material references any more."""
+    def texture_refs(material):
+        pbr = material.get("pbrMetallicRoughness", {})
+        for info in (pbr.get("baseColorTexture"), pbr.get("metallicRoughnessTexture"),
+                     material.get("normalTexture"), material.get("occlusionTexture"),
+                     material.get("emissiveTexture")):
+            if info is not None:
+                yield info
+
+    used = sorted({info["index"] for m in gltf.get("materials", []) for info in texture_refs(m)})
+    texture_remap = {old: new for new, old in enumerate(used)}
+    textures = [gltf["textures"][i] for i in used]
+    for material in gltf.get("materials", []):
+        for info in texture_refs(material):
+            info["index"] = texture_remap[info["index"]]
+
+    def sources(texture):
+        if "source" in texture:
+            yield texture, "source"
+        for extension in texture.get("extensions", {}).values():
+            if "source" in extension:
+                yield extension, "source"
+
+    used_images = sorted({holder[key] for t in textures for holder, key in sources(t)})
+    image_remap = {old: new for new, old in enumerate(used_images)}
+    for texture in textures:
+        for holder, key in sources(texture):
+            holder[key] = image_remap[holder[key]]
+
+    if textures:
+        gltf["textures"] = textures
+        gltf["images"] = [gltf["images"][i] for i in used_images]
+    else:
+        gltf.pop("textures", None)
+        gltf.pop("images", None)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build and embed Wilhelm's textures")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Build mip chains and alternate formats")
+    build.add_argument("--color", default="models/wilhelm-model/texture.jpg", help="Base color texture")
+    build.add_argument("--normal", default="models/wilhelm-model/texture_N.jpg", help="Normal map")
+    build.add_argument("--output", default="models/wilhelm/textures", help="Output directory")
+    build.add_argument("--formats", default=None, help="Comma-separated formats (default: all available)")
+    build.add_argument("--max-size", type=int, default=MAX_SIZE)
+    build.add_argument("--min-size", type=int, default=MIN_SIZE)
+    build.add_argument("--workers", type=int, default=None)
+
+    embed = subparsers.add_parser("embed", help="Put one texture level into a GLB")
+    embed.add_argument("input", help="Input GLB")
+    embed.add_argument("output", help="Output GLB")
+    embed.add_argument("--textures", default="models/wilhelm/textures", help="Directory written by 'build'")
+    embed.add_argument("--size", type=int, default=1024, help="Texture width to use")
+    embed.add_argument("--formats", default="jpeg", help="Comma-separated formats to include")
+    embed.add_argument("--reference", action="store_true", help="Reference images by uri instead of embedding")
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        textures = {}
+        if args.color:
+            textures[Path(args.color).stem] = (args.color, "color")
+        if args.normal:
+            textures[Path(args.normal).stem] = (args.normal, "normal")
+        formats = args.formats.split(",") if args.formats else None
+
+        start = time.time()
+        manifest = build_textures(textures, args.output, formats=formats, max_size=args.max_size,
+                                  min_size=args.min_size, workers=args.workers)
+
+        print(f"✅ Textures built in {time.time() - start:.2f}s "
+              f"({manifest['encoded']} encoded, {manifest['cached']} from cache)")
+        for name, entry in manifest["textures"].items():
+            print(f"   {name} ({os.path.getsize(entry['source']):,} bytes source)")
+            for level in entry["levels"]:
+                sizes = ", ".join(f"{fmt} {size:,}" for fmt, size in level["bytes"].items())
+                print(f"      {level['width']}x{level['height']}: {sizes}")
+        return
+
+    with open(Path(args.textures) / "textures-manifest.json") as f:
+        manifest = json.load(f)
+    formats = args.formats.split(",")
+
+    chosen = {}
+    for name, entry in manifest["textures"].items():
+        level = min(entry["levels"], key=lambda l: abs(l["width"] - args.size))
+        chosen[entry["kind"]] = {fmt: Path(args.textures) / level["files"][fmt]
+                                 for fmt in formats if fmt in level["files"]}
+
+    output_length = embed_textures(args.input, args.output, base_color=chosen.get("color"),
+                                   normal=chosen.get("normal"), reference=args.reference)
+
+    print(f"✅ Textures embedded!")
+    print(f"   Input: {args.input} ({os.path.getsize(args.input):,} bytes)")
+    print(f"   Output: {args.output} ({output_length:,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
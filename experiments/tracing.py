@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Tracing - Spans and counters for the image generation pipeline
+Times each phase of a run (queue wait, submit, polling, download, cache
+write) with byte counts, counts retries and polls, and exports the lot as
+JSON lines or OpenMetrics text for tuning concurrency and speed tiers
+"""
+
+import itertools
+import json
+import re
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Quantiles reported for each span name in summaries and OpenMetrics output
+QUANTILES = (0.5, 0.95)
+
+METRIC_PREFIX = "wilhelm"
+
+
+class Span:
+    """One timed operation. attrs are free-form; "bytes" is summed in reports."""
+
+    def __init__(self, name: str, span_id: int, parent: Optional[int], attrs: dict):
+        self.name = name
+        self.span_id = span_id
+        self.parent = parent
+        self.attrs = attrs
+        self.start = time.time()
+        self._clock = time.perf_counter()
+        self.duration = None
+        self.status = "ok"
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, key: str, amount: float):
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    def record(self) -> dict:
+        return {"name": self.name, "span": self.span_id, "parent": self.parent,
+                "start": round(self.start, 6), "duration": round(self.duration, 6),
+                "status": self.status, **self.attrs}
+
+
+def _percentile(values: list, q: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[round(q * 100) - 1]
+
+
+def _metric_name(name: str) -> str:
+    return f"{METRIC_PREFIX}_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape_label(value) -> str:
+    """OpenMetrics label value escaping: backslash, double quote and newline."""
+    return str(value).replace("\\", r"\\").replace('"', r'\"').replace("\n", r"\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{_escape_label(v)}"' for k, v in sorted(labels.items()))
+    return "{" + body + "}"
+
+
+class Tracer:
+    """Collects finished spans and counters; thread-safe.
+
+    Spans opened on the same thread nest automatically. With a path every
+    finished span is also appended to it as one JSON line.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.spans = []
+        self.counters = {}
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the enclosed block; an exception marks the span as an error."""
+        stack = self._stack()
+        span = Span(name, next(self._ids), stack[-1].span_id if stack else None, attrs)
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs.setdefault("error", f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            stack.pop()
+            span.duration = time.perf_counter() - span._clock
+            self._finish(span)
+
+    def record(self, name: str, duration: float, **attrs):
+        """Add a span measured elsewhere, e.g. a wait that began on another thread."""
+        stack = self._stack()
+        span = Span(name, next(self._ids), stack[-1].span_id if stack else None, attrs)
+        span.start -= duration
+        span.duration = duration
+        self._finish(span)
+
+    def count(self, name: str, amount: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def _finish(self, span: Span):
+        record = span.record()
+        with self._lock:
+            self.spans.append(record)
+            if self.path:
+                if self._file is None:
+                    self._file = open(self.path, "a")
+                self._file.write(json.dumps(record, default=str) + "\n")
+                self._file.flush()
+
+    def mark(self) -> tuple:
+        """A point to summarise from, so one run's report excludes earlier runs."""
+        with self._lock:
+            return len(self.spans), dict(self.counters)
+
+    def summary(self, since: Optional[tuple] = None) -> dict:
+        """{"spans": {name: stats}, "counters": {(name, labels): value}}."""
+        start, counters_before = since or (0, {})
+        with self._lock:
+            spans = self.spans[start:]
+            counters = {key: value - counters_before.get(key, 0)
+                        for key, value in self.counters.items()
+                        if value != counters_before.get(key, 0)}
+
+        by_name = {}
+        for record in spans:
+            by_name.setdefault(record["name"], []).append(record)
+        stats = {}
+        for name, records in by_name.items():
+            durations = sorted(r["duration"] for r in records)
+            stats[name] = {
+                "count": len(records),
+                "errors": sum(r["status"] != "ok" for r in records),
+                "total": sum(durations),
+                "mean": statistics.fmean(durations),
+                "max": durations[-1],
+                "bytes": sum(r.get("bytes", 0) for r in records),
+                **{f"p{round(q * 100)}": _percentile(durations, q) for q in QUANTILES},
+            }
+        return {"spans": stats, "counters": counters}
+
+    def print_summary(self, since: Optional[tuple] = None):
+        summary = self.summary(since)
+        if not summary["spans"] and not summary["counters"]:
+            return
+        print("\n" + "="*60)
+        print("⏱️  TIMINGS")
+        print("="*60)
+        print(f"   {'Phase':<16}{'Count':>6}{'Total s':>9}{'p50 s':>8}{'p95 s':>8}{'Max s':>8}{'MB':>7}")
+        for name, s in sorted(summary["spans"].items(), key=lambda item: -item[1]["total"]):
+            errors = f"  ({s['errors']} failed)" if s["errors"] else ""
+            size = f"{s['bytes'] / 1e6:>7.2f}" if s["bytes"] else f"{'':>7}"
+            print(f"   {name:<16}{s['count']:>6}{s['total']:>9.2f}{s['p50']:>8.2f}"
+                  f"{s['p95']:>8.2f}{s['max']:>8.2f}{size}{errors}")
+        for (name, labels), value in sorted(summary["counters"].items()):
+            label_text = "".join(f" {k}={v}" for k, v in labels)
+            print(f"   {name}{label_text}: {value:g}")
+
+    def openmetrics(self, since: Optional[tuple] = None) -> str:
+        """The summary in OpenMetrics text format (Prometheus-compatible)."""
+        summary = self.summary(since)
+        lines = []
+        if summary["spans"]:
+            seconds = _metric_name("span_seconds")
+            lines += [f"# TYPE {seconds} summary", f"# UNIT {seconds} seconds"]
+            for name, s in sorted(summary["spans"].items()):
+                for q in QUANTILES:
+                    lines.append(f"{seconds}{_labels({'span': name, 'quantile': q})} "
+                                 f"{s[f'p{round(q * 100)}']:.6f}")
+                lines.append(f"{seconds}_count{_labels({'span': name})} {s['count']}")
+                lines.append(f"{seconds}_sum{_labels({'span': name})} {s['total']:.6f}")
+            span_bytes = _metric_name("span_bytes")
+            lines.append(f"# TYPE {span_bytes} counter")
+            for name, s in sorted(summary["spans"].items()):
+                if s["bytes"]:
+                    lines.append(f"{span_bytes}_total{_labels({'span': name})} {s['bytes']}")
+
+        counter_names = sorted({name for name, _ in summary["counters"]})
+        for name in counter_names:
+            metric = _metric_name(name)
+            lines.append(f"# TYPE {metric} counter")
+            for (counter, labels), value in sorted(summary["counters"].items()):
+                if counter == name:
+                    lines.append(f"{metric}_total{_labels(dict(labels))} {value:g}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_openmetrics(self, path, since: Optional[tuple] = None):
+        with open(path, "w") as f:
+            f.write(self.openmetrics(since))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """The process-wide tracer every module reports to."""
+    return _tracer
+
+
+def set_trace_file(path):
+    """Start appending every finished span to path as JSON lines."""
+    _tracer.close()
+    _tracer.path = path
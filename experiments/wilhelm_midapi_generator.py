@@ -6,29 +6,54 @@ Generates 4 style variations of Wilhelm the parrot assistant
 
 import os
 import json
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional
-import requests
+
+import http_client
+from art_cache import ArtCache, CacheKey, get_cache
+from midapi_polling import CompletionHistory, PollScheduler
+from retry import RetryableError, get_guard
+from tracing import get_tracer, set_trace_file
 
 # Default settings
+DEFAULT_BASE_URL = "https://api.midapi.ai/api/v1/mj"
 DEFAULT_VERSION = "7"
 DEFAULT_ASPECT_RATIO = "1:1"
 DEFAULT_SPEED = "fast"  # relaxed, fast, turbo
+DEFAULT_CONCURRENCY = 4  # tasks submitted/downloaded at once; 1 = one after another
+RETRY_CODES = {429, 455, 500, 503}  # MidAPI body codes worth retrying
+DEFAULT_POLL_RATE = 30  # status checks per minute across all in-flight tasks
 
 
 class WilhelmGenerator:
-    def __init__(self, api_key: Optional[str] = None, output_dir: str = None):
+    def __init__(self, api_key: Optional[str] = None, output_dir: str = None,
+                 poll_requests_per_minute: float = DEFAULT_POLL_RATE,
+                 cache: Optional[ArtCache] = None,
+                 base_url: Optional[str] = None):
         """Initialize MidAPI.ai generator for Wilhelm concept art."""
         self.api_key = api_key or os.getenv("MIDAPI_KEY")
-        self.base_url = "https://api.midapi.ai/api/v1/mj"
+        # MIDAPI_BASE_URL points the client at mock_image_server.py for testing
+        self.base_url = (base_url or os.getenv("MIDAPI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
         
         if output_dir is None:
-            self.output_dir = Path("/home/captain_tommy/.openclaw/workspace/twe_website/experiments/concept-art")
+            self.output_dir = Path(__file__).resolve().parent / "concept-art"
         else:
             self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
+        # Past completion times per speed tier seed the polling intervals
+        self.history = CompletionHistory()
+        self.poll_requests_per_minute = poll_requests_per_minute
+        
+        # Finished images keyed by what produced them, shared with the other generators
+        self.cache = cache or get_cache()
+        
+        # Phase timings, byte counts and poll/retry counters for every run
+        self.tracer = get_tracer()
+        
         if not self.api_key:
             raise ValueError("MidAPI key required. Set MIDAPI_KEY env var or pass api_key parameter.")
         
@@ -67,6 +92,19 @@ class WilhelmGenerator:
                        max_retries: int = 3) -> Optional[str]:
         """Generate a single image using MidAPI.ai."""
         
+        task_id = self.submit_task(variation, version, speed, max_retries)
+        if task_id is None:
+            return None
+        
+        # Wait for completion
+        return self._wait_for_completion(task_id, name=variation['name'], speed=speed)
+    
+    def submit_task(self, variation: dict,
+                    version: str = DEFAULT_VERSION,
+                    speed: str = DEFAULT_SPEED,
+                    max_retries: int = 3) -> Optional[str]:
+        """Submit a generation task and return its task id (no waiting)."""
+        
         print(f"\n🎨 Generating: {variation['name']}")
         print(f"   Prompt: {variation['prompt'][:100]}...")
         
@@ -78,106 +116,192 @@ class WilhelmGenerator:
             "version": version
         }
         
-        for attempt in range(max_retries):
-            try:
-                print(f"   Submitting task... (attempt {attempt + 1}/{max_retries})")
-                
-                # Submit generation task
-                response = requests.post(
-                    f"{self.base_url}/generate",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=60
-                )
-                
-                result = response.json()
-                
-                if result.get("code") != 200:
-                    print(f"   API Error: {result.get('msg', 'Unknown error')}")
-                    if attempt < max_retries - 1:
-                        time.sleep(5)
-                        continue
-                    return None
-                
-                task_id = result["data"]["taskId"]
-                print(f"   Task started: {task_id}")
-                
-                # Wait for completion
-                image_url = self._wait_for_completion(task_id)
-                return image_url
-                    
-            except Exception as e:
-                print(f"   Error on attempt {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(5)
-                else:
-                    return None
+        def submit():
+            # Submit generation task
+            response = http_client.post(
+                f"{self.base_url}/generate",
+                headers=self.headers,
+                json=payload
+            )
+            span.add("bytes", len(response.content))
+            http_client.raise_for_retry(response)
+            result = response.json()
+            
+            # MidAPI reports busy/rate-limited in the body with HTTP 200
+            if result.get("code") in RETRY_CODES:
+                raise RetryableError(f"API Error: {result.get('msg', 'Unknown error')}")
+            return result
         
-        return None
+        try:
+            print(f"   Submitting task...")
+            with self.tracer.span("submit", variation=variation['name'], speed=speed) as span:
+                result = get_guard("midapi").call(submit, attempts=max_retries)
+        except Exception as e:
+            print(f"   Error: {e}")
+            return None
+        
+        if result.get("code") != 200:
+            print(f"   API Error: {result.get('msg', 'Unknown error')}")
+            return None
+        
+        task_id = result["data"]["taskId"]
+        print(f"   Task started: {task_id}")
+        return task_id
+    
+    def check_status(self, task_id: str) -> tuple:
+        """Check a task once.
+        
+        Returns ("pending", None), ("success", image_url) or ("failed", error).
+        """
+        # One attempt: the poll scheduler already decides when to look again
+        with self.tracer.span("poll", task=task_id) as span:
+            response = http_client.get(
+                f"{self.base_url}/record-info?taskId={task_id}",
+                kind="poll",
+                provider="midapi",
+                attempts=1,
+                headers=self.headers
+            )
+            span.set(bytes=len(response.content))
+            result = response.json()
+        
+        if result.get("code") != 200:
+            return "pending", f"Status check error: {result.get('msg')}"
+        
+        data = result["data"]
+        success_flag = data.get("successFlag", 0)
+        
+        if success_flag == 1:
+            result_info = data.get("resultInfoJson", {})
+            urls = result_info.get("resultUrls", [])
+            if urls:
+                return "success", urls[0].get("resultUrl")
+            return "failed", "No result URL"
+        elif success_flag in [2, 3]:
+            return "failed", data.get("errorMessage", "Generation failed")
+        return "pending", None
     
-    def _wait_for_completion(self, task_id: str, max_wait: int = 300) -> Optional[str]:
-        """Poll for task completion."""
-        start_time = time.time()
-        poll_interval = 10
+    def _poll_scheduler(self, names: dict, max_wait: int = 300) -> PollScheduler:
+        """A scheduler that reports progress for each task it polls.
         
-        while time.time() - start_time < max_wait:
+        names maps task ids to the variation names used in log lines.
+        """
+        def check(task_id):
+            name = names.get(task_id)
+            label = f"[{name}] " if name else ""
             try:
-                response = requests.get(
-                    f"{self.base_url}/record-info?taskId={task_id}",
-                    headers=self.headers,
-                    timeout=30
-                )
-                
-                result = response.json()
-                
-                if result.get("code") != 200:
-                    print(f"   Status check error: {result.get('msg')}")
-                    time.sleep(poll_interval)
-                    continue
-                
-                data = result["data"]
-                success_flag = data.get("successFlag", 0)
-                
-                if success_flag == 0:
-                    print(f"   Generating... ({int(time.time() - start_time)}s)")
-                elif success_flag == 1:
-                    result_info = data.get("resultInfoJson", {})
-                    urls = result_info.get("resultUrls", [])
-                    if urls:
-                        return urls[0].get("resultUrl")
-                    return None
-                elif success_flag in [2, 3]:
-                    error_msg = data.get("errorMessage", "Generation failed")
-                    print(f"   Generation failed: {error_msg}")
-                    return None
-                
-                time.sleep(poll_interval)
-                
+                state, value = self.check_status(task_id)
             except Exception as e:
-                print(f"   Poll error: {e}")
-                time.sleep(poll_interval)
+                self.tracer.count("polls", state="error")
+                print(f"   {label}Poll error: {e}")
+                raise
+            self.tracer.count("polls", state=state)
+            if state != "pending":
+                # Submission to a final answer, as seen by the poller
+                self.tracer.record("generation", scheduler.elapsed(task_id),
+                                   variation=name, state=state)
+            if state == "pending":
+                if value:
+                    print(f"   {label}{value}")
+                else:
+                    print(f"   {label}Generating... ({int(scheduler.elapsed(task_id))}s)")
+            elif state == "failed":
+                print(f"   {label}Generation failed: {value}")
+            return state, value
         
-        print("   Timeout waiting for generation")
-        return None
+        scheduler = PollScheduler(
+            check,
+            history=self.history,
+            max_wait=max_wait,
+            requests_per_minute=self.poll_requests_per_minute
+        )
+        return scheduler
+    
+    def _wait_for_completion(self, task_id: str, max_wait: int = 300,
+                             name: Optional[str] = None,
+                             speed: str = DEFAULT_SPEED,
+                             stop: Optional[threading.Event] = None) -> Optional[str]:
+        """Poll for task completion (or until stop is set)."""
+        scheduler = self._poll_scheduler({task_id: name}, max_wait)
+        scheduler.add(task_id, speed=speed)
+        state, value = scheduler.run(lambda *args: None, stop=stop)[task_id]
+        if state == "timeout":
+            label = f"[{name}] " if name else ""
+            print(f"   {label}Timeout waiting for generation")
+        return value if state == "success" else None
     
     def download_image(self, url: str, filepath: Path) -> bool:
-        """Download image from URL to local file."""
+        """Stream an image from URL to local file (atomically, validated)."""
         try:
-            response = requests.get(url, timeout=60)
-            response.raise_for_status()
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
-            
+            http_client.download_image(url, filepath)
             return True
         except Exception as e:
             print(f"   Download error: {e}")
             return False
     
+    def cache_key(self, variation: dict, version: str = DEFAULT_VERSION) -> CacheKey:
+        """Cache key for one variation (the seed, if any, is part of the prompt)."""
+        return CacheKey("midapi", f"midjourney-v{version}", variation['prompt'],
+                        size=DEFAULT_ASPECT_RATIO)
+    
+    def _save_image(self, variation: dict, version: str, image_url: str,
+                    output_file: Path, queued_at: Optional[float] = None) -> bool:
+        """Download a finished image and add it to the cache.
+        
+        queued_at is when the download was handed to the worker pool.
+        """
+        if queued_at is not None:
+            self.tracer.record("queue_wait", time.time() - queued_at,
+                               phase="download", variation=variation['name'])
+        if not self.download_image(image_url, output_file):
+            return False
+        with self.tracer.span("cache_write", variation=variation['name']) as span:
+            self.cache.put(self.cache_key(variation, version), output_file)
+            span.set(bytes=output_file.stat().st_size)
+        return True
+    
+    def _record_result(self, results: dict, variation: dict, output_file: Path,
+                       image_url: Optional[str], saved: bool):
+        """Add one variation's outcome to the generate_all results."""
+        if image_url:
+            if saved:
+                print(f"   ✅ Saved: {output_file.name}")
+                results["generated"].append({
+                    "name": variation['name'],
+                    "file": str(output_file),
+                    "url": image_url
+                })
+            else:
+                print(f"   ⚠️  {variation['name']}: Generated but failed to download")
+                results["failed"].append({
+                    "name": variation['name'],
+                    "error": "Download failed"
+                })
+        else:
+            print(f"   ❌ {variation['name']}: Failed to generate")
+            results["failed"].append({
+                "name": variation['name'],
+                "error": "Generation failed"
+            })
+    
     def generate_all(self, version: str = DEFAULT_VERSION,
                     speed: str = DEFAULT_SPEED,
-                    skip_existing: bool = True) -> dict:
-        """Generate all 4 Wilhelm concept art variations."""
+                    skip_existing: bool = True,
+                    concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+        """Generate all 4 Wilhelm concept art variations.
+        
+        With skip_existing, variations already in the art cache for this
+        prompt and model version are restored from it without any API calls.
+        
+        With concurrency > 1 every task is submitted up front, then a single
+        PollScheduler loop checks all of them on adaptive intervals and each
+        image is downloaded (up to `concurrency` at once) as soon as its task
+        finishes, so a run takes about as long as the slowest task instead of
+        the sum of all of them.
+        """
+        
+        start = time.time()
+        mark = self.tracer.mark()
         
         print("="*60)
         print("🦜 WILHELM CONCEPT ART GENERATOR")
@@ -192,42 +316,69 @@ class WilhelmGenerator:
             "skipped": []
         }
         
+        pending = []
         for var in variations:
             output_file = self.output_dir / f"wilhelm-{var['name']}.png"
             
-            # Check if already exists
-            if skip_existing and output_file.exists():
-                print(f"\n⏭️  {var['name']}: Already exists, skipping")
+            # Reuse an image generated from this exact prompt and model
+            if skip_existing and self.cache.restore(self.cache_key(var, version), output_file):
+                self.tracer.count("cache_hits")
+                print(f"\n⏭️  {var['name']}: Cached, skipping")
                 results["skipped"].append({
                     "name": var['name'],
                     "file": str(output_file)
                 })
                 continue
-            
-            # Generate image
-            image_url = self.generate_image(var, version, speed)
-            
-            if image_url:
-                # Download and save
-                if self.download_image(image_url, output_file):
-                    print(f"   ✅ Saved: {output_file.name}")
-                    results["generated"].append({
-                        "name": var['name'],
-                        "file": str(output_file),
-                        "url": image_url
-                    })
-                else:
-                    print(f"   ⚠️  Generated but failed to download")
-                    results["failed"].append({
-                        "name": var['name'],
-                        "error": "Download failed"
-                    })
-            else:
-                print(f"   ❌ Failed to generate")
-                results["failed"].append({
-                    "name": var['name'],
-                    "error": "Generation failed"
-                })
+            pending.append((var, output_file))
+        
+        if concurrency <= 1:
+            for var, output_file in pending:
+                # Generate image, then download and save
+                image_url = self.generate_image(var, version, speed)
+                saved = bool(image_url) and self._save_image(var, version, image_url, output_file)
+                self._record_result(results, var, output_file, image_url, saved)
+        elif pending:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                # Submit everything first so MidAPI works on all tasks at once
+                queued_at = time.time()
+                
+                def submit(item):
+                    self.tracer.record("queue_wait", time.time() - queued_at,
+                                       phase="submit", variation=item[0]['name'])
+                    return self.submit_task(item[0], version, speed), time.time()
+                
+                submitted = list(pool.map(submit, pending))
+                
+                # One loop polls every task; downloads start as each one finishes
+                names = {}
+                scheduler = self._poll_scheduler(names)
+                for (var, output_file), (task_id, submitted_at) in zip(pending, submitted):
+                    if task_id is None:
+                        self._record_result(results, var, output_file, None, False)
+                        continue
+                    names[task_id] = var['name']
+                    scheduler.add(task_id, speed=speed, submitted_at=submitted_at,
+                                  context=(var, output_file))
+                
+                downloads = {}
+                
+                def on_complete(task_id, state, image_url, context):
+                    var, output_file = context
+                    if state != "success":
+                        if state == "timeout":
+                            print(f"   [{var['name']}] Timeout waiting for generation")
+                        self._record_result(results, var, output_file, None, False)
+                        return
+                    future = pool.submit(self._save_image, var, version, image_url, output_file,
+                                         time.time())
+                    downloads[future] = (var, output_file, image_url)
+                
+                scheduler.run(on_complete)
+                print(f"   Polled {len(downloads)} finished task(s) with {scheduler.requests} status checks")
+                
+                for future in as_completed(downloads):
+                    var, output_file, image_url = downloads[future]
+                    self._record_result(results, var, output_file, image_url, future.result())
         
         # Print summary
         print("\n" + "="*60)
@@ -242,6 +393,10 @@ class WilhelmGenerator:
             for item in results['generated']:
                 print(f"      • {Path(item['file']).name}")
         
+        self.tracer.record("generate_all", time.time() - start, version=version, speed=speed,
+                           concurrency=concurrency)
+        self.tracer.print_summary(mark)
+        
         return results
 
 
@@ -253,11 +408,22 @@ def main():
     parser.add_argument("--version", default="7", help="Midjourney model version (6, 6.1, 7)")
     parser.add_argument("--speed", default="fast", choices=["relaxed", "fast", "turbo"],
                        help="Generation speed")
-    parser.add_argument("--regenerate", action="store_true", help="Force regenerate existing images")
+    parser.add_argument("--regenerate", action="store_true", help="Force regenerate cached images")
     parser.add_argument("--api-key", default=None, help="MidAPI key (or set MIDAPI_KEY env var)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                       help="Tasks to submit and download at once (1 = sequential)")
+    parser.add_argument("--poll-rate", type=float, default=DEFAULT_POLL_RATE,
+                       help="Maximum status checks per minute across all tasks")
+    parser.add_argument("--trace", default=None,
+                       help="Append every timed span to this file as JSON lines")
+    parser.add_argument("--metrics", default=None,
+                       help="Write run metrics to this file in OpenMetrics format")
     
     args = parser.parse_args()
     
+    if args.trace:
+        set_trace_file(args.trace)
+    
     # Check for API key
     api_key = args.api_key or os.getenv("MIDAPI_KEY")
     if not api_key:
@@ -273,7 +439,8 @@ def main():
     try:
         generator = WilhelmGenerator(
             api_key=api_key,
-            output_dir=args.output
+            output_dir=args.output,
+            poll_requests_per_minute=args.poll_rate
         )
     except ValueError as e:
         print(f"❌ {e}")
@@ -283,9 +450,14 @@ def main():
     results = generator.generate_all(
         version=args.version,
         speed=args.speed,
-        skip_existing=not args.regenerate
+        skip_existing=not args.regenerate,
+        concurrency=args.concurrency
     )
     
+    if args.metrics:
+        get_tracer().write_openmetrics(args.metrics)
+        print(f"\n📈 Metrics written to {args.metrics}")
+    
     print("\n✨ Done!")
 
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Wilhelm Variant Engine - Many branded GLBs from one parse
+Reads Parrot.glb once and writes a themed copy per entry in a variant spec
+
+Spec format (JSON):
+
+    {
+      "output": "Wilhelm-{name}.glb",
+      "defaults": {"metallic": 0.1, "roughness": 0.6},
+      "variants": [
+        {"name": "coral"},
+        {"name": "midnight", "baseColor": "#1a1a2e", "brandColor": "#1a1a2e",
+         "emissive": [0.0, 0.0, 0.05]},
+        {"name": "holiday", "baseColor": "#e94560",
+         "materials": {"Eyes": {"baseColor": "#faf5eb", "roughness": 0.2}}}
+      ]
+    }
+
+"materials" overrides apply to the original (pre-rename) material names.
+"""
+
+import copy
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from customize_wilhelm import CORAL, apply_wilhelm_palette, hex_to_rgba
+from glb import read_glb_layout, write_glb
+
+DEFAULT_OUTPUT_PATTERN = "Wilhelm-{name}.glb"
+DEFAULT_VARIANT = {
+    "baseColor": CORAL,
+    "brandColor": "#e94560",
+    "metallic": 0.1,
+    "roughness": 0.6,
+    "emissive": [0.05, 0.02, 0.02],
+}
+
+# Variant names become file names, so they can't carry path separators
+VARIANT_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+# Set once per worker process by _init_worker so tasks only carry the variant
+_base_gltf = None
+_bin_range = None
+
+
+def _check_name(name):
+    if not isinstance(name, str) or not VARIANT_NAME.fullmatch(name):
+        raise ValueError(f"Invalid variant name {name!r}: use letters, digits, '.', '_' and '-'")
+
+
+def load_spec(spec_path):
+    """Load a variant spec and fill every variant in from the defaults."""
+    with open(spec_path) as f:
+        spec = json.load(f)
+
+    defaults = dict(DEFAULT_VARIANT, **spec.get("defaults", {}))
+    variants = []
+    seen = set()
+    for entry in spec.get("variants", []):
+        if "name" not in entry:
+            raise ValueError(f"Variant without a name in {spec_path}: {entry}")
+        _check_name(entry["name"])
+        if entry["name"] in seen:
+            raise ValueError(f"Duplicate variant name in {spec_path}: {entry['name']}")
+        seen.add(entry["name"])
+        variants.append(dict(defaults, **entry))
+
+    return variants, spec.get("output", DEFAULT_OUTPUT_PATTERN)
+
+
+def apply_variant(gltf, variant):
+    """Apply one variant to gltf (in place) and return it."""
+    # Remember the original names before the palette renames them all
+    original_names = [mat.get("name") for mat in gltf.get("materials", [])]
+
+    apply_wilhelm_palette(
+        gltf,
+        base_color=hex_to_rgba(variant["baseColor"]),
+        metallic=variant["metallic"],
+        roughness=variant["roughness"],
+        emissive=variant["emissive"],
+        brand_color=variant["brandColor"],
+    )
+
+    for name, override in variant.get("materials", {}).items():
+        for mat, original in zip(gltf.get("materials", []), original_names):
+            if original != name:
+                continue
+            pbr = mat.setdefault("pbrMetallicRoughness", {})
+            if "baseColor" in override:
+                pbr["baseColorFactor"] = hex_to_rgba(override["baseColor"])
+            if "metallic" in override:
+                pbr["metallicFactor"] = override["metallic"]
+            if "roughness" in override:
+                pbr["roughnessFactor"] = override["roughness"]
+            if "emissive" in override:
+                mat["emissiveFactor"] = list(override["emissive"])
+
+    gltf["extras"]["wilhelm"]["variant"] = variant["name"]
+    return gltf
+
+
+def _init_worker(base_gltf, bin_range):
+    global _base_gltf, _bin_range
+    _base_gltf = base_gltf
+    _bin_range = bin_range
+
+
+def _write_variant(variant, output_path):
+    gltf = apply_variant(copy.deepcopy(_base_gltf), variant)
+    # The BIN chunk goes file-to-file from the shared source, never via memory
+    return write_glb(output_path, gltf, _bin_range)
+
+
+def generate_variants(input_path, variants, output_dir,
+                      output_pattern=DEFAULT_OUTPUT_PATTERN, workers=None):
+    """Parse input_path once and write every variant into output_dir.
+
+    Variants are written concurrently by a process pool; workers=1 writes
+    them in this process. Returns {"generated": [...], "failed": [...]}.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    for variant in variants:
+        _check_name(variant["name"])
+    base_gltf, bin_range = read_glb_layout(input_path)
+    results = {"generated": [], "failed": []}
+    jobs = [(v, output_dir / output_pattern.format(name=v["name"])) for v in variants]
+
+    if workers == 1:
+        _init_worker(base_gltf, bin_range)
+        for variant, path in jobs:
+            try:
+                size = _write_variant(variant, path)
+                results["generated"].append({"name": variant["name"], "file": str(path), "bytes": size})
+            except Exception as e:
+                results["failed"].append({"name": variant["name"], "error": str(e)})
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(base_gltf, bin_range)) as pool:
+        futures = {pool.submit(_write_variant, v, path): (v, path) for v, path in jobs}
+        for future in as_completed(futures):
+            variant, path = futures[future]
+            try:
+                size = future.result()
+                results["generated"].append({"name": variant["name"], "file": str(path), "bytes": size})
+            except Exception as e:
+                results["failed"].append({"name": variant["name"], "error": str(e)})
+
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate branded Wilhelm GLB variants from a spec")
+    parser.add_argument("input", help="Source GLB (e.g. models/wilhelm/Parrot.glb)")
+    parser.add_argument("spec", help="Variant spec JSON")
+    parser.add_argument("--output", default="models/wilhelm/variants", help="Output directory")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count, 1 = no pool)")
+
+    args = parser.parse_args()
+
+    variants, output_pattern = load_spec(args.spec)
+
+    print("=" * 60)
+    print("🦜 WILHELM VARIANT ENGINE")
+    print("=" * 60)
+    print(f"   Input: {args.input} ({os.path.getsize(args.input):,} bytes)")
+    print(f"   Variants: {len(variants)}")
+
+    start = time.time()
+    results = generate_variants(args.input, variants, args.output,
+                                output_pattern=output_pattern, workers=args.workers)
+
+    print(f"\n   ✅ Generated: {len(results['generated'])}")
+    print(f"   ❌ Failed: {len(results['failed'])}")
+    for item in results["failed"]:
+        print(f"      • {item['name']}: {item['error']}")
+    print(f"   ⏱️  {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()